@@ -0,0 +1,138 @@
+"""
+Kitchen latency analytics from the order item status events.
+
+For every item completed in a time window:
+    wait           submitted (or added, if never submitted) -> In Progress
+    prep           In Progress -> Completed
+    ticket_to_plate submitted (or added) -> Completed
+reported as p50/p90/p99 per dish, station (the dish category) or hour of
+submission. The completions are found with a range scan over (status, at) and
+each item's earlier events through the (item_id, status, at) index, so a report
+reads only the window, however long the history is.
+
+    python analytics.py --days 7 --by dish [--db restaurant_system.db]
+"""
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from order_engine import DEFAULT_DB_PATH
+from storage import open_connection, profile_from_env
+
+METRICS = ("wait", "prep", "ticket_to_plate")
+GROUPINGS = ("dish", "station", "hour")
+
+COMPLETED_ITEMS_SQL = """
+    SELECT c.item_id, d.name AS dish, d.category AS station, c.at AS completed_at,
+           COALESCE(
+               (SELECT MIN(e.at) FROM order_item_events e WHERE e.item_id = c.item_id AND e.status = 'Submitted'),
+               (SELECT MIN(e.at) FROM order_item_events e WHERE e.item_id = c.item_id AND e.status = 'Pending')
+           ) AS ticket_at,
+           (SELECT MAX(e.at) FROM order_item_events e
+            WHERE e.item_id = c.item_id AND e.status = 'In Progress' AND e.at <= c.at) AS started_at
+    FROM order_item_events c
+    JOIN dishes d ON d.id = c.dish_id
+    WHERE c.status = 'Completed' AND c.at >= ? AND c.at < ?
+"""
+
+# (name, sql, sample parameters) for benchmarks/check_query_plans.py
+ANALYTICS_QUERIES = [
+    ("completed items in range", COMPLETED_ITEMS_SQL, ('2000-01-01', '2100-01-01')),
+]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not samples:
+        return None
+    index = max(0, min(len(samples) - 1, int(round(pct / 100.0 * len(samples))) - 1))
+    return samples[index]
+
+
+def _seconds(start, end):
+    if not start or not end:
+        return None
+    return (_parse(end) - _parse(start)).total_seconds()
+
+
+def _parse(text):
+    return datetime.fromisoformat(text)
+
+
+def completed_items(connection, start, end):
+    """Rows of COMPLETED_ITEMS_SQL for items completed in [start, end) (TEXT times or datetimes)"""
+    if isinstance(start, datetime):
+        start = start.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(end, datetime):
+        end = end.strftime('%Y-%m-%d %H:%M:%S')
+    return connection.execute(COMPLETED_ITEMS_SQL, (start, end)).fetchall()
+
+
+def kitchen_latency(connection, start, end, by="dish"):
+    """
+    {group: {"count": n, metric: {"p50", "p90", "p99"} (seconds, None without samples)}}
+    for items completed in [start, end), grouped by dish, station or hour.
+    """
+    if by not in GROUPINGS:
+        raise ValueError(f"Unknown grouping {by!r}, expected one of: {', '.join(GROUPINGS)}")
+    samples = defaultdict(lambda: {metric: [] for metric in METRICS})
+    for row in completed_items(connection, start, end):
+        if by == "hour":
+            key = (row['ticket_at'] or row['completed_at'])[11:13] + ":00"
+        else:
+            key = row[by] or ""
+        durations = {
+            "wait": _seconds(row['ticket_at'], row['started_at']),
+            "prep": _seconds(row['started_at'], row['completed_at']),
+            "ticket_to_plate": _seconds(row['ticket_at'], row['completed_at']),
+        }
+        group = samples[key]
+        for metric, seconds in durations.items():
+            if seconds is not None and seconds >= 0:
+                group[metric].append(seconds)
+
+    report = {}
+    for key, group in samples.items():
+        report[key] = {"count": max(len(values) for values in group.values())}
+        for metric, values in group.items():
+            values.sort()
+            report[key][metric] = {f"p{pct}": percentile(values, pct) for pct in (50, 90, 99)}
+    return report
+
+
+def format_report(report, by):
+    def minutes(seconds):
+        return "-" if seconds is None else f"{seconds / 60:.1f}"
+
+    header = f"{by.capitalize():<30} {'Count':>6}"
+    for metric in METRICS:
+        header += f" | {metric + ' p50/p90/p99 min':>30}"
+    lines = [header, "-" * len(header)]
+    for key in sorted(report):
+        stats = report[key]
+        line = f"{str(key)[:30]:<30} {stats['count']:>6}"
+        for metric in METRICS:
+            p = stats[metric]
+            line += f" | {minutes(p['p50']) + ' / ' + minutes(p['p90']) + ' / ' + minutes(p['p99']):>30}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kitchen wait, prep and ticket-to-plate percentiles")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="database file")
+    parser.add_argument("--days", type=float, default=7, help="report on items completed in the last N days")
+    parser.add_argument("--by", default="dish", choices=GROUPINGS)
+    args = parser.parse_args()
+
+    end = datetime.now()
+    start = end - timedelta(days=args.days)
+    connection = open_connection(args.db, profile_from_env(), readonly=True)
+    report = kitchen_latency(connection, start, end + timedelta(seconds=1), args.by)
+    connection.close()
+    print(f"Items completed {start:%Y-%m-%d %H:%M} - {end:%Y-%m-%d %H:%M}")
+    print(format_report(report, args.by))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+Local HTTP/WebSocket API for handheld waiter devices.
+
+A small asyncio server (standard library only) exposing the order operations as
+JSON endpoints:
+
+    GET  /tables                      tables with status and open balance
+    GET  /menu                        available dishes with servings left
+    GET  /tables/{id}/bill            the table's open bill
+    POST /tables/{id}/orders          create an order        {"created_by"}
+    POST /tables/{id}/items           add a dish             {"dish_id", "quantity"}
+    POST /tables/{id}/submit          submit the placed order
+    POST /tables/{id}/checkout        pay the open bill      {"payment_method", "received_amount"}
+    GET  /kitchen                     kitchen items          ?status=Pending
+    GET  /ws                          WebSocket feed of kitchen and table changes
+
+Database work never runs on the event loop: it goes to a fixed pool of worker
+threads, each with its own OrderEngine (connections come from the shared
+storage pool). At most --max-pending requests wait for a worker; beyond that the
+server answers 503 at once, so a burst from many handhelds cannot pile up
+unbounded work. OrderError becomes 409 with its message, a locked database 503.
+Prices in /menu are decimal amounts; bill and checkout amounts are integer fen.
+
+    python api_server.py [--host 0.0.0.0] [--port 8765] [--workers 4] [--max-pending 64]
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from money import from_cents, to_cents
+from order_engine import DEFAULT_DB_PATH, OrderEngine, OrderError
+from storage import is_locked_error
+
+DEFAULT_PORT = 8765
+FEED_INTERVAL = 0.5  # seconds between change polls for the WebSocket feed
+MAX_BODY = 64 * 1024
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def is_integer(value):
+    """JSON integers only: 1.9, "3" and true are rejected"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class EngineExecutor:
+    """Runs work(engine) on a bounded pool of worker threads, one OrderEngine per thread"""
+
+    def __init__(self, db_path, workers=4, max_pending=64):
+        self.db_path = db_path
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-db")
+        self.slots = asyncio.Semaphore(max_pending)
+        self._local = threading.local()
+        self._engines = []
+        self._lock = threading.Lock()
+
+    def _call(self, work):
+        engine = getattr(self._local, "engine", None)
+        if engine is None:
+            # The connection belongs to the worker thread that opened it
+            engine = self._local.engine = OrderEngine(self.db_path)
+            with self._lock:
+                self._engines.append(engine)
+        return work(engine)
+
+    async def run(self, work):
+        if self.slots.locked():
+            raise HttpError(503, "Server busy, please retry")
+        async with self.slots:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self._call, work)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        with self._lock:
+            for engine in self._engines:
+                engine.close()
+            self._engines = []
+
+
+# -------------------------- WebSocket framing --------------------------
+def websocket_accept(key):
+    return base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+
+
+def websocket_frame(payload, opcode=0x1):
+    """One unmasked, final server frame"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def read_websocket_frame(reader):
+    """(opcode, payload) of the next client frame (clients always mask)"""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > MAX_BODY:
+        raise HttpError(413, "Frame too large")
+    mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+    payload = bytes(b ^ mask[i % 4] for i, b in enumerate(await reader.readexactly(length)))
+    return first & 0x0F, payload
+
+
+class ApiServer:
+    def __init__(self, db_path=DEFAULT_DB_PATH, workers=4, max_pending=64, feed_interval=FEED_INTERVAL):
+        self.db_path = db_path
+        self.workers = workers
+        self.max_pending = max_pending
+        self.feed_interval = feed_interval
+        self.db = None
+        self.subscribers = {}  # asyncio.Queue of outgoing frames -> writer, per WebSocket client
+        self.requests = 0
+        self.routes = [
+            ("GET", r"/tables", self.get_tables),
+            ("GET", r"/menu", self.get_menu),
+            ("GET", r"/tables/(\d+)/bill", self.get_bill),
+            ("POST", r"/tables/(\d+)/orders", self.create_order),
+            ("POST", r"/tables/(\d+)/items", self.add_item),
+            ("POST", r"/tables/(\d+)/submit", self.submit_order),
+            ("POST", r"/tables/(\d+)/checkout", self.checkout),
+            ("GET", r"/kitchen", self.get_kitchen),
+        ]
+        self.routes = [(method, re.compile(f"^{pattern}$"), handler) for method, pattern, handler in self.routes]
+
+    # -------------------------- Endpoints --------------------------
+    async def get_tables(self, query, body):
+        rows = await self.db.run(lambda engine: engine.list_tables())
+        return 200, [dict(row) for row in rows]
+
+    async def get_menu(self, query, body):
+        def menu(engine):
+            dishes = engine.list_available_dishes()
+            servings = engine.get_servings_remaining()
+            return [{"id": dish.id, "name": dish.name, "price": from_cents(dish.price_cents), "category": dish.category,
+                     "servings_left": servings.get(dish.id)} for dish in dishes]
+        return 200, await self.db.run(menu)
+
+    async def get_bill(self, query, body, table_id):
+        bill = await self.db.run(lambda engine: engine.load_open_bill(table_id))
+        return 200, {"orders": bill['orders'], "totals": bill['totals']._asdict()}
+
+    async def create_order(self, query, body, table_id):
+        created_by = str(body.get("created_by", "Handheld"))
+
+        def open_order(engine):
+            if not engine.table_exists(table_id):
+                raise HttpError(404, "Table not found")
+            return engine.create_order(table_id, created_by)
+        return 201, {"order_id": await self.db.run(open_order)}
+
+    async def add_item(self, query, body, table_id):
+        dish_id = body.get("dish_id")
+        quantity = body.get("quantity", 1)
+        if not is_integer(dish_id) or not is_integer(quantity):
+            raise HttpError(400, "dish_id (and optional quantity) must be integers")
+        if quantity <= 0:
+            raise HttpError(400, "quantity must be positive")
+        item_id = await self.db.run(lambda engine: engine.add_dish_to_order(table_id, dish_id, quantity))
+        return 201, {"item_id": item_id}
+
+    async def submit_order(self, query, body, table_id):
+        order_id = await self.db.run(lambda engine: engine.submit_order(table_id))
+        return 200, {"order_id": order_id}
+
+    async def checkout(self, query, body, table_id):
+        payment_method = str(body.get("payment_method", "Cash Payment"))
+        received = body.get("received_amount")
+        if received is not None:
+            if not is_number(received):
+                raise HttpError(400, "received_amount must be a number")
+            try:
+                received = to_cents(received)
+            except (ArithmeticError, ValueError):
+                raise HttpError(400, "received_amount must be a valid amount")
+
+        def pay(engine):
+            bill = engine.load_open_bill(table_id)
+            if not bill['orders']:
+                raise OrderError("No orders available for checkout at this table")
+            order_ids = [order['id'] for order in bill['orders']]
+            checkout_time, settled = engine.checkout(table_id, order_ids, payment_method, bill['totals'], received)
+            return {"orders": order_ids, "checkout_time": checkout_time, "totals": settled._asdict()}
+        return 200, await self.db.run(pay)
+
+    async def get_kitchen(self, query, body):
+        status = query.get("status", ["All"])[0]
+        seq, rows = await self.db.run(lambda engine: engine.get_kitchen_snapshot(status))
+        return 200, {"seq": seq, "items": [dict(row) for row in rows]}
+
+    # -------------------------- Change feed --------------------------
+    async def feed(self):
+        """Poll the kitchen change log and the tables, broadcast deltas to every WebSocket client"""
+        seq, _ = await self.db.run(lambda engine: engine.get_kitchen_snapshot("Pending"))
+        tables = None
+        while True:
+            await asyncio.sleep(self.feed_interval)
+            if not self.subscribers:
+                continue
+            since = seq
+            try:
+                changes, table_rows = await self.db.run(
+                    lambda engine: (engine.poll_kitchen_changes(since), engine.list_tables())
+                )
+            except Exception as e:
+                print(f"Change feed poll failed: {e}")
+                continue
+            seq = changes.seq
+            messages = []
+            if changes.resync or changes.rows or changes.removed_ids:
+                messages.append({"type": "kitchen", "seq": changes.seq, "resync": changes.resync,
+                                 "items": [dict(row) for row in changes.rows], "removed_ids": changes.removed_ids})
+            table_rows = [dict(row) for row in table_rows]
+            if table_rows != tables:
+                messages.append({"type": "tables", "tables": table_rows})
+                tables = table_rows
+            for message in messages:
+                self.broadcast(message)
+
+    def broadcast(self, message):
+        frame = websocket_frame(json.dumps(message, ensure_ascii=False).encode())
+        for queue, writer in list(self.subscribers.items()):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # A client this far behind is disconnected rather than buffered without limit
+                del self.subscribers[queue]
+                writer.close()
+
+    async def serve_websocket(self, reader, writer, key):
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {websocket_accept(key)}\r\n\r\n"
+        ).encode())
+        await writer.drain()
+
+        queue = asyncio.Queue(maxsize=100)
+        self.subscribers[queue] = writer
+
+        async def pump():
+            while True:
+                frame = await queue.get()
+                writer.write(frame)
+                await writer.drain()
+
+        sender = asyncio.create_task(pump())
+        try:
+            while not sender.done():
+                opcode, payload = await read_websocket_frame(reader)
+                if opcode == 0x8:  # close
+                    writer.write(websocket_frame(payload[:2], 0x8))
+                    break
+                if opcode == 0x9:  # ping
+                    writer.write(websocket_frame(payload, 0xA))
+        except (asyncio.IncompleteReadError, ConnectionError, HttpError):
+            pass
+        finally:
+            self.subscribers.pop(queue, None)
+            sender.cancel()
+
+    # -------------------------- HTTP --------------------------
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(url.path)
+            if not match:
+                continue
+            allowed = True
+            if route_method == method:
+                return await handler(query, body, *(int(group) for group in match.groups()))
+        raise HttpError(405 if allowed else 404, "Method not allowed" if allowed else "Not found")
+
+    async def handle(self, reader, writer):
+        """One client connection; HTTP/1.1 keep-alive, or a WebSocket after an upgrade"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                if urlsplit(target).path == "/ws":
+                    key = headers.get("sec-websocket-key")
+                    if key and headers.get("upgrade", "").lower() == "websocket":
+                        await self.serve_websocket(reader, writer, key)
+                        break
+                    status, payload = 400, {"error": "Expected a WebSocket upgrade"}
+                else:
+                    status, payload = await self.respond(method, target, headers, reader)
+                self.requests += 1
+                data = json.dumps(payload, ensure_ascii=False).encode()
+                writer.write((
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                ).encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, method, target, headers, reader):
+        try:
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY:
+                raise HttpError(413, "Request body too large")
+            raw = await reader.readexactly(length) if length else b""
+            try:
+                body = json.loads(raw) if raw else {}
+            except ValueError:
+                raise HttpError(400, "Body must be JSON")
+            if not isinstance(body, dict):
+                raise HttpError(400, "Body must be a JSON object")
+            return await self.dispatch(method, target, body)
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        except OrderError as e:
+            return 409, {"error": str(e)}
+        except Exception as e:
+            if is_locked_error(e):
+                return 503, {"error": "Database busy, please retry"}
+            print(f"API error on {method} {target}: {e}")
+            return 500, {"error": str(e)}
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT, ready=None):
+        self.db = EngineExecutor(self.db_path, self.workers, self.max_pending)
+        # Schema and seed data are brought up to date once, before any request
+        await self.db.run(lambda engine: engine.initialize_database())
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_BODY)
+        feed = asyncio.create_task(self.feed())
+        print(f"API listening on http://{host}:{port} ({self.workers} database workers)")
+        if ready:
+            ready()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            feed.cancel()
+            self.db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/WebSocket API for handheld waiter devices")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="database file")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (0.0.0.0 for the LAN)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=4, help="database worker threads")
+    parser.add_argument("--max-pending", type=int, default=64, help="requests allowed to wait for a worker")
+    args = parser.parse_args()
+
+    server = ApiServer(args.db, args.workers, args.max_pending)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print(f"Stopped after {server.requests} requests")
+
+
+if __name__ == "__main__":
+    main()
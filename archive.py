@@ -0,0 +1,189 @@
+"""
+Hot/cold split for order history.
+
+Paid and Cancelled orders older than a cut-off are moved, with their items, from
+the live database into a separate history database in bulk batches (one short
+write transaction per batch, so terminals keep working while it runs). The live
+orders/order_items tables then only hold recent and open orders.
+
+Reporting code attaches the history file and reads the TEMP views all_orders and
+all_order_items, which UNION ALL the live and archived rows.
+
+    python archive.py --days 90 [--db restaurant_system.db] [--batch 2000]
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from migrations import EPOCH_COLUMNS, MONEY_COLUMNS, cents_sql, epoch_ms_sql
+from order_engine import DEFAULT_DB_PATH, epoch_ms
+from storage import open_connection, profile_from_env
+
+DEFAULT_ARCHIVE_AFTER_DAYS = 90
+DEFAULT_BATCH_SIZE = 2000
+ARCHIVED_TABLES = ("orders", "order_items")
+
+HISTORY_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS history.orders (
+        id INTEGER PRIMARY KEY,
+        table_id INTEGER NOT NULL,
+        created_by TEXT NOT NULL,
+        order_date TEXT NOT NULL,
+        total_amount REAL,
+        status TEXT,
+        checkout_time TEXT,
+        payment_method TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS history.order_items (
+        id INTEGER PRIMARY KEY,
+        order_id INTEGER NOT NULL,
+        dish_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        subtotal REAL NOT NULL,
+        status TEXT
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS history.idx_orders_checkout_time ON orders (checkout_time)",
+    "CREATE INDEX IF NOT EXISTS history.idx_order_items_order ON order_items (order_id)",
+]
+
+# Batch selection; served by idx_orders_status_checkout_ts (see migrations.py)
+ARCHIVABLE_ORDERS_SQL = """
+    SELECT id FROM main.orders
+    WHERE (status = 'Paid' AND checkout_ts < ?)
+       OR (status = 'Cancelled' AND COALESCE(checkout_ts, order_ts) < ?)
+    LIMIT ?
+"""
+
+
+def history_path_for(db_path):
+    """restaurant_system.db -> restaurant_system_history.db"""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}_history{ext or '.db'}"
+
+
+def _columns(connection, schema, table):
+    return [(row[1], row[2]) for row in connection.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def attach_history(connection, history_path):
+    """
+    Attach the history database as "history", create or extend its tables so they carry
+    every live column, and (re)create the TEMP union views all_orders and all_order_items.
+    Must be called outside a transaction.
+    """
+    attached = [row[1] for row in connection.execute("PRAGMA database_list")]
+    if "history" not in attached:
+        connection.execute("ATTACH DATABASE ? AS history", (history_path,))
+    for statement in HISTORY_SCHEMA:
+        connection.execute(statement)
+
+    for table in ARCHIVED_TABLES:
+        # 1. Columns added to the live table by later migrations are added to the archive as well
+        archived = {name for name, _ in _columns(connection, "history", table)}
+        live = _columns(connection, "main", table)
+        for name, column_type in live:
+            if name not in archived:
+                connection.execute(f"ALTER TABLE history.{table} ADD COLUMN {name} {column_type}")
+                # Epoch-ms columns are derived from the TEXT times the archived rows already have
+                if name in EPOCH_COLUMNS.get(table, {}):
+                    text, local = EPOCH_COLUMNS[table][name]
+                    connection.execute(f"UPDATE history.{table} SET {name} = {epoch_ms_sql(text, local)}")
+                # and integer fen columns from the REAL amounts
+                elif name in MONEY_COLUMNS.get(table, {}):
+                    real = MONEY_COLUMNS[table][name]
+                    connection.execute(f"UPDATE history.{table} SET {name} = {cents_sql(real)}")
+
+        # 2. Union view over the live columns
+        column_list = ", ".join(name for name, _ in live)
+        connection.execute(f"DROP VIEW IF EXISTS temp.all_{table}")
+        connection.execute(f"""
+            CREATE TEMP VIEW all_{table} AS
+            SELECT {column_list} FROM main.{table}
+            UNION ALL
+            SELECT {column_list} FROM history.{table}
+        """)
+    connection.commit()
+
+
+def detach_history(connection):
+    for table in ARCHIVED_TABLES:
+        connection.execute(f"DROP VIEW IF EXISTS temp.all_{table}")
+    connection.execute("DETACH DATABASE history")
+
+
+def archive_orders(connection, older_than_days=DEFAULT_ARCHIVE_AFTER_DAYS, batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """
+    Move Paid/Cancelled orders finished more than older_than_days ago, with their items, into the
+    attached history database. Each batch is its own transaction. Return (orders, items) moved.
+    """
+    cutoff = epoch_ms((now or datetime.now()) - timedelta(days=older_than_days))
+    column_lists = {
+        table: ", ".join(name for name, _ in _columns(connection, "main", table)) for table in ARCHIVED_TABLES
+    }
+
+    moved_orders = moved_items = 0
+    while True:
+        try:
+            # Take the write lock up front so the selected batch cannot change underneath us
+            connection.execute("BEGIN IMMEDIATE")
+            order_ids = [row[0] for row in connection.execute(ARCHIVABLE_ORDERS_SQL, (cutoff, cutoff, batch_size))]
+            if not order_ids:
+                connection.rollback()
+                break
+
+            placeholders = ", ".join("?" for _ in order_ids)
+            columns = column_lists["orders"]
+            connection.execute(
+                f"INSERT OR REPLACE INTO history.orders ({columns}) "
+                f"SELECT {columns} FROM main.orders WHERE id IN ({placeholders})", order_ids
+            )
+            columns = column_lists["order_items"]
+            items = connection.execute(
+                f"INSERT OR REPLACE INTO history.order_items ({columns}) "
+                f"SELECT {columns} FROM main.order_items WHERE order_id IN ({placeholders})", order_ids
+            ).rowcount
+            # Orders go first, so the order_items delete triggers find no live order total to adjust
+            connection.execute(f"DELETE FROM main.orders WHERE id IN ({placeholders})", order_ids)
+            connection.execute(f"DELETE FROM main.order_items WHERE order_id IN ({placeholders})", order_ids)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        moved_orders += len(order_ids)
+        moved_items += items
+        print(f"  archived {moved_orders} orders / {moved_items} items")
+    return moved_orders, moved_items
+
+
+def open_reporting_connection(db_path=DEFAULT_DB_PATH, history_path=None):
+    """A read connection with the history attached, for queries over all_orders/all_order_items"""
+    connection = open_connection(db_path, profile_from_env())
+    attach_history(connection, history_path or history_path_for(db_path))
+    return connection
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old paid/cancelled orders into the history database")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="live database file")
+    parser.add_argument("--history", help="history database file (default: <db>_history.db)")
+    parser.add_argument("--days", type=int, default=DEFAULT_ARCHIVE_AFTER_DAYS, help="archive orders older than this")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH_SIZE, help="orders per transaction")
+    args = parser.parse_args()
+
+    history_path = args.history or history_path_for(args.db)
+    connection = open_connection(args.db, profile_from_env())
+    attach_history(connection, history_path)
+    started = time.perf_counter()
+    orders, items = archive_orders(connection, args.days, args.batch)
+    detach_history(connection)
+    connection.close()
+    print(f"Moved {orders} orders and {items} items to {history_path} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Handheld API load test.
+
+Starts api_server on a fresh benchmark database (or targets --url), then runs
+--clients concurrent handhelds for --duration seconds. Each one owns a table and
+repeats create order -> add dishes -> submit -> load bill -> checkout over one
+keep-alive connection, with a menu read per cycle. One WebSocket client counts
+the feed messages meanwhile. Reports requests/sec, per-endpoint latency
+percentiles and non-2xx responses.
+
+    python -m benchmarks.api_load --clients 40 --duration 20 --workers 4
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from benchmarks.common import LatencyRecorder, build_database, temp_db_path
+
+
+class Handheld:
+    """One keep-alive HTTP/1.1 connection speaking JSON"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write((
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n"
+        ).encode() + data)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        payload = json.loads(await self.reader.readexactly(length)) if length else None
+        return status, payload
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def count_feed(host, port, counts, stop):
+    """Subscribe to /ws and count the kitchen/tables messages until stop is set"""
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((
+        f"GET /ws HTTP/1.1\r\nHost: {host}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+    ).encode())
+    await writer.drain()
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+    try:
+        while not stop.is_set():
+            try:
+                first, second = await asyncio.wait_for(reader.readexactly(2), 0.5)
+            except asyncio.TimeoutError:
+                continue
+            length = second & 0x7F
+            if length == 126:
+                length = int.from_bytes(await reader.readexactly(2), "big")
+            elif length == 127:
+                length = int.from_bytes(await reader.readexactly(8), "big")
+            message = json.loads(await reader.readexactly(length))
+            counts[message["type"]] += 1
+    finally:
+        writer.close()
+
+
+async def handheld(host, port, table_id, dish_ids, deadline, recorder, statuses, rng):
+    client = Handheld(host, port)
+
+    async def call(name, method, path, body=None):
+        started = time.perf_counter()
+        status, payload = await client.request(method, path, body)
+        recorder.samples[name].append(time.perf_counter() - started)
+        statuses[status] += 1
+        return status, payload
+
+    try:
+        while time.perf_counter() < deadline:
+            await call("GET /menu", "GET", "/menu")
+            status, _ = await call("POST orders", "POST", f"/tables/{table_id}/orders", {"created_by": "Load Test"})
+            if status != 201:
+                continue
+            for dish_id in rng.sample(dish_ids, rng.randint(1, 4)):
+                await call("POST items", "POST", f"/tables/{table_id}/items", {"dish_id": dish_id, "quantity": 1})
+            await call("POST submit", "POST", f"/tables/{table_id}/submit")
+            await call("GET bill", "GET", f"/tables/{table_id}/bill")
+            await call("POST checkout", "POST", f"/tables/{table_id}/checkout", {"payment_method": "Cash Payment"})
+    finally:
+        await client.close()
+
+
+async def run(host, port, clients, duration, seed):
+    probe = Handheld(host, port)
+    _, tables = await probe.request("GET", "/tables")
+    _, menu = await probe.request("GET", "/menu")
+    await probe.close()
+    table_ids = [table['id'] for table in tables if table['status'] in ('Free', 'Occupied')]
+    # Generated dishes only: their ingredients are stocked for millions of servings
+    dish_ids = [dish['id'] for dish in menu if dish['name'].startswith("Bench Dish")] or [dish['id'] for dish in menu]
+    if len(table_ids) < clients:
+        sys.exit(f"Only {len(table_ids)} orderable tables for {clients} clients")
+
+    recorder = LatencyRecorder()
+    statuses = Counter()
+    feed_counts = Counter()
+    stop = asyncio.Event()
+    feed = asyncio.create_task(count_feed(host, port, feed_counts, stop))
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        handheld(host, port, table_ids[n], dish_ids, deadline, recorder, statuses, random.Random(seed + n))
+        for n in range(clients)
+    ))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await feed
+    return recorder, statuses, feed_counts, elapsed
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(host, port, timeout=30.0):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            socket.create_connection((host, port), 0.5).close()
+            return
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent handheld load against the HTTP API")
+    parser.add_argument("--url", help="running server to target (default: start one on a fresh benchmark database)")
+    parser.add_argument("--clients", type=int, default=40, help="concurrent handhelds, one table each")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--workers", type=int, default=4, help="database workers of the started server")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port
+    else:
+        db_path = temp_db_path()
+        print(f"Building benchmark database at {db_path} ...")
+        build_database(db_path, tables=args.clients + 10, history_orders=1000)
+        host, port = "127.0.0.1", free_port()
+        script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api_server.py")
+        server = subprocess.Popen([sys.executable, script, "--db", db_path, "--port", str(port),
+                                   "--workers", str(args.workers)], stdout=subprocess.DEVNULL)
+        wait_for_port(host, port)
+        print(f"API server started on port {port}")
+
+    try:
+        recorder, statuses, feed_counts, elapsed = asyncio.run(run(host, port, args.clients, args.duration, args.seed))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    total = sum(statuses.values())
+    recorder.report(f"{args.clients} handhelds, {elapsed:.1f}s")
+    print(f"\nRequests: {total} ({total / elapsed:.0f} requests/sec)")
+    print("Responses: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+    print("Feed messages: " + (", ".join(f"{kind}: {count}" for kind, count in sorted(feed_counts.items())) or "none"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Archival benchmark.
+
+Builds a database with a year of synthetic paid history plus a few open orders,
+measures the live queries, archives everything older than --days into a history
+database and measures them again. Also checks that the all_orders union view
+still sees every order.
+
+    python -m benchmarks.bench_archive --history 100000 --days 30
+"""
+import argparse
+import random
+import time
+
+from archive import archive_orders, attach_history, detach_history, history_path_for
+from order_engine import OrderEngine
+from benchmarks.common import LatencyRecorder, build_database, count_rows, temp_db_path
+
+
+def open_some_orders(engine, table_ids, dish_ids, tables=20, dishes_per_order=4, seed=5):
+    rng = random.Random(seed)
+    for table_id in table_ids[:tables]:
+        engine.create_order(table_id, "Benchmark")
+        for dish_id in rng.sample(dish_ids, dishes_per_order):
+            engine.add_dish_to_order(table_id, dish_id)
+
+
+def measure_live_queries(engine, table_ids, rounds):
+    recorder = LatencyRecorder()
+    for n in range(rounds):
+        table_id = table_ids[n % len(table_ids)]
+        with recorder.measure("load_open_bill"):
+            engine.load_open_bill(table_id)
+        with recorder.measure("has_unfinished_orders"):
+            engine.has_unfinished_orders(table_id)
+        with recorder.measure("kitchen Pending"):
+            engine.list_kitchen_items("Pending")
+    for _ in range(max(1, rounds // 20)):
+        with recorder.measure("kitchen All"):
+            engine.list_kitchen_items("All")
+    return recorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live query latency before and after archiving")
+    parser.add_argument("--history", type=int, default=100000, help="paid orders spread over --history-days")
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--days", type=int, default=30, help="archive orders older than this")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    db_path = temp_db_path()
+    print(f"Building benchmark database at {db_path} ...")
+    dish_ids = build_database(db_path, history_orders=args.history, history_days=args.history_days)
+    engine = OrderEngine(db_path)
+    table_ids = list(engine.get_table_map().values())
+    open_some_orders(engine, table_ids, dish_ids)
+    total_orders = count_rows(db_path, "orders")
+
+    before = measure_live_queries(engine, table_ids, args.rounds)
+    before.report(f"Before archiving: {total_orders} orders, {count_rows(db_path, 'order_items')} items live")
+
+    history_path = history_path_for(db_path)
+    connection = engine.connection
+    attach_history(connection, history_path)
+    started = time.perf_counter()
+    orders, items = archive_orders(connection, args.days)
+    elapsed = time.perf_counter() - started
+    union_total = connection.execute("SELECT COUNT(*) FROM all_orders").fetchone()[0]
+    detach_history(connection)
+    print(f"\nArchived {orders} orders / {items} items in {elapsed:.1f}s "
+          f"({orders / elapsed if elapsed else 0:.0f} orders/sec)")
+    print(f"all_orders union view: {union_total} rows (expected {total_orders})")
+
+    after = measure_live_queries(engine, table_ids, args.rounds)
+    after.report(f"After archiving: {count_rows(db_path, 'orders')} orders, {count_rows(db_path, 'order_items')} items live")
+    engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Catalog import/export benchmark.
+
+Writes a synthetic menu (--dishes dishes, --ingredients ingredients and about
+--lines recipe lines) as CSV or JSON files, imports it into a fresh database,
+imports it again (every row now an update), exports it and checks that the
+exported files hold the same rows as the generated ones.
+
+    python -m benchmarks.bench_catalog_import --dishes 5000 --lines 50000 --format csv
+"""
+import argparse
+import os
+import random
+import time
+
+from catalog_io import export_catalog, import_catalog, read_rows, write_rows
+from order_engine import OrderEngine
+from benchmarks.common import count_rows, temp_db_path
+
+
+def write_menu(directory, extension, dishes, ingredients, lines, seed):
+    """Generate the files, return {kind: path}"""
+    rng = random.Random(seed)
+    paths = {kind: os.path.join(directory, f"{kind}.{extension}") for kind in ("ingredients", "dishes", "recipes")}
+    write_rows(paths["ingredients"], ("name", "unit", "stock", "low_stock_threshold"), (
+        (f"Import Ingredient {n}", rng.choice(("kg", "l", "pcs")), float(rng.randint(10, 500)), 5.0)
+        for n in range(1, ingredients + 1)
+    ))
+    write_rows(paths["dishes"], ("name", "price", "category", "description", "is_available"), (
+        (f"Import Dish {n}", f"{rng.randint(8, 198)}.{rng.choice(('00', '50', '80'))}",
+         rng.choice(("Hot", "Cold", "Soup", "Staple")), "", 1)
+        for n in range(1, dishes + 1)
+    ))
+    per_dish = max(1, lines // dishes)
+    write_rows(paths["recipes"], ("dish", "ingredient", "quantity"), (
+        (f"Import Dish {n}", f"Import Ingredient {ingredient}", round(rng.uniform(0.01, 0.5), 3))
+        for n in range(1, dishes + 1)
+        for ingredient in rng.sample(range(1, ingredients + 1), min(per_dish, ingredients))
+    ))
+    return paths
+
+
+def timed_import(db_path, paths, label):
+    engine = OrderEngine(db_path)
+    started = time.perf_counter()
+    results, _ = import_catalog(engine.connection, paths)
+    elapsed = time.perf_counter() - started
+    engine.close()
+    lines, _ = results["recipes"]
+    print(f"{label:<22} {elapsed:>8.2f}s  dishes {results['dishes']}, ingredients {results['ingredients']}, "
+          f"{lines} recipe lines ({lines / elapsed if elapsed else 0:.0f} lines/sec)")
+
+
+FIELDS = {
+    "ingredients": ("name", "unit", "stock", "low_stock_threshold"),
+    "dishes": ("name", "price", "category", "description", "is_available"),
+    "recipes": ("dish", "ingredient", "quantity"),
+}
+
+
+def normalized(value):
+    """'12.50', 12.5 and '12.5' compare equal; other text as is"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def same_rows(generated, exported, kind):
+    """Compare the generated rows with the exported ones (rows seeded by the app are ignored)"""
+    def rows(path):
+        return sorted(
+            tuple(normalized(row[column]) for column in FIELDS[kind])
+            for _, row in read_rows(path, FIELDS[kind]) if row[FIELDS[kind][0]].startswith("Import")
+        )
+    return rows(generated) == rows(exported)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk catalog import and streaming export")
+    parser.add_argument("--dishes", type=int, default=5000)
+    parser.add_argument("--ingredients", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=50000, help="recipe lines in total")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    db_path = temp_db_path()
+    directory = os.path.dirname(db_path)
+    engine = OrderEngine(db_path)
+    engine.initialize_database()
+    engine.close()
+
+    paths = write_menu(directory, args.format, args.dishes, args.ingredients, args.lines, args.seed)
+    sizes = ", ".join(f"{kind} {os.path.getsize(path) / 1e6:.1f} MB" for kind, path in paths.items())
+    print(f"Generated {args.format} files: {sizes}\n")
+
+    timed_import(db_path, paths, "Import (new rows)")
+    timed_import(db_path, paths, "Import again (updates)")
+
+    exported = {kind: os.path.join(directory, f"exported_{kind}.{args.format}") for kind in paths}
+    engine = OrderEngine(db_path)
+    started = time.perf_counter()
+    counts = export_catalog(engine.read_connection, exported)
+    print(f"{'Export':<22} {time.perf_counter() - started:>8.2f}s  {counts}")
+    engine.close()
+
+    print(f"\nDatabase: {count_rows(db_path, 'dishes')} dishes, {count_rows(db_path, 'dish_ingredients')} recipe lines")
+    mismatched = [kind for kind in paths if not same_rows(paths[kind], exported[kind], kind)]
+    if mismatched:
+        raise SystemExit(f"MISMATCH: exported {', '.join(mismatched)} differ from the imported files")
+    print("OK: exported files match the imported ones")
+
+
+if __name__ == "__main__":
+    main()
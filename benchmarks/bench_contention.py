@@ -0,0 +1,124 @@
+"""
+Multi-terminal contention benchmark.
+
+Simulates N terminals as N processes sharing one database file. Each terminal
+runs full service cycles on its own tables for a fixed time; a step that fails
+with "database is locked" is counted and the cycle abandoned. Reports write
+throughput, write latency and the locked-error rate per storage profile.
+
+    python -m benchmarks.bench_contention --terminals 1 2 4 8 --profiles default legacy
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import time
+
+from order_engine import OrderEngine, OrderError
+from storage import PROFILES, close_all_pools, is_locked_error
+from benchmarks.common import build_database, percentile, temp_db_path
+
+
+def terminal(db_path, profile_name, table_ids, dish_ids, start_at, duration, dishes_per_order, seed):
+    """One terminal process: run service cycles until the deadline, return its counters"""
+    rng = random.Random(seed)
+    engine = OrderEngine(db_path, profile=PROFILES[profile_name])
+    stats = {"cycles": 0, "writes": 0, "locked": 0, "rejected": 0, "latencies": []}
+
+    def write(operation, *args):
+        started = time.perf_counter()
+        try:
+            result = operation(*args)
+        except OrderError:
+            stats["rejected"] += 1
+            raise
+        except Exception as e:
+            if is_locked_error(e):
+                stats["locked"] += 1
+            raise
+        stats["writes"] += 1
+        stats["latencies"].append(time.perf_counter() - started)
+        return result
+
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.time() + duration
+    n = 0
+    while time.time() < deadline:
+        table_id = table_ids[n % len(table_ids)]
+        n += 1
+        try:
+            write(engine.create_order, table_id, "Benchmark")
+            item_ids = [write(engine.add_dish_to_order, table_id, dish_id, rng.randint(1, 2))
+                        for dish_id in rng.sample(dish_ids, dishes_per_order)]
+            write(engine.submit_order, table_id)
+            for item_id in item_ids:
+                write(engine.start_preparation, item_id)
+            for item_id in item_ids:
+                write(engine.mark_as_served, item_id)
+            bill = engine.load_open_bill(table_id)
+            write(engine.checkout, table_id, [order['id'] for order in bill['orders']], "Cash Payment",
+                  bill['totals'])
+            stats["cycles"] += 1
+        except Exception as e:
+            if not (is_locked_error(e) or isinstance(e, OrderError)):
+                raise
+    engine.close()
+    close_all_pools()
+    return stats
+
+
+def run(template_path, profile_name, terminals, duration, dishes_per_order):
+    """Copy the template database and run `terminals` processes against it, return the merged counters"""
+    db_path = os.path.join(os.path.dirname(template_path), f"contention_{profile_name}_{terminals}.db")
+    shutil.copyfile(template_path, db_path)
+
+    engine = OrderEngine(db_path, profile=PROFILES[profile_name])
+    table_ids = list(engine.get_table_map().values())
+    dish_ids = [dish.id for dish in engine.list_available_dishes() if dish.name.startswith("Bench Dish")]
+    engine.close()
+    close_all_pools()
+
+    start_at = time.time() + 1.0  # let every process finish starting before the clock runs
+    jobs = [(db_path, profile_name, table_ids[n::terminals], dish_ids, start_at, duration, dishes_per_order, n)
+            for n in range(terminals)]
+    with multiprocessing.get_context("spawn").Pool(terminals) as pool:
+        results = pool.starmap(terminal, jobs)
+
+    merged = {"cycles": 0, "writes": 0, "locked": 0, "rejected": 0, "latencies": []}
+    for stats in results:
+        for key, value in stats.items():
+            merged[key] += value
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Locked-error rate and write throughput for N terminals")
+    parser.add_argument("--terminals", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--profiles", nargs="+", default=["default", "legacy"], choices=list(PROFILES))
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--dishes-per-order", type=int, default=4)
+    parser.add_argument("--history", type=int, default=20000, help="paid orders already in the database")
+    args = parser.parse_args()
+
+    template_path = temp_db_path("template.db")
+    print(f"Building benchmark database at {template_path} ...")
+    build_database(template_path, history_orders=args.history)
+    close_all_pools()  # checkpoint so the template is a single self-contained file
+
+    print(f"\n{'Profile':<10} {'Terminals':>9} {'Cycles':>8} {'Writes':>8} {'Locked':>8} {'Locked %':>9} "
+          f"{'Writes/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    print("-" * 87)
+    for profile_name in args.profiles:
+        for terminals in args.terminals:
+            stats = run(template_path, profile_name, terminals, args.duration, args.dishes_per_order)
+            attempts = stats["writes"] + stats["locked"]
+            locked_rate = 100.0 * stats["locked"] / attempts if attempts else 0.0
+            latencies = stats["latencies"]
+            print(f"{profile_name:<10} {terminals:>9} {stats['cycles']:>8} {stats['writes']:>8} {stats['locked']:>8} "
+                  f"{locked_rate:>8.2f}% {stats['writes'] / args.duration:>9.1f} "
+                  f"{percentile(latencies, 50) * 1000:>8.2f} {percentile(latencies, 99) * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Kitchen live-update benchmark.
+
+For each order history size, a front-of-house engine keeps adding dishes while a
+kitchen engine pulls them with poll_kitchen_changes. The poll latency should stay
+flat as the history grows, unlike re-running the full kitchen list.
+
+    python -m benchmarks.bench_kitchen_poll --history 1000 20000 100000
+"""
+import argparse
+import random
+
+from order_engine import OrderEngine
+from benchmarks.common import LatencyRecorder, build_database, temp_db_path
+
+
+def run(history, rounds):
+    db_path = temp_db_path()
+    dish_ids = build_database(db_path, history_orders=history)
+    front = OrderEngine(db_path)
+    kitchen = OrderEngine(db_path)
+    rng = random.Random(3)
+    recorder = LatencyRecorder()
+
+    table_id = next(iter(front.get_table_map().values()))
+    front.create_order(table_id, "Benchmark")
+    seq, _ = kitchen.get_kitchen_snapshot("Pending")
+    for _ in range(rounds):
+        front.add_dish_to_order(table_id, rng.choice(dish_ids))
+        with recorder.measure("poll (1 change)"):
+            seq = kitchen.poll_kitchen_changes(seq, "Pending").seq
+        with recorder.measure("poll (no change)"):
+            kitchen.poll_kitchen_changes(seq, "Pending")
+    for _ in range(min(rounds, 20)):
+        with recorder.measure("full list (All)"):
+            kitchen.list_kitchen_items("All")
+
+    front.close()
+    kitchen.close()
+    return recorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kitchen change polling cost versus history size")
+    parser.add_argument("--history", type=int, nargs="+", default=[1000, 20000, 100000])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    for history in args.history:
+        recorder = run(history, args.rounds)
+        recorder.report(f"History: {history} paid orders")
+
+
+if __name__ == "__main__":
+    main()
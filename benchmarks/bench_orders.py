@@ -0,0 +1,77 @@
+"""
+Order throughput benchmark.
+
+Runs complete service cycles (create → add dishes → submit → start preparation →
+mark as served → checkout) through OrderEngine against a file-backed database
+and reports orders/sec plus p50/p99 latency per operation.
+
+    python -m benchmarks.bench_orders --orders 500 --history 20000
+"""
+import argparse
+import random
+import time
+
+from order_engine import OrderEngine
+from benchmarks.common import LatencyRecorder, build_database, count_rows, temp_db_path
+
+
+def run_service_cycles(engine, table_ids, dish_ids, orders, dishes_per_order, seed=7):
+    """Run `orders` full service cycles and return (elapsed seconds, recorder)"""
+    rng = random.Random(seed)
+    recorder = LatencyRecorder()
+    started = time.perf_counter()
+
+    for n in range(orders):
+        table_id = table_ids[n % len(table_ids)]
+
+        with recorder.measure("create_order"):
+            engine.create_order(table_id, "Benchmark")
+
+        item_ids = []
+        for dish_id in rng.sample(dish_ids, dishes_per_order):
+            with recorder.measure("add_dish_to_order"):
+                item_ids.append(engine.add_dish_to_order(table_id, dish_id, rng.randint(1, 2)))
+
+        with recorder.measure("submit_order"):
+            engine.submit_order(table_id)
+
+        for item_id in item_ids:
+            with recorder.measure("start_preparation"):
+                engine.start_preparation(item_id)
+        for item_id in item_ids:
+            with recorder.measure("mark_as_served"):
+                engine.mark_as_served(item_id)
+
+        with recorder.measure("checkout"):
+            bill = engine.load_open_bill(table_id)
+            engine.checkout(table_id, [order['id'] for order in bill['orders']], "Cash Payment", bill['totals'])
+
+    return time.perf_counter() - started, recorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Order engine throughput benchmark")
+    parser.add_argument("--db", help="database file to use (default: a fresh temporary file)")
+    parser.add_argument("--orders", type=int, default=300, help="service cycles to run")
+    parser.add_argument("--dishes-per-order", type=int, default=5)
+    parser.add_argument("--tables", type=int, default=100)
+    parser.add_argument("--menu", type=int, default=300, help="number of dishes on the menu")
+    parser.add_argument("--history", type=int, default=20000, help="paid orders already in the database")
+    args = parser.parse_args()
+
+    db_path = args.db or temp_db_path()
+    print(f"Building benchmark database at {db_path} ...")
+    dish_ids = build_database(db_path, tables=args.tables, dishes=args.menu, history_orders=args.history)
+    print(f"  orders: {count_rows(db_path, 'orders')}, order_items: {count_rows(db_path, 'order_items')}")
+
+    engine = OrderEngine(db_path)
+    table_ids = list(engine.get_table_map().values())
+    elapsed, recorder = run_service_cycles(engine, table_ids, dish_ids, args.orders, args.dishes_per_order)
+    engine.close()
+
+    recorder.report(f"{args.orders} service cycles, {args.dishes_per_order} dishes each")
+    print(f"\nThroughput: {args.orders / elapsed:.1f} orders/sec ({elapsed:.2f}s total)")
+
+
+if __name__ == "__main__":
+    main()
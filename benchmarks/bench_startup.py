@@ -0,0 +1,96 @@
+"""
+Startup time benchmark.
+
+Launches fresh interpreter processes and measures time-to-first-window: imports,
+database bootstrap, RestaurantApp construction and the first Tk update. "cold"
+runs start without a database file (schema + seed data are created), "warm" runs
+reuse the file and should take the version-stamp fast path. Without a display,
+--bootstrap-only times the import and database bootstrap part alone.
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import percentile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(mode):
+    """Runs inside the measured process; prints the elapsed seconds since the process started"""
+    started = time.perf_counter()
+    if mode == "gui":
+        import tkinter as tk
+        from main import RestaurantApp
+        root = tk.Tk()
+        app = RestaurantApp(root)
+        root.update()  # the first window is drawn here
+        elapsed = time.perf_counter() - started
+        app.on_close()
+    else:
+        from order_engine import DEFAULT_DB_PATH, OrderEngine
+        engine = OrderEngine(DEFAULT_DB_PATH)
+        engine.initialize_database()
+        engine.get_table_map()
+        engine.close()
+        elapsed = time.perf_counter() - started
+    print(f"ELAPSED {elapsed:.6f}")
+
+
+def launch(mode, workdir):
+    """Run one measured process in workdir, return (in-process seconds, wall seconds including interpreter start)"""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    wall_start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", mode],
+        cwd=workdir, env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - wall_start
+    if result.returncode != 0:
+        raise RuntimeError(f"startup run failed:\n{result.stderr}")
+    for line in result.stdout.splitlines():
+        if line.startswith("ELAPSED "):
+            return float(line.split()[1]), wall
+    raise RuntimeError(f"no timing in output:\n{result.stdout}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold and warm time-to-first-window")
+    parser.add_argument("--runs", type=int, default=5, help="runs per scenario")
+    parser.add_argument("--bootstrap-only", action="store_true", help="skip the GUI (no display needed)")
+    parser.add_argument("--child", choices=["gui", "bootstrap"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    mode = "bootstrap" if args.bootstrap_only else "gui"
+    workdir = tempfile.mkdtemp(prefix="rms_startup_")
+    db_files = [os.path.join(workdir, "restaurant_system.db" + suffix) for suffix in ("", "-wal", "-shm")]
+
+    samples = {"cold": [], "warm": []}
+    for _ in range(args.runs):
+        for path in db_files:
+            if os.path.exists(path):
+                os.remove(path)
+        samples["cold"].append(launch(mode, workdir))
+        samples["warm"].append(launch(mode, workdir))
+
+    print(f"\nStartup ({mode}), {args.runs} runs each")
+    print(f"{'Scenario':<10} {'p50 ms':>10} {'max ms':>10} {'wall p50 ms':>12}")
+    print("-" * 45)
+    for scenario, runs in samples.items():
+        in_process = [elapsed for elapsed, _ in runs]
+        wall = [wall for _, wall in runs]
+        print(f"{scenario:<10} {percentile(in_process, 50) * 1000:>10.1f} {max(in_process) * 1000:>10.1f} "
+              f"{percentile(wall, 50) * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Time range query benchmark.
+
+Measures shift (17:00-22:00) and whole-day range queries over orders and
+inventory_logs on a large history, first as they had to be written against the
+TEXT time columns, then through the engine on the indexed epoch-ms columns.
+Both forms must return the same counts. Uses --db (e.g. one made by
+benchmarks.generate_service_day) or builds a fresh database.
+
+    python -m benchmarks.bench_time_ranges --orders 2000000 --inventory-logs 1000000
+    python -m benchmarks.bench_time_ranges --db rush.db
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from order_engine import OrderEngine
+from benchmarks.common import LatencyRecorder, build_database, count_rows, temp_db_path
+
+TEXT_QUERIES = {
+    "placed": """
+        SELECT COUNT(*) AS orders, COALESCE(SUM(total_amount), 0) AS revenue
+        FROM orders WHERE order_date >= ? AND order_date < ?
+    """,
+    "paid": """
+        SELECT COUNT(*) AS orders, COALESCE(SUM(total_amount), 0) AS revenue
+        FROM orders WHERE status = 'Paid' AND checkout_time >= ? AND checkout_time < ?
+    """,
+    "movements": """
+        SELECT change_type, COUNT(*) AS movements, COALESCE(SUM(quantity), 0) AS quantity
+        FROM inventory_logs WHERE created_at >= ? AND created_at < ?
+        GROUP BY change_type
+    """,
+}
+
+
+def windows(engine, count, seed):
+    """count random (shift_start, shift_end, day_start, day_end) datetimes within the history"""
+    row = engine.read_connection.execute("SELECT MIN(order_date), MAX(order_date) FROM orders").fetchone()
+    first = datetime.strptime(row[0][:10], '%Y-%m-%d')
+    days = max(1, (datetime.strptime(row[1][:10], '%Y-%m-%d') - first).days)
+    rng = random.Random(seed)
+    result = []
+    for _ in range(count):
+        day = first + timedelta(days=rng.randrange(days))
+        result.append((day.replace(hour=17), day.replace(hour=22), day, day + timedelta(days=1)))
+    return result
+
+
+def text(moment):
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def run_text(engine, ranges, recorder):
+    results = []
+    connection = engine.read_connection
+    for shift_start, shift_end, day_start, day_end in ranges:
+        with recorder.measure("shift: orders placed"):
+            placed = tuple(connection.execute(TEXT_QUERIES["placed"], (text(shift_start), text(shift_end))).fetchone())
+        with recorder.measure("day: orders paid"):
+            paid = tuple(connection.execute(TEXT_QUERIES["paid"], (text(day_start), text(day_end))).fetchone())
+        with recorder.measure("day: stock movements"):
+            rows = connection.execute(TEXT_QUERIES["movements"], (text(day_start), text(day_end))).fetchall()
+        movements = [(row[0], row[1], round(row[2], 6)) for row in rows]
+        results.append((placed[0], paid[0], movements))
+    return results
+
+
+def run_epoch(engine, ranges, recorder):
+    results = []
+    for shift_start, shift_end, day_start, day_end in ranges:
+        with recorder.measure("shift: orders placed"):
+            placed = engine.summarize_orders(shift_start, shift_end)
+        with recorder.measure("day: orders paid"):
+            paid = engine.summarize_orders(day_start, day_end, paid=True)
+        with recorder.measure("day: stock movements"):
+            rows = engine.summarize_inventory_movements(day_start, day_end)
+        movements = [(row[0], row[1], round(row[2], 6)) for row in rows]
+        results.append((placed[0], paid[0], movements))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shift and day range queries: TEXT columns vs epoch-ms columns")
+    parser.add_argument("--db", help="existing database (default: build one)")
+    parser.add_argument("--orders", type=int, default=1000000, help="paid orders when building")
+    parser.add_argument("--inventory-logs", type=int, default=1000000, help="stock movements when building")
+    parser.add_argument("--days", type=int, default=365, help="days the built history is spread over")
+    parser.add_argument("--rounds", type=int, default=30, help="random shifts/days queried")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    db_path = args.db
+    if not db_path:
+        db_path = temp_db_path()
+        print(f"Building benchmark database at {db_path} ...")
+        build_database(db_path, history_orders=args.orders, history_days=args.days,
+                       inventory_logs=args.inventory_logs, progress=True)
+    engine = OrderEngine(db_path)
+    engine.initialize_database()  # migrates an older file, which backfills the epoch columns
+    ranges = windows(engine, args.rounds, args.seed)
+    sizes = f"{count_rows(db_path, 'orders')} orders, {count_rows(db_path, 'inventory_logs')} inventory logs"
+
+    before = LatencyRecorder()
+    text_results = run_text(engine, ranges, before)
+    before.report(f"TEXT columns ({sizes})")
+    after = LatencyRecorder()
+    epoch_results = run_epoch(engine, ranges, after)
+    after.report(f"Epoch-ms columns ({sizes})")
+    engine.close()
+
+    if text_results != epoch_results:
+        raise SystemExit("MISMATCH: TEXT and epoch-ms range queries returned different results")
+    print("\nOK: both forms returned the same results")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+UI responsiveness stress test.
+
+Starts a (withdrawn) Tk root, keeps a 10 ms after() ticker running and measures
+how late each tick fires while DatabaseWorker runs heavy queries against a large
+database. Exits with status 1 if the worst event-loop delay exceeds --max-lag-ms.
+Needs a display (use xvfb-run on a headless machine).
+
+    python -m benchmarks.bench_ui_latency --history 50000 --requests 40
+"""
+import argparse
+import sys
+import time
+import tkinter as tk
+
+from db_worker import DatabaseWorker
+from benchmarks.common import build_database, percentile, temp_db_path
+
+TICK_MS = 10
+
+
+def heavy_request(engine):
+    """A deliberately expensive read: the whole kitchen history plus a per-dish aggregate"""
+    rows = engine.list_kitchen_items("All")
+    engine.read_cursor.execute("""
+        SELECT oi.dish_id, COUNT(*), SUM(oi.quantity), SUM(oi.subtotal)
+        FROM order_items oi
+        JOIN orders o ON oi.order_id = o.id
+        GROUP BY oi.dish_id
+    """)
+    return len(rows) + len(engine.read_cursor.fetchall())
+
+
+def run(db_path, requests):
+    """Return (tick lateness samples in seconds, request wall time)"""
+    root = tk.Tk()
+    root.withdraw()
+    worker = DatabaseWorker(root, db_path)
+
+    lateness = []
+    state = {"done": 0, "expected": time.perf_counter() + TICK_MS / 1000.0, "started": time.perf_counter()}
+
+    def tick():
+        now = time.perf_counter()
+        lateness.append(max(0.0, now - state["expected"]))
+        state["expected"] = now + TICK_MS / 1000.0
+        root.after(TICK_MS, tick)
+
+    def finished(_):
+        state["done"] += 1
+        if state["done"] == requests:
+            state["elapsed"] = time.perf_counter() - state["started"]
+            root.quit()
+
+    root.after(TICK_MS, tick)
+    for _ in range(requests):
+        worker.submit(heavy_request, finished, lambda e: print(f"Request failed: {e}"))
+    root.mainloop()
+
+    worker.close()
+    root.destroy()
+    return lateness, state.get("elapsed", 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Tk event-loop latency under database load")
+    parser.add_argument("--db", help="existing database to use (default: build a temporary one)")
+    parser.add_argument("--history", type=int, default=50000, help="paid orders to generate")
+    parser.add_argument("--requests", type=int, default=40, help="heavy requests to queue")
+    parser.add_argument("--max-lag-ms", type=float, default=100.0, help="fail above this event-loop delay")
+    args = parser.parse_args()
+
+    db_path = args.db
+    if not db_path:
+        db_path = temp_db_path()
+        print(f"Building benchmark database at {db_path} ...")
+        build_database(db_path, history_orders=args.history)
+
+    lateness, elapsed = run(db_path, args.requests)
+
+    worst = max(lateness) * 1000 if lateness else 0.0
+    print(f"\n{args.requests} heavy requests in {elapsed:.2f}s, {len(lateness)} ticks")
+    print(f"Event-loop delay: p50 {percentile(lateness, 50) * 1000:.1f} ms, "
+          f"p99 {percentile(lateness, 99) * 1000:.1f} ms, max {worst:.1f} ms")
+    if worst > args.max_lag_ms:
+        print(f"FAIL: event loop blocked for more than {args.max_lag_ms:.0f} ms")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
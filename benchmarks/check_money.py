@@ -0,0 +1,57 @@
+"""
+Amount parsing check.
+
+Runs money.to_cents over typed amounts, including ones that are not amounts
+or are too large for an INTEGER column ("1e27", 1e300, "inf"), and checks the
+fen value or the ValueError that every caller expects. Exits with status 1 on
+any mismatch.
+
+    python -m benchmarks.check_money
+"""
+import sys
+from decimal import Decimal
+
+from money import MAX_CENTS, to_cents
+
+# (input, expected fen or ValueError)
+CASES = (
+    ("12.5", 1250),
+    (12.5, 1250),
+    (" 0.005 ", 1),
+    ("-0.015", -2),
+    (Decimal("19.99"), 1999),
+    (7, 700),
+    ("92233720368547758.07", MAX_CENTS),
+    ("92233720368547758.08", ValueError),
+    ("1e27", ValueError),
+    (1e300, ValueError),
+    ("-1e27", ValueError),
+    ("1e999999999", ValueError),
+    ("1e-999999999", 0),
+    ("inf", ValueError),
+    ("nan", ValueError),
+    ("abc", ValueError),
+    ("", ValueError),
+)
+
+
+def main():
+    failures = 0
+    for value, expected in CASES:
+        try:
+            result = to_cents(value)
+        except ValueError:
+            result = ValueError
+        except Exception as e:
+            result = f"{type(e).__name__}: {e}"
+        if result != expected:
+            failures += 1
+            print(f"to_cents({value!r}): got {result}, expected {expected}")
+    if failures:
+        print(f"{failures} of {len(CASES)} amounts parsed wrongly")
+        sys.exit(1)
+    print(f"OK: {len(CASES)} amounts parsed as expected")
+
+
+if __name__ == "__main__":
+    main()
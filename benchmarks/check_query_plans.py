@@ -0,0 +1,40 @@
+"""
+Query plan check.
+
+Migrates a database (a fresh temporary one by default) and runs EXPLAIN QUERY PLAN
+for every query registered in order_engine.HOT_QUERIES,
+analytics.ANALYTICS_QUERIES and reports.REPORT_QUERIES. Exits with status 1 if
+any of them falls back to a full table SCAN.
+
+    python -m benchmarks.check_query_plans [--db restaurant_system.db]
+"""
+import argparse
+import sys
+
+from analytics import ANALYTICS_QUERIES
+from migrations import find_scans
+from order_engine import HOT_QUERIES, OrderEngine
+from reports import REPORT_QUERIES
+from benchmarks.common import temp_db_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if a hot query plans a full table scan")
+    parser.add_argument("--db", help="database file to check (default: a fresh temporary file)")
+    args = parser.parse_args()
+
+    engine = OrderEngine(args.db or temp_db_path())
+    engine.initialize_database()
+    queries = HOT_QUERIES + ANALYTICS_QUERIES + REPORT_QUERIES
+    violations = find_scans(engine.connection, queries)
+    engine.close()
+
+    for name, detail in violations:
+        print(f"FAIL {name}: {detail}")
+    if violations:
+        sys.exit(1)
+    print(f"OK: {len(queries)} hot queries use indexes")
+
+
+if __name__ == "__main__":
+    main()
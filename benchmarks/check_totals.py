@@ -0,0 +1,49 @@
+"""
+Order total drift check.
+
+Recomputes every order total and every table's open balance from order_items
+in bulk and compares them with the trigger-maintained columns. Amounts are
+integer fen, so any difference is drift. Exits with
+status 1 when anything drifted; --fix overwrites the drifted values.
+
+    python -m benchmarks.check_totals [--db restaurant_system.db] [--fix]
+"""
+import argparse
+import sys
+
+from money import format_money
+from order_engine import DEFAULT_DB_PATH, OrderEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report (and optionally repair) drifted order totals and table balances")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="database file to check")
+    parser.add_argument("--fix", action="store_true", help="overwrite drifted values with the recomputed ones")
+    args = parser.parse_args()
+
+    engine = OrderEngine(args.db)
+    engine.initialize_database()
+    orders, tables = engine.find_total_drift()
+
+    for row in orders:
+        print(f"order {row['id']} ({row['status']}): recorded {format_money(row['recorded'])}, "
+              f"expected {format_money(row['expected'])}")
+    for row in tables:
+        print(f"table {row['table_number']}: open balance {format_money(row['recorded'])}, "
+              f"expected {format_money(row['expected'])}")
+
+    if not orders and not tables:
+        engine.close()
+        print("OK: all order totals and table balances match their items")
+        return
+
+    print(f"{len(orders)} order totals and {len(tables)} table balances drifted")
+    if args.fix:
+        fixed_orders, fixed_tables = engine.repair_totals()
+        print(f"Fixed {fixed_orders} order totals and {fixed_tables} table balances")
+    engine.close()
+    sys.exit(0 if args.fix else 1)
+
+
+if __name__ == "__main__":
+    main()
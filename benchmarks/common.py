@@ -0,0 +1,186 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from order_engine import OrderEngine, epoch_ms, now_stamps
+from reports import rebuild_rollups
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class LatencyRecorder:
+    """Collect per-operation latencies (in seconds) and print a summary table"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    @contextmanager
+    def measure(self, operation):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[operation].append(time.perf_counter() - start)
+
+    def merge(self, samples):
+        """Add samples collected elsewhere (e.g. another process): {operation: [seconds, ...]}"""
+        for operation, values in samples.items():
+            self.samples[operation].extend(values)
+
+    def report(self, title):
+        print(f"\n{title}")
+        print(f"{'Operation':<24} {'Count':>8} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'max ms':>10} {'ops/sec':>10}")
+        print("-" * 88)
+        for operation, samples in self.samples.items():
+            total = sum(samples)
+            rate = len(samples) / total if total else 0
+            print(f"{operation:<24} {len(samples):>8} {percentile(samples, 50) * 1000:>10.3f} "
+                  f"{percentile(samples, 90) * 1000:>10.3f} {percentile(samples, 99) * 1000:>10.3f} "
+                  f"{max(samples) * 1000:>10.3f} {rate:>10.0f}")
+
+
+def temp_db_path(name="bench.db"):
+    """Path of a fresh database file inside a temporary directory"""
+    return os.path.join(tempfile.mkdtemp(prefix="rms_bench_"), name)
+
+
+# Relative share of orders per opening hour: a lunch peak and a bigger dinner rush
+SERVICE_HOURS = {11: 4, 12: 10, 13: 7, 14: 2, 17: 3, 18: 8, 19: 12, 20: 9, 21: 4}
+PAYMENT_METHODS = ("Cash Payment", "WeChat Pay", "Alipay")
+
+
+def service_timestamp(rng, day):
+    """A random time within the opening hours of `day`, weighted by SERVICE_HOURS"""
+    hour = rng.choices(list(SERVICE_HOURS), weights=list(SERVICE_HOURS.values()))[0]
+    return day.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60), microsecond=0)
+
+
+def build_database(db_path, tables=100, dishes=300, ingredients=80, history_orders=20000, seed=42, history_days=0,
+                   inventory_logs=0, progress=False):
+    """
+    Create the schema and fill it with a realistic amount of data:
+    a large menu with 3-6 ingredient recipes, plenty of tables and a paid order history.
+    history_days spreads the history over that many past days, within opening hours
+    (0: everything is stamped now); inventory_logs adds that many stock movements.
+    """
+    rng = random.Random(seed)
+    engine = OrderEngine(db_path)
+    engine.initialize_database()
+    cursor = engine.cursor
+
+    cursor.executemany(
+        "INSERT INTO tables (table_number, capacity) VALUES (?, ?)",
+        [(f"Bench Table {n}", rng.choice((2, 4, 6, 8))) for n in range(1, tables + 1)]
+    )
+    cursor.executemany(
+        "INSERT INTO ingredients (name, unit, stock, low_stock_threshold) VALUES (?, 'kg', ?, 1)",
+        [(f"Bench Ingredient {n}", 1e9) for n in range(1, ingredients + 1)]
+    )
+    cursor.execute("SELECT id FROM ingredients WHERE name LIKE 'Bench Ingredient %'")
+    ingredient_ids = [row['id'] for row in cursor.fetchall()]
+
+    prices = [rng.randint(12, 98) * 100 + rng.choice((0, 0, 50, 80)) for _ in range(dishes)]
+    cursor.executemany(
+        "INSERT INTO dishes (name, price, price_cents, category, description) VALUES (?, ?, ?, ?, '')",
+        [(f"Bench Dish {n}", price / 100, price, rng.choice(("Hot", "Cold", "Soup", "Staple")))
+         for n, price in enumerate(prices, 1)]
+    )
+    cursor.execute("SELECT id, price_cents FROM dishes WHERE name LIKE 'Bench Dish %'")
+    menu = [(row['id'], row['price_cents']) for row in cursor.fetchall()]
+
+    recipes = []
+    for dish_id, _ in menu:
+        for ingredient_id in rng.sample(ingredient_ids, rng.randint(3, 6)):
+            recipes.append((dish_id, ingredient_id, round(rng.uniform(0.01, 0.4), 3)))
+    cursor.executemany("INSERT INTO dish_ingredients (dish_id, ingredient_id, quantity) VALUES (?, ?, ?)", recipes)
+
+    cursor.execute("SELECT id FROM tables")
+    table_ids = [row['id'] for row in cursor.fetchall()]
+
+    # Paid history, inserted and committed in chunks to keep memory and the WAL flat
+    timestamp, timestamp_ms = checkout_time, checkout_ms = now_stamps()
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    chunk = 5000
+    for start in range(0, history_orders, chunk):
+        count = min(chunk, history_orders - start)
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM orders")
+        first_id = cursor.fetchone()[0] + 1
+        orders, items = [], []
+        for order_id in range(first_id, first_id + count):
+            if history_days:
+                # Oldest first, so order ids follow time as they do in production
+                days_ago = history_days - int(history_days * (order_id - first_id + start) / history_orders)
+                ordered_at = service_timestamp(rng, today - timedelta(days=days_ago))
+                checkout_at = ordered_at + timedelta(minutes=rng.randint(25, 90))
+                timestamp, timestamp_ms = ordered_at.strftime('%Y-%m-%d %H:%M:%S'), epoch_ms(ordered_at)
+                checkout_time, checkout_ms = checkout_at.strftime('%Y-%m-%d %H:%M:%S'), epoch_ms(checkout_at)
+            total = 0
+            for dish_id, price in rng.sample(menu, rng.randint(1, 6)):
+                quantity = rng.randint(1, 3)
+                items.append((order_id, dish_id, quantity, price * quantity / 100, price * quantity, 'Completed'))
+                total += price * quantity
+            orders.append((order_id, rng.choice(table_ids), "History", timestamp, timestamp_ms, 'Paid',
+                           checkout_time, checkout_ms, rng.choice(PAYMENT_METHODS), total, total / 100, total))
+        # total_cents starts at 0, the order_items triggers add the subtotals
+        cursor.executemany("""
+            INSERT INTO orders (id, table_id, created_by, order_date, order_ts, total_amount, total_cents, status,
+                                checkout_time, checkout_ts, payment_method, paid_cents, received_amount,
+                                received_cents, change_amount, change_cents)
+            VALUES (?, ?, ?, ?, ?, 0, 0, ?, ?, ?, ?, ?, ?, ?, 0, 0)
+        """, orders)
+        cursor.executemany("""
+            INSERT INTO order_items (order_id, dish_id, quantity, subtotal, subtotal_cents, status)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, items)
+        engine.connection.commit()
+        if progress:
+            print(f"  {start + count} / {history_orders} orders")
+
+    # Stock movements over the same period
+    for start in range(0, inventory_logs, chunk):
+        count = min(chunk, inventory_logs - start)
+        logs = []
+        for n in range(start, start + count):
+            if history_days:
+                days_ago = history_days - int(history_days * n / inventory_logs)
+                logged_at = service_timestamp(rng, today - timedelta(days=days_ago))
+                timestamp, timestamp_ms = logged_at.strftime('%Y-%m-%d %H:%M:%S'), epoch_ms(logged_at)
+            restock = rng.random() < 0.05
+            quantity = round(rng.uniform(5, 50) if restock else rng.uniform(0.01, 1.2), 3)
+            logs.append((rng.choice(ingredient_ids), 'Stock In' if restock else 'Stock Out', quantity,
+                         1e9, 1e9 + quantity if restock else 1e9 - quantity,
+                         'Restock' if restock else '订单消耗', "History", timestamp, timestamp_ms))
+        cursor.executemany("""
+            INSERT INTO inventory_logs
+            (ingredient_id, change_type, quantity, old_stock, new_stock, reason, created_by, created_at, created_ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, logs)
+        engine.connection.commit()
+        if progress:
+            print(f"  {start + count} / {inventory_logs} inventory logs")
+
+    engine.connection.commit()
+    # The history was inserted as Paid, so the checkout trigger never saw it
+    rebuild_rollups(engine.connection)
+    engine.close()
+    return [dish_id for dish_id, _ in menu]
+
+
+def count_rows(db_path, table):
+    connection = sqlite3.connect(db_path)
+    try:
+        return connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        connection.close()
@@ -0,0 +1,48 @@
+"""
+Synthetic restaurant generator.
+
+Fills a database (schema from migrations.py, same as the app) with realistic
+volumes: hundreds of tables, a large menu with dish_ingredients recipes, and
+millions of paid orders, order items and inventory movements spread over past
+opening hours with lunch and dinner peaks. Pair it with benchmarks.replay.
+
+    python -m benchmarks.generate_service_day --db rush.db --orders 2000000 --inventory-logs 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+from storage import close_all_pools
+from benchmarks.common import build_database, count_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a large synthetic restaurant database")
+    parser.add_argument("--db", required=True, help="database file to create")
+    parser.add_argument("--tables", type=int, default=300)
+    parser.add_argument("--dishes", type=int, default=800, help="menu size")
+    parser.add_argument("--ingredients", type=int, default=250)
+    parser.add_argument("--orders", type=int, default=1000000, help="paid orders in the history")
+    parser.add_argument("--days", type=int, default=365, help="days the history is spread over")
+    parser.add_argument("--inventory-logs", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        sys.exit(f"{args.db} already exists, choose a new file")
+
+    started = time.perf_counter()
+    build_database(args.db, tables=args.tables, dishes=args.dishes, ingredients=args.ingredients,
+                   history_orders=args.orders, seed=args.seed, history_days=args.days,
+                   inventory_logs=args.inventory_logs, progress=True)
+    close_all_pools()  # checkpoint the WAL into the database file
+    elapsed = time.perf_counter() - started
+
+    print(f"\nGenerated {args.db} in {elapsed:.1f}s ({os.path.getsize(args.db) / 2 ** 20:.0f} MiB)")
+    for table in ("tables", "dishes", "dish_ingredients", "ingredients", "orders", "order_items", "inventory_logs"):
+        print(f"  {table:<18} {count_rows(args.db, table):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Replay load test.
+
+Drives a timed stream of service cycles (create → add dishes → submit →
+start_preparation → mark_as_served → checkout) through OrderEngine from
+--workers processes, each acting as one terminal with its own tables. Cycles
+arrive at --rate per second (open loop). A worker that cannot keep up starts
+cycles late, and the schedule lag shows it. Reports throughput, per-operation
+latency percentiles and lock contention for each rate, so the scaling limit
+is the first rate where lag or locked errors climb.
+
+    python -m benchmarks.replay --db rush.db --workers 8 --rate 5 10 20 40 --duration 30
+"""
+import argparse
+import multiprocessing
+import random
+import time
+
+from order_engine import OrderEngine, OrderError
+from storage import PROFILES, close_all_pools, is_locked_error
+from benchmarks.common import LatencyRecorder, percentile
+
+
+def worker(db_path, profile_name, table_ids, dish_ids, start_at, duration, interval, offset,
+           dishes_per_order, think_time, seed):
+    """One terminal: start a cycle every `interval` seconds (shifted by `offset`) until the run ends"""
+    rng = random.Random(seed)
+    engine = OrderEngine(db_path, profile=PROFILES[profile_name])
+    recorder = LatencyRecorder()
+    stats = {"cycles": 0, "failed": 0, "locked": 0, "rejected": 0, "lag": []}
+
+    def step(operation, function, *args):
+        try:
+            with recorder.measure(operation):
+                result = function(*args)
+        except Exception as e:
+            if is_locked_error(e):
+                stats["locked"] += 1
+            elif isinstance(e, OrderError):
+                stats["rejected"] += 1
+            raise
+        if think_time:
+            time.sleep(think_time)
+        return result
+
+    n = 0
+    while True:
+        scheduled = start_at + offset + n * interval
+        if scheduled >= start_at + duration:
+            break
+        now = time.time()
+        if scheduled > now:
+            time.sleep(scheduled - now)
+        stats["lag"].append(max(0.0, time.time() - scheduled))
+
+        table_id = table_ids[n % len(table_ids)]
+        n += 1
+        cycle_started = time.perf_counter()
+        try:
+            step("create_order", engine.create_order, table_id, "Replay")
+            item_ids = [step("add_dish_to_order", engine.add_dish_to_order, table_id, dish_id, rng.randint(1, 2))
+                        for dish_id in rng.sample(dish_ids, rng.randint(1, dishes_per_order))]
+            step("submit_order", engine.submit_order, table_id)
+            for item_id in item_ids:
+                step("start_preparation", engine.start_preparation, item_id)
+            for item_id in item_ids:
+                step("mark_as_served", engine.mark_as_served, item_id)
+            bill = step("load_open_bill", engine.load_open_bill, table_id)
+            step("checkout", engine.checkout, table_id, [order['id'] for order in bill['orders']], "Cash Payment",
+                 bill['totals'])
+        except Exception as e:
+            if not (is_locked_error(e) or isinstance(e, OrderError)):
+                raise
+            stats["failed"] += 1
+            continue
+        recorder.samples["full cycle"].append(time.perf_counter() - cycle_started)
+        stats["cycles"] += 1
+
+    engine.close()
+    close_all_pools()
+    stats["samples"] = dict(recorder.samples)
+    return stats
+
+
+def run(db_path, profile_name, workers, rate, duration, dishes_per_order, think_time):
+    engine = OrderEngine(db_path, profile=PROFILES[profile_name])
+    table_ids = list(engine.get_table_map(orderable_only=True).values())
+    # Generated dishes only: their ingredients are stocked for millions of servings
+    dish_ids = [dish.id for dish in engine.list_available_dishes() if dish.name.startswith("Bench Dish")]
+    engine.close()
+    close_all_pools()
+
+    # Each worker gets every workers-th table and every workers-th arrival slot
+    interval = workers / rate
+    start_at = time.time() + 1.0
+    jobs = [(db_path, profile_name, table_ids[k::workers], dish_ids, start_at, duration, interval, k / rate,
+             dishes_per_order, think_time, k) for k in range(workers)]
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        results = pool.starmap(worker, jobs)
+
+    recorder = LatencyRecorder()
+    totals = {"cycles": 0, "failed": 0, "locked": 0, "rejected": 0, "lag": []}
+    for stats in results:
+        recorder.merge(stats.pop("samples"))
+        for key, value in stats.items():
+            totals[key] += value
+    return totals, recorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a timed stream of service cycles with N terminals")
+    parser.add_argument("--db", required=True, help="database to replay against (see benchmarks.generate_service_day)")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent terminal processes")
+    parser.add_argument("--rate", type=float, nargs="+", default=[5.0], help="cycles started per second, one run each")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per run")
+    parser.add_argument("--dishes-per-order", type=int, default=6, help="maximum dishes per order")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause after every step")
+    parser.add_argument("--profile", default="default", choices=list(PROFILES))
+    args = parser.parse_args()
+
+    summary = []
+    for rate in args.rate:
+        totals, recorder = run(args.db, args.profile, args.workers, rate, args.duration, args.dishes_per_order,
+                               args.think_ms / 1000.0)
+        recorder.report(f"Rate {rate:g} cycles/sec, {args.workers} workers, {args.duration:g}s ({args.profile} profile)")
+        writes = sum(len(samples) for operation, samples in recorder.samples.items()
+                     if operation not in ("load_open_bill", "full cycle"))
+        summary.append((rate, totals["cycles"] / args.duration, writes / args.duration, totals["failed"],
+                        totals["rejected"], totals["locked"], percentile(totals["lag"], 99) * 1000))
+
+    print(f"\n{'Target/s':>9} {'Cycles/s':>9} {'Writes/s':>9} {'Failed':>7} {'Rejected':>9} {'Locked':>7} {'p99 lag ms':>11}")
+    print("-" * 68)
+    for rate, cycles, writes, failed, rejected, locked, lag in summary:
+        print(f"{rate:>9g} {cycles:>9.1f} {writes:>9.1f} {failed:>7} {rejected:>9} {locked:>7} {lag:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
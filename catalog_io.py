@@ -0,0 +1,444 @@
+"""
+Bulk import and export of the catalog: tables, ingredients, dishes and recipes.
+
+Each kind is one CSV or JSON file (by extension), keyed by name:
+
+    tables       table_number, capacity, status
+    ingredients  name, unit, stock, low_stock_threshold
+    dishes       name, price, category, description, is_available
+    recipes      dish, ingredient, quantity
+
+Import streams the files row by row in dependency order (tables, ingredients,
+dishes, recipes) inside one transaction. Names are resolved to ids with
+in-memory maps loaded once, rows are validated as they are read, and each batch
+is written with executemany: updates for known names, inserts for new ones.
+Blank or missing fields keep the current value of an existing row. Any invalid
+row rolls the whole import back unless --skip-invalid is given. The
+catalog_version triggers fire as usual, so every menu cache reloads afterwards.
+
+Export streams the rows from a cursor, so no table is held in memory.
+
+    python catalog_io.py import --ingredients ingredients.csv --dishes dishes.csv --recipes recipes.csv
+    python catalog_io.py export --dishes dishes.json --recipes recipes.csv [--db restaurant_system.db]
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from collections import namedtuple
+
+from migrations import migrate
+from money import from_cents, to_cents
+from order_engine import DEFAULT_DB_PATH
+from storage import open_connection, profile_from_env
+
+KINDS = ("tables", "ingredients", "dishes", "recipes")
+TABLE_STATUSES = ("Free", "Occupied", "Reserved", "Under Maintenance")
+IMPORT_BATCH = 5000
+MAX_REPORTED_ERRORS = 20
+
+REQUIRED = object()
+
+# column in the file, parser, value for new rows when blank (REQUIRED: the row is rejected),
+# and the (database column, conversion) pairs it is written to
+Field = namedtuple("Field", "name parse default columns")
+
+
+class CatalogError(Exception):
+    """Invalid rows in an import; errors is a list of 'file:row: message' strings"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        shown = "\n".join(errors[:MAX_REPORTED_ERRORS])
+        more = len(errors) - MAX_REPORTED_ERRORS
+        super().__init__(f"{len(errors)} invalid rows:\n{shown}" + (f"\n... and {more} more" if more > 0 else ""))
+
+
+def parse_text(value):
+    return str(value).strip()
+
+
+def parse_count(value):
+    try:
+        number = int(str(value).strip())
+    except ValueError:
+        number = 0
+    if number <= 0:
+        raise ValueError(f"must be a positive whole number, got {value!r}")
+    return number
+
+
+def parse_quantity(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = -1.0
+    if not number >= 0 or number == float("inf"):
+        raise ValueError(f"must be a number >= 0, got {value!r}")
+    return number
+
+
+def parse_price(value):
+    try:
+        cents = to_cents(value)
+    except (ArithmeticError, ValueError):
+        cents = -1
+    if cents < 0:
+        raise ValueError(f"must be an amount >= 0, got {value!r}")
+    return cents
+
+
+def parse_flag(value):
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "y"):
+        return 1
+    if text in ("0", "false", "no", "n"):
+        return 0
+    raise ValueError(f"must be 1/0 or true/false, got {value!r}")
+
+
+def parse_status(value):
+    status = str(value).strip()
+    if status not in TABLE_STATUSES:
+        raise ValueError(f"must be one of {', '.join(TABLE_STATUSES)}, got {value!r}")
+    return status
+
+
+# kind -> (database table, key column, other fields)
+ENTITIES = {
+    "tables": ("tables", "table_number", [
+        Field("capacity", parse_count, REQUIRED, (("capacity", None),)),
+        Field("status", parse_status, "Free", (("status", None),)),
+    ]),
+    "ingredients": ("ingredients", "name", [
+        Field("unit", parse_text, REQUIRED, (("unit", None),)),
+        Field("stock", parse_quantity, 0.0, (("stock", None),)),
+        Field("low_stock_threshold", parse_quantity, 0.0, (("low_stock_threshold", None),)),
+    ]),
+    "dishes": ("dishes", "name", [
+        Field("price", parse_price, REQUIRED, (("price_cents", None), ("price", from_cents))),
+        Field("category", parse_text, None, (("category", None),)),
+        Field("description", parse_text, None, (("description", None),)),
+        Field("is_available", parse_flag, 1, (("is_available", None),)),
+    ]),
+}
+RECIPE_FIELDS = ("dish", "ingredient", "quantity")
+
+EXPORT_QUERIES = {
+    "tables": "SELECT table_number, capacity, status FROM tables ORDER BY id",
+    "ingredients": "SELECT name, unit, stock, low_stock_threshold FROM ingredients ORDER BY id",
+    "dishes": "SELECT name, price_cents, category, description, is_available FROM dishes ORDER BY id",
+    "recipes": """
+        SELECT d.name AS dish, i.name AS ingredient, di.quantity
+        FROM dish_ingredients di
+        JOIN dishes d ON d.id = di.dish_id
+        JOIN ingredients i ON i.id = di.ingredient_id
+        ORDER BY di.dish_id, di.id
+    """,
+}
+
+
+# -------------------------- Reading and writing files --------------------------
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in (".csv", ".json"):
+        raise ValueError(f"{path}: expected a .csv or .json file")
+    return extension[1:]
+
+
+def iter_json_array(handle, chunk_size=1 << 16):
+    """Yield the elements of a top-level JSON array one at a time, reading the file in chunks"""
+    decoder = json.JSONDecoder()
+    buffer = handle.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("expected a JSON array of objects")
+    buffer = buffer[1:]
+    while True:
+        # 1. Skip separators, refilling as needed
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        while not buffer:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                raise ValueError("unterminated JSON array")
+            buffer = chunk.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        # 2. Decode one element, reading more when it is cut off at the end of the buffer
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer)
+                break
+            except json.JSONDecodeError:
+                chunk = handle.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer += chunk
+        yield value
+        buffer = buffer[end:]
+
+
+def read_rows(path, columns):
+    """Yield (row number, {column: value or None}) from a CSV or JSON file, rejecting unknown columns"""
+    with open(path, newline="", encoding="utf-8-sig") as handle:
+        if file_format(path) == "csv":
+            reader = csv.DictReader(handle)
+            unknown = set(reader.fieldnames or ()) - set(columns)
+            if unknown:
+                raise ValueError(f"{path}: unknown columns {', '.join(sorted(unknown))}")
+            for row in reader:
+                yield reader.line_num, {column: (row.get(column) or None) for column in columns}
+        else:
+            for number, row in enumerate(iter_json_array(handle), 1):
+                if not isinstance(row, dict):
+                    raise ValueError(f"{path}: element {number} is not an object")
+                unknown = set(row) - set(columns)
+                if unknown:
+                    raise ValueError(f"{path}: unknown columns {', '.join(sorted(unknown))}")
+                yield number, {column: (None if row.get(column) in (None, "") else row.get(column))
+                               for column in columns}
+
+
+def write_rows(path, columns, rows):
+    """Write an iterable of tuples as CSV or as a JSON array, one row at a time; return the count"""
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        if file_format(path) == "csv":
+            writer = csv.writer(handle)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            handle.write("[")
+            for row in rows:
+                handle.write(",\n" if count else "\n")
+                handle.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+                count += 1
+            handle.write("\n]\n")
+    return count
+
+
+# -------------------------- Import --------------------------
+def load_ids(connection, table, key):
+    """{name: id} for a table; with duplicate names the oldest row wins"""
+    return {name: row_id for name, row_id in connection.execute(
+        f"SELECT {key}, MIN(id) FROM {table} GROUP BY {key}")}
+
+
+def _import_entity(cursor, kind, path, ids, errors):
+    """Upsert one kind from a file into the open transaction, return (inserted, updated)"""
+    table, key, fields = ENTITIES[kind]
+    columns = [column for field in fields for column, _ in field.columns]
+    update_sql = (f"UPDATE {table} SET " + ", ".join(f"{column} = COALESCE(?, {column})" for column in columns)
+                  + " WHERE id = ?")
+    insert_sql = (f"INSERT INTO {table} ({key}, {', '.join(columns)}) "
+                  f"VALUES (?, {', '.join('?' for _ in columns)})")
+
+    def db_values(values):
+        result = []
+        for field, value in zip(fields, values):
+            for _, convert in field.columns:
+                result.append(value if value is None or convert is None else convert(value))
+        return result
+
+    inserted = updated = 0
+    updates, new = [], {}
+
+    def flush():
+        nonlocal inserted, updated
+        cursor.executemany(update_sql, updates)
+        if new:
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            last_id = cursor.fetchone()[0]
+            cursor.executemany(insert_sql, [
+                [name] + db_values(field.default if value is None else value for field, value in zip(fields, values))
+                for name, values in new.items()
+            ])
+            cursor.execute(f"SELECT {key}, id FROM {table} WHERE id > ?", (last_id,))
+            ids.update(cursor.fetchall())
+        inserted += len(new)
+        updated += len(updates)
+        updates.clear()
+        new.clear()
+
+    for number, row in read_rows(path, [key] + [field.name for field in fields]):
+        try:
+            name = parse_text(row[key]) if row[key] is not None else ""
+            if not name:
+                raise ValueError(f"{key} is required")
+            values = []
+            for field in fields:
+                raw = row[field.name]
+                try:
+                    values.append(None if raw is None else field.parse(raw))
+                except ValueError as e:
+                    raise ValueError(f"{field.name} {e}")
+            if name in ids:
+                updates.append(db_values(values) + [ids[name]])
+            elif name in new:
+                # Same new name twice in a batch: later non-blank values win
+                new[name] = [old if value is None else value for old, value in zip(new[name], values)]
+            else:
+                missing = [field.name for field, value in zip(fields, values)
+                           if value is None and field.default is REQUIRED]
+                if missing:
+                    raise ValueError(f"new {kind[:-1]} '{name}' needs {', '.join(missing)}")
+                new[name] = values
+        except ValueError as e:
+            errors.append(f"{path}:{number}: {e}")
+            continue
+        if len(updates) + len(new) >= IMPORT_BATCH:
+            flush()
+    flush()
+    return inserted, updated
+
+
+def _import_recipes(cursor, path, dish_ids, ingredient_ids, errors, replace=False):
+    """
+    Upsert recipe lines (dish, ingredient, quantity) into the open transaction, return (lines, dishes).
+    With replace, a dish's existing lines are deleted the first time it appears in the file.
+    """
+    lines, seen = [], set()
+    replaced = []
+    total = 0
+
+    def flush():
+        nonlocal total
+        cursor.executemany("DELETE FROM dish_ingredients WHERE dish_id = ?", replaced)
+        cursor.executemany("""
+            INSERT INTO dish_ingredients (dish_id, ingredient_id, quantity) VALUES (?, ?, ?)
+            ON CONFLICT (dish_id, ingredient_id) DO UPDATE SET quantity = excluded.quantity
+        """, lines)
+        total += len(lines)
+        replaced.clear()
+        lines.clear()
+
+    for number, row in read_rows(path, RECIPE_FIELDS):
+        try:
+            dish = parse_text(row['dish'] or "")
+            ingredient = parse_text(row['ingredient'] or "")
+            if dish not in dish_ids:
+                raise ValueError(f"unknown dish '{dish}'")
+            if ingredient not in ingredient_ids:
+                raise ValueError(f"unknown ingredient '{ingredient}'")
+            if row['quantity'] is None:
+                raise ValueError("quantity is required")
+            quantity = parse_quantity(row['quantity'])
+        except ValueError as e:
+            errors.append(f"{path}:{number}: {e}")
+            continue
+        dish_id = dish_ids[dish]
+        if dish_id not in seen:
+            seen.add(dish_id)
+            if replace:
+                replaced.append((dish_id,))
+        lines.append((dish_id, ingredient_ids[ingredient], quantity))
+        if len(lines) >= IMPORT_BATCH:
+            flush()
+    flush()
+    return total, len(seen)
+
+
+def import_catalog(connection, paths, skip_invalid=False, replace_recipes=False):
+    """
+    Import {kind: path} in one transaction, in KINDS order so recipes can name dishes and
+    ingredients from the same run. Return {kind: (inserted, updated)} (recipes: (lines, dishes))
+    and the list of invalid rows; raise CatalogError (nothing written) on invalid rows
+    unless skip_invalid.
+    """
+    errors = []
+    results = {}
+    cursor = connection.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        maps = {}
+        for kind in KINDS:
+            if kind == "recipes":
+                if kind in paths:
+                    dish_ids = maps.get("dishes") or load_ids(connection, "dishes", "name")
+                    ingredient_ids = maps.get("ingredients") or load_ids(connection, "ingredients", "name")
+                    results[kind] = _import_recipes(cursor, paths[kind], dish_ids, ingredient_ids, errors,
+                                                    replace_recipes)
+                continue
+            if kind in paths or (kind in ("dishes", "ingredients") and "recipes" in paths):
+                table, key, _ = ENTITIES[kind]
+                maps[kind] = load_ids(connection, table, key)
+            if kind in paths:
+                results[kind] = _import_entity(cursor, kind, paths[kind], maps[kind], errors)
+        if errors and not skip_invalid:
+            raise CatalogError(errors)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return results, errors
+
+
+# -------------------------- Export --------------------------
+def export_rows(connection, kind):
+    """(columns, row iterator) for one kind; the cursor is consumed as the file is written"""
+    cursor = connection.execute(EXPORT_QUERIES[kind])
+    if kind == "dishes":
+        return ("name", "price", "category", "description", "is_available"), (
+            (name, from_cents(price_cents), category, description, is_available)
+            for name, price_cents, category, description, is_available in cursor
+        )
+    return tuple(description[0] for description in cursor.description), (tuple(row) for row in cursor)
+
+
+def export_catalog(connection, paths):
+    """Write {kind: path}; return {kind: rows written}"""
+    results = {}
+    for kind in KINDS:
+        if kind in paths:
+            columns, rows = export_rows(connection, kind)
+            results[kind] = write_rows(paths[kind], columns, rows)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import or export tables, ingredients, dishes and recipes")
+    parser.add_argument("action", choices=("import", "export"))
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="database file")
+    for kind in KINDS:
+        parser.add_argument(f"--{kind}", metavar="FILE", help=f"{kind} file (.csv or .json)")
+    parser.add_argument("--skip-invalid", action="store_true", help="import the valid rows and report the others")
+    parser.add_argument("--replace-recipes", action="store_true",
+                        help="a dish in the recipes file loses the lines the file does not list")
+    args = parser.parse_args()
+
+    paths = {kind: getattr(args, kind) for kind in KINDS if getattr(args, kind)}
+    if not paths:
+        parser.error("give at least one of " + ", ".join(f"--{kind}" for kind in KINDS))
+
+    started = time.perf_counter()
+    if args.action == "export":
+        connection = open_connection(args.db, profile_from_env(), readonly=True)
+        counts = export_catalog(connection, paths)
+        connection.close()
+        for kind, count in counts.items():
+            print(f"Exported {count} {kind} to {paths[kind]}")
+    else:
+        connection = open_connection(args.db, profile_from_env())
+        migrate(connection)
+        try:
+            results, errors = import_catalog(connection, paths, args.skip_invalid, args.replace_recipes)
+        except (CatalogError, ValueError) as e:
+            connection.close()
+            raise SystemExit(f"Import failed, nothing was written: {e}")
+        connection.close()
+        for error in errors[:MAX_REPORTED_ERRORS]:
+            print(f"  skipped {error}")
+        for kind, (first, second) in results.items():
+            if kind == "recipes":
+                print(f"Imported {first} recipe lines for {second} dishes")
+            else:
+                print(f"Imported {kind}: {first} new, {second} updated")
+        if errors:
+            print(f"{len(errors)} invalid rows skipped")
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
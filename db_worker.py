@@ -0,0 +1,117 @@
+"""
+Background database executor for the Tk front end.
+
+All SQLite work runs on one dedicated thread that owns its own OrderEngine
+(and therefore its own connection). The Tk thread submits functions that take
+the engine; their results or exceptions are queued back and delivered to the
+callbacks on the Tk thread through root.after, so the main loop never blocks
+on a slow query or a locked database.
+
+Opening the engine is reported like a background request: if it fails, the
+error goes to on_error and every queued or later request fails with it
+instead of waiting forever.
+"""
+import queue
+import threading
+
+from order_engine import OrderEngine
+
+POLL_INTERVAL_MS = 15
+
+
+class DatabaseWorker:
+    def __init__(self, root, db_path, on_busy_change=None, on_error=None):
+        self.root = root
+        self.db_path = db_path
+        self.on_busy_change = on_busy_change  # called with True/False when work starts/finishes
+        self.on_error = on_error  # default error callback for submissions without one
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._pending = 1  # submitted requests whose callbacks have not run yet (starting with the engine startup)
+        self._visible = 0  # the ones that show the busy indicator
+        self._polling = True
+        self.startup_error = None  # set on the database thread when the engine could not be opened
+        self._thread = threading.Thread(target=self._run, name="db-worker", daemon=True)
+        self._thread.start()
+        self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    @property
+    def busy(self):
+        return self._visible > 0
+
+    def _run(self):
+        # The connection must be created on the thread that uses it
+        try:
+            engine = OrderEngine(self.db_path)
+        except Exception as e:
+            print(f"Database thread could not open {self.db_path}: {e}")
+            self.startup_error = e
+            self._results.put((self.on_error, e, True))
+            self._fail_requests(e)
+            return
+        self._results.put((None, None, True))
+        try:
+            while True:
+                request = self._requests.get()
+                if request is None:
+                    break
+                work, on_done, on_error, background = request
+                try:
+                    result = work(engine)
+                except Exception as e:
+                    self._results.put((on_error or self.on_error, e, background))
+                else:
+                    self._results.put((on_done, result, background))
+        finally:
+            engine.close()
+
+    def _fail_requests(self, error):
+        """Without an engine, answer every request with the startup error until close()"""
+        while True:
+            request = self._requests.get()
+            if request is None:
+                break
+            _, _, on_error, background = request
+            self._results.put((on_error or self.on_error, error, background))
+
+    def submit(self, work, on_done=None, on_error=None, background=False):
+        """
+        Queue work(engine) on the database thread. Requests run in submission order;
+        on_done(result) or on_error(exception) is later called on the Tk thread.
+        background requests (periodic polls) do not show the busy indicator.
+        """
+        self._pending += 1
+        if not background:
+            self._visible += 1
+            if self._visible == 1 and self.on_busy_change:
+                self.on_busy_change(True)
+        self._requests.put((work, on_done, on_error, background))
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self):
+        """Deliver finished results on the Tk thread; keeps polling only while requests are in flight"""
+        try:
+            while True:
+                try:
+                    callback, value, background = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                self._pending -= 1
+                if not background:
+                    self._visible -= 1
+                    if self._visible == 0 and self.on_busy_change:
+                        self.on_busy_change(False)
+                if callback:
+                    callback(value)
+        finally:
+            if self._pending:
+                self.root.after(POLL_INTERVAL_MS, self._poll)
+            else:
+                self._polling = False
+
+    def close(self, timeout=5):
+        """Stop the thread after the queued requests have run"""
+        self._requests.put(None)
+        self._thread.join(timeout)
@@ -0,0 +1,301 @@
+"""
+SQL tracing, slow-query log and action timing.
+
+Every connection opened by storage.py is a TracingConnection whose cursors time
+execute/executemany/commit and count the rows fetched or changed, per
+normalized statement. While tracing is on, set_trace_callback additionally
+counts every statement SQLite actually runs, including implicit BEGINs and
+statements fired by triggers. RestaurantApp action methods are wrapped with
+timed(), and run_db times the database part of each action on the worker thread.
+
+Tracing is off by default (RMS_TRACE=1 turns it on at startup). When off, the
+only cost is one flag check per call.
+"""
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from functools import lru_cache, wraps
+import sqlite3
+
+# Histogram bucket upper bounds in seconds: 50 µs doubling up to ~13 s
+BUCKET_BOUNDS = [0.00005 * 2 ** i for i in range(19)]
+DEFAULT_SLOW_MS = float(os.environ.get("RMS_SLOW_MS", "50"))
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def normalize_sql(sql):
+    """One key per statement shape: literals become ?, placeholder lists collapse, whitespace is squeezed"""
+    sql = _LITERALS.sub("?", sql)
+    sql = _PLACEHOLDER_LISTS.sub("?, ...", sql)
+    return _WHITESPACE.sub(" ", sql).strip()[:300]
+
+
+class LatencyHistogram:
+    """Fixed log-scale buckets; percentiles are reported as the bucket upper bound"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.traced = 0  # executions seen by the trace callback (statements only)
+
+    def observe(self, seconds, rows=0):
+        self.buckets[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.rows += rows
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct):
+        if not self.count:
+            return 0.0
+        target = pct / 100.0 * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "traced": self.traced,
+            "rows": self.rows,
+            "total_ms": round(self.total * 1000, 3),
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p90_ms": round(self.percentile(90) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "buckets": {f"<={bound * 1000:g}ms": n for bound, n in zip(BUCKET_BOUNDS, self.buckets) if n},
+        }
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = DEFAULT_SLOW_MS
+        self.statements = {}  # normalized sql -> LatencyHistogram
+        self.actions = {}  # action name -> LatencyHistogram
+        self.slow_queries = deque(maxlen=200)
+        self.started = None
+        self._connections = {}  # id -> connection, for installing the trace callback
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # -------------------------- Switching --------------------------
+    def enable(self):
+        with self._lock:
+            self.enabled = True
+            self.started = self.started or datetime.now().isoformat(timespec="seconds")
+            for connection in self._connections.values():
+                connection.set_trace_callback(self._trace)
+
+    def disable(self):
+        with self._lock:
+            self.enabled = False
+            for connection in self._connections.values():
+                connection.set_trace_callback(None)
+
+    def reset(self):
+        with self._lock:
+            self.statements = {}
+            self.actions = {}
+            self.slow_queries.clear()
+            self.started = datetime.now().isoformat(timespec="seconds") if self.enabled else None
+
+    def register(self, connection):
+        with self._lock:
+            self._connections[id(connection)] = connection
+            if self.enabled:
+                connection.set_trace_callback(self._trace)
+
+    def unregister(self, connection):
+        with self._lock:
+            self._connections.pop(id(connection), None)
+
+    # -------------------------- Recording --------------------------
+    def _trace(self, sql):
+        key = normalize_sql(sql)
+        with self._lock:
+            histogram = self.statements.get(key)
+            if histogram is None:
+                histogram = self.statements[key] = LatencyHistogram()
+            histogram.traced += 1
+
+    def record_statement(self, sql, seconds, rows=0):
+        """Record one execution; return the statement key"""
+        key = normalize_sql(sql)
+        with self._lock:
+            histogram = self.statements.get(key)
+            if histogram is None:
+                histogram = self.statements[key] = LatencyHistogram()
+            histogram.observe(seconds, rows)
+            if seconds * 1000 >= self.slow_ms:
+                action = getattr(self._local, "action", None)
+                self.slow_queries.append({
+                    "time": datetime.now().isoformat(timespec="milliseconds"),
+                    "ms": round(seconds * 1000, 3),
+                    "rows": rows,
+                    "action": action,
+                    "sql": key,
+                })
+                print(f"[slow query] {seconds * 1000:.1f} ms ({action or 'no action'}): {key}")
+        return key
+
+    def record_rows(self, key, seconds, rows):
+        """Rows fetched from a SELECT (and the time spent stepping through them) count towards that statement"""
+        with self._lock:
+            histogram = self.statements.get(key)
+            if histogram is not None:
+                histogram.rows += rows
+                histogram.total += seconds
+
+    def record_action(self, name, seconds):
+        with self._lock:
+            histogram = self.actions.get(name)
+            if histogram is None:
+                histogram = self.actions[name] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    @property
+    def current_action(self):
+        return getattr(self._local, "action", None)
+
+    def run_action(self, name, work, *args):
+        """Run work(*args) attributed to action `name` (on the calling thread) and time it as "db:<name>" """
+        previous = getattr(self._local, "action", None)
+        self._local.action = name
+        started = time.perf_counter()
+        try:
+            return work(*args)
+        finally:
+            self.record_action(f"db:{name}", time.perf_counter() - started)
+            self._local.action = previous
+
+    # -------------------------- Reporting --------------------------
+    def snapshot(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "since": self.started,
+                "slow_ms": self.slow_ms,
+                "statements": {sql: histogram.to_dict() for sql, histogram in self.statements.items()},
+                "actions": {name: histogram.to_dict() for name, histogram in self.actions.items()},
+                "slow_queries": list(self.slow_queries),
+            }
+
+    def dump_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+
+profiler = Profiler()
+if os.environ.get("RMS_TRACE") == "1":
+    profiler.enable()
+
+
+def timed(name, method):
+    """Wrap a UI action so its Tk-thread time is recorded as "ui:<name>" and its run_db work as "db:<name>" """
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        if not profiler.enabled:
+            return method(*args, **kwargs)
+        local = profiler._local
+        previous = getattr(local, "action", None)
+        local.action = name
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            profiler.record_action(f"ui:{name}", time.perf_counter() - started)
+            local.action = previous
+    return wrapper
+
+
+class TracingCursor(sqlite3.Cursor):
+    """Times execute/executemany; rows are counted from rowcount (DML) or the fetch* calls (SELECT)"""
+    _key = None
+
+    def execute(self, sql, parameters=()):
+        if not profiler.enabled:
+            return super().execute(sql, parameters)
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self._key = profiler.record_statement(sql, time.perf_counter() - started, max(self.rowcount, 0))
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        if not profiler.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._key = profiler.record_statement(sql, time.perf_counter() - started, max(self.rowcount, 0))
+        return self
+
+    def fetchone(self):
+        if self._key is None or not profiler.enabled:
+            return super().fetchone()
+        started = time.perf_counter()
+        row = super().fetchone()
+        profiler.record_rows(self._key, time.perf_counter() - started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        if self._key is None or not profiler.enabled:
+            return super().fetchmany(size or self.arraysize)
+        started = time.perf_counter()
+        rows = super().fetchmany(size or self.arraysize)
+        profiler.record_rows(self._key, time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        if self._key is None or not profiler.enabled:
+            return super().fetchall()
+        started = time.perf_counter()
+        rows = super().fetchall()
+        profiler.record_rows(self._key, time.perf_counter() - started, len(rows))
+        return rows
+
+
+class TracingConnection(sqlite3.Connection):
+    """
+    Connection whose cursors, including the ones behind connection.execute(), are TracingCursors.
+    Passed as the factory by storage.open_connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        profiler.register(self)
+
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        if not profiler.enabled:
+            return super().commit()
+        started = time.perf_counter()
+        super().commit()
+        profiler.record_statement("COMMIT", time.perf_counter() - started)
+
+    def close(self):
+        profiler.unregister(self)
+        super().close()
@@ -0,0 +1,144 @@
+"""
+Kitchen ticket scheduler.
+
+Pending order items are kept in a binary heap keyed by their start-by time:
+the order's target ready time minus the dish's estimated prep time. The target
+is the order time plus the SLA, pushed back when one of the order's dishes
+takes longer than that. A long dish therefore comes up before the quick dishes
+of the same table, so the table's dishes finish together, and the tickets
+closest to breaching the SLA are always at the top. Prep estimates are learned
+from the In Progress -> Completed timestamps (see migrations.py).
+
+Adding, updating and removing a ticket are O(log n). Removed entries are only
+marked, and the heap is rebuilt once they make up half of it. late_count()
+pops the tickets whose start-by time has passed off the heap, so a poll in
+which nothing became late costs a single comparison. The sorted list for the
+Kitchen View is only built when it is rendered after a change.
+"""
+import heapq
+
+DEFAULT_SLA_SECONDS = 20 * 60
+# Used for dishes that have not been cooked (and timed) yet
+DEFAULT_PREP_SECONDS = 10 * 60
+
+
+class KitchenScheduler:
+    def __init__(self, sla_seconds=DEFAULT_SLA_SECONDS, default_prep_seconds=DEFAULT_PREP_SECONDS):
+        self.sla_seconds = sla_seconds
+        self.default_prep_seconds = default_prep_seconds
+        self.prep_estimates = {}  # dish_id -> seconds
+        self._heap = []  # [start_by, item_id, live] entries of the tickets not late yet
+        self._entries = {}  # item_id -> current entry
+        self._late = set()  # item_ids popped off the heap by late_count
+        self._ordered = None  # sorted (start_by, item_id) list, built by ordered()
+        self._tickets = {}  # item_id -> (order_id, dish_id, ordered_at)
+        self._orders = {}  # order_id -> {item_id: prep seconds}
+        self._targets = {}  # order_id -> target ready time
+        self._removed = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item_id):
+        return item_id in self._entries
+
+    def clear(self):
+        self.__init__(self.sla_seconds, self.default_prep_seconds)
+
+    def set_estimates(self, estimates):
+        """Replace the per-dish prep estimates ({dish_id: seconds}) and re-key every queued ticket"""
+        if estimates == self.prep_estimates:
+            return
+        self.prep_estimates = dict(estimates)
+        tickets = self._tickets
+        self._heap, self._entries, self._tickets, self._orders, self._targets = [], {}, {}, {}, {}
+        self._late, self._ordered, self._removed = set(), None, 0
+        for item_id, (order_id, dish_id, ordered_at) in tickets.items():
+            self.push(item_id, order_id, dish_id, ordered_at)
+
+    def prep_seconds(self, dish_id):
+        return self.prep_estimates.get(dish_id, self.default_prep_seconds)
+
+    def push(self, item_id, order_id, dish_id, ordered_at):
+        """Queue a pending ticket, or update it if already queued"""
+        if item_id in self._tickets:
+            if self._tickets[item_id] == (order_id, dish_id, ordered_at):
+                return
+            self.remove(item_id)
+        prep = self.prep_seconds(dish_id)
+        self._tickets[item_id] = (order_id, dish_id, ordered_at)
+        order = self._orders.setdefault(order_id, {})
+        order[item_id] = prep
+        if self._retarget(order_id, ordered_at):
+            return
+        self._push_entry(item_id, self._targets[order_id] - prep)
+
+    def remove(self, item_id):
+        """Drop a ticket (started, removed or no longer shown); unknown IDs are ignored"""
+        ticket = self._tickets.pop(item_id, None)
+        if ticket is None:
+            return
+        order_id, _, ordered_at = ticket
+        self._drop_entry(item_id)
+        order = self._orders[order_id]
+        del order[item_id]
+        if not order:
+            del self._orders[order_id]
+            del self._targets[order_id]
+        else:
+            self._retarget(order_id, ordered_at)
+
+    def ordered(self):
+        """[(start_by, item_id)] of every queued ticket, most urgent first (kept until the next change)"""
+        if self._ordered is None:
+            self._ordered = sorted((entry[0], entry[1]) for entry in self._entries.values())
+        return self._ordered
+
+    def late_count(self, now):
+        """Number of tickets whose start-by time is before now (now must not go backwards)"""
+        heap = self._heap
+        while heap and (not heap[0][2] or heap[0][0] < now):
+            entry = heapq.heappop(heap)
+            if entry[2]:
+                self._late.add(entry[1])
+            else:
+                self._removed -= 1
+        return len(self._late)
+
+    # -------------------------- Internals --------------------------
+    def _retarget(self, order_id, ordered_at):
+        """
+        Recompute the order's target ready time; when it moved, re-key all of the order's tickets
+        and return True
+        """
+        order = self._orders[order_id]
+        target = ordered_at + max(self.sla_seconds, max(order.values()))
+        if self._targets.get(order_id) == target:
+            return False
+        self._targets[order_id] = target
+        for item_id, prep in order.items():
+            self._drop_entry(item_id)
+            self._push_entry(item_id, target - prep)
+        return True
+
+    def _push_entry(self, item_id, start_by):
+        entry = [start_by, item_id, True]
+        self._entries[item_id] = entry
+        heapq.heappush(self._heap, entry)
+        self._ordered = None
+
+    def _drop_entry(self, item_id):
+        entry = self._entries.pop(item_id, None)
+        if entry is None:
+            return
+        self._ordered = None
+        if item_id in self._late:
+            # Already popped off the heap
+            self._late.discard(item_id)
+            return
+        entry[2] = False
+        self._removed += 1
+        if self._removed > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if entry[2]]
+            heapq.heapify(self._heap)
+            self._removed = 0
@@ -1,9 +1,34 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
 import sqlite3
-from datetime import datetime
-from PIL import Image, ImageTk
 import os
+from datetime import datetime
+
+from db_worker import DatabaseWorker
+from diagnostics import profiler, timed
+from kitchen_scheduler import KitchenScheduler
+from money import format_money, to_cents
+from order_engine import DEFAULT_DB_PATH, OrderEngine, OrderError
+from refresh_scheduler import RefreshScheduler
+from reports import GROUPINGS as REPORT_GROUPINGS, period, rebuild_rollups, sales_summary
+from tree_binder import KeyedTreeBinder
+
+# How often the kitchen view pulls order item changes made by other terminals
+KITCHEN_POLL_MS = 1000
+
+# User actions timed by the profiler (Diagnostics tab), including timer-driven refreshes
+TIMED_ACTIONS = (
+    "add_table", "delete_table", "refresh_tables", "edit_table_status",
+    "on_table_selected", "refresh_table_combo", "create_order", "add_dish_to_order", "remove_one_dish",
+    "submit_order", "checkout_order",
+    "refresh_kitchen_orders", "pull_kitchen_changes", "start_preparation", "mark_as_served",
+    "refresh_kitchen_all_day", "start_batch", "complete_batch",
+    "update_kitchen_item_status",
+    "refresh_inventory", "refresh_dishes", "add_ingredient", "delete_ingredient", "update_ingredient",
+    "refresh_reports", "rebuild_reports",
+)
+REPORT_PERIODS = {"Today": 1, "Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90, "Last 365 days": 365}
+
 
 class RestaurantApp:
     def __init__(self, root):
@@ -11,22 +36,61 @@ class RestaurantApp:
         self.root.title("Restaurant Management System")
         self.root.geometry("1000x700")    
 
+        # Wrap the actions before anything (buttons, scheduler, timers) holds a reference to them
+        for name in TIMED_ACTIONS:
+            setattr(self, name, timed(name, getattr(self, name)))
+
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(fill=tk.BOTH, expand=True)
 
+        # Busy indicator, shown while database requests are in flight
+        self.busy_var = tk.StringVar(value="")
+        ttk.Label(root, textvariable=self.busy_var, anchor=tk.W).pack(side=tk.BOTTOM, fill=tk.X, padx=10)
+
         # Connect to SQLite database
         self.connect_to_database()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Current order status
         self.current_order_id = None
         self.current_order_items = {}
         self.is_transaction_active = False
 
-        # Create tabs
-        self.create_table_management_tab()
-        self.create_order_tab()
-        self.create_kitchen_tab()
-        self.create_inventory_tab()
+        # Views reloaded after actions; each is refreshed at most once per event-loop turn
+        self.refresh = RefreshScheduler(root)
+        self.refresh.register("tables", self.refresh_tables)
+        self.refresh.register("table_combo", self.refresh_table_combo)
+        self.refresh.register("order", self.on_table_selected)
+        self.refresh.register("kitchen", self.pull_kitchen_changes)
+        self.refresh.register("inventory", self.refresh_inventory)
+        self.refresh.register("dishes", self.refresh_dishes)
+        self.refresh.register("reports", self.refresh_reports)
+
+        # Create tabs: only the frames now, each tab is built and populated on first selection
+        self.built_tabs = set()
+        self.tab_builders = {}
+        for name, text, builder in [
+            ("tables", "Table Management", self.create_table_management_tab),
+            ("orders", "Order Management", self.create_order_tab),
+            ("kitchen", "Kitchen View", self.create_kitchen_tab),
+            ("inventory", "Inventory Management", self.create_inventory_tab),
+            ("reports", "Reports", self.create_reports_tab),
+            ("diagnostics", "Diagnostics", self.create_diagnostics_tab),
+        ]:
+            tab = ttk.Frame(self.notebook)
+            self.notebook.add(tab, text=text)
+            self.tab_builders[str(tab)] = (name, builder)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.on_tab_changed()
+
+    def on_tab_changed(self, event=None):
+        """Build the selected tab the first time it is shown"""
+        selected = str(self.notebook.select())
+        if selected not in self.tab_builders:
+            return
+        name, builder = self.tab_builders.pop(selected)
+        self.built_tabs.add(name)
+        builder(self.notebook.nametowidget(selected))
     
     # =========================================================================
     # Database Connection
@@ -34,159 +98,16 @@ class RestaurantApp:
 
     def connect_to_database(self):
         try:
-            self.connection = sqlite3.connect("restaurant_system.db")
-            self.connection.row_factory = sqlite3.Row
-            self.cursor = self.connection.cursor()
+            engine = OrderEngine(DEFAULT_DB_PATH)
             print("Database connection successful")
 
-            # -------------------------- Table Structure Creation --------------------------
-            # 1. Tables Table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS tables (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    table_number TEXT UNIQUE NOT NULL,
-                    capacity INTEGER NOT NULL,
-                    status TEXT NOT NULL CHECK(status IN ('Free', 'Occupied', 'Reserved', 'Under Maintenance')) DEFAULT 'Free'
-                )
-            ''')
-
-            # 2. Dishes Table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS dishes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    price REAL NOT NULL,
-                    category TEXT,
-                    description TEXT,
-                    is_available INTEGER DEFAULT 1
-                )
-            ''')
-
-            # 3. Ingredients Table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS ingredients (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    unit TEXT NOT NULL,
-                    stock REAL NOT NULL,
-                    low_stock_threshold REAL NOT NULL
-                )
-            ''')
-
-            # 4. Dish-Ingredients Association Table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS dish_ingredients (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    dish_id INTEGER NOT NULL,
-                    ingredient_id INTEGER NOT NULL,
-                    quantity REAL NOT NULL,
-                    FOREIGN KEY (dish_id) REFERENCES dishes(id) ON DELETE CASCADE,
-                    FOREIGN KEY (ingredient_id) REFERENCES ingredients(id) ON DELETE CASCADE,
-                    UNIQUE (dish_id, ingredient_id)
-                )
-            ''')
-
-            # 5. Orders Table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS orders (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    table_id INTEGER NOT NULL,
-                    created_by TEXT NOT NULL,
-                    order_date TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    total_amount REAL,
-                    status TEXT DEFAULT 'Placed',
-                    checkout_time TEXT,
-                    payment_method TEXT,
-                    received_amount REAL,
-                    change_amount REAL,
-                    FOREIGN KEY (table_id) REFERENCES tables(id) ON UPDATE CASCADE ON DELETE CASCADE
-                )
-            ''')
-
-            # 6. Order Items Table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS order_items (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    order_id INTEGER NOT NULL,
-                    dish_id INTEGER NOT NULL,
-                    quantity INTEGER NOT NULL,
-                    subtotal REAL NOT NULL,
-                    status TEXT DEFAULT 'Pending',
-                    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
-                    FOREIGN KEY (dish_id) REFERENCES dishes(id) ON UPDATE CASCADE
-                )
-            ''')
-
-            # 7. Inventory Logs Table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS inventory_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ingredient_id INTEGER NOT NULL,
-                    change_type TEXT NOT NULL CHECK(change_type IN ('Inbound','Outbound','Adjustment')),
-                    quantity REAL NOT NULL,
-                    old_stock REAL NOT NULL,
-                    new_stock REAL NOT NULL,
-                    reason TEXT,
-                    created_by TEXT NOT NULL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (ingredient_id) REFERENCES ingredients(id) ON UPDATE CASCADE
-                )
-            ''')
-            
-            self.cursor.execute("PRAGMA table_info(orders)")
-            order_columns = [row[1] for row in self.cursor.fetchall()]
-            if "received_amount" not in order_columns:
-                self.cursor.execute("ALTER TABLE orders ADD COLUMN received_amount REAL")
-            if "change_amount" not in order_columns:
-                self.cursor.execute("ALTER TABLE orders ADD COLUMN change_amount REAL")
-
-            # -------------------------- Data Initialization --------------------------
-            # Insert regular sample dishes
-            self.cursor.execute("SELECT COUNT(*) FROM dishes")
-            if self.cursor.fetchone()[0] == 0:
-                sample_dishes = [
-                    ("Kung Pao Chicken", 38.0, "Sichuan Cuisine", "Classic Sichuan dish, spicy and fragrant"),
-                    ("Yu-Shiang Shredded Pork", 32.0, "Sichuan Cuisine", "Yu-Shiang flavor, perfect with rice"),
-                    ("Mapo Tofu", 28.0, "Sichuan Cuisine", "Spicy and fragrant, tender tofu"),
-                    ("Twice-Cooked Pork", 36.0, "Sichuan Cuisine", "Fat but not greasy, spicy and delicious"),
-                    ("Boiled Fish with Spicy Sauce", 48.0, "Sichuan Cuisine", "Tender fish, spicy and fragrant")
-                ]
-                self.cursor.executemany("INSERT INTO dishes (name, price, category, description) VALUES (?, ?, ?, ?)", sample_dishes)
-
-            # Insert regular ingredients
-            self.cursor.execute("SELECT COUNT(*) FROM ingredients")
-            if self.cursor.fetchone()[0] == 0:
-                sample_ingredients = [
-                    ("Chicken", "kg", 50, 10), ("Pork", "kg", 40, 5), ("Tofu", "kg", 30, 5),
-                    ("Green Pepper", "kg", 20, 5), ("Onion", "kg", 15, 3), ("Chili Pepper", "kg", 10, 2),
-                    ("Peanuts", "kg", 10, 2), ("Fish Fillet", "kg", 20, 5), ("Garlic", "kg", 5, 1), ("Ginger", "kg", 5, 1)
-                ]
-                self.cursor.executemany("INSERT INTO ingredients (name, unit, stock, low_stock_threshold) VALUES (?, ?, ?, ?)", sample_ingredients)
-
-            # Insert regular recipes
-            self.cursor.execute("SELECT COUNT(*) FROM dish_ingredients")
-            if self.cursor.fetchone()[0] == 0:
-                sample_dish_ingredients = [
-                    (1, 1, 0.3), (1, 4, 0.1), (1, 5, 0.05), (1, 7, 0.05), # Kung Pao Chicken
-                    (2, 2, 0.3), (2, 4, 0.1), (2, 5, 0.05), (2, 9, 0.02), (2, 10, 0.01), # Yu-Shiang Shredded Pork
-                    (3, 3, 0.25), (3, 2, 0.05), (3, 6, 0.02), # Mapo Tofu
-                    (4, 2, 0.3), (4, 4, 0.1), (4, 9, 0.02), (4, 10, 0.01), # Twice-Cooked Pork
-                    (5, 8, 0.3), (5, 4, 0.1), (5, 9, 0.02), (5, 10, 0.01), (5, 6, 0.02) # Boiled Fish with Spicy Sauce
-                ]
-                self.cursor.executemany("INSERT INTO dish_ingredients (dish_id, ingredient_id, quantity) VALUES (?, ?, ?)", sample_dish_ingredients)
-
-            # Insert tables
-            self.cursor.execute("SELECT COUNT(*) FROM tables")
-            if self.cursor.fetchone()[0] == 0:
-                sample_tables = [("Table 1", 4), ("Table 2", 6), ("Table 3", 2), ("Table 4", 8), ("Table 5", 4)]
-                self.cursor.executemany("INSERT INTO tables (table_number, capacity) VALUES (?, ?)", sample_tables)
-
-            # -------------------------- Core Modification: Initialize Premade Dish Data --------------------------
-            self.initialize_premade_data()
-
-            self.connection.commit()
-            print("Database initialization completed (including premade dishes)")
-            self.load_table_map()
+            if not engine.initialize_database():
+                print("Schema and seed data are current, skipped initialization")
+            self.load_table_map(engine)
+            engine.close()
+
+            # From here on every query runs on the background database thread
+            self.db = DatabaseWorker(self.root, DEFAULT_DB_PATH, self.set_busy, self.show_db_error)
 
         except sqlite3.Error as e:
             messagebox.showerror("Database Error", f"Initialization failed: {str(e)}")
@@ -195,80 +116,58 @@ class RestaurantApp:
             messagebox.showerror("Error", f"Unknown error: {str(e)}")
             self.root.destroy()
 
-    def initialize_premade_data(self):
-        """
-        Initialize premade dish data.
-        Logic:
-        1. Add 'xxx Meal Kit' to the ingredients table.
-        2. Add 'xxx (Premade)' to the dishes table.
-        3. Establish the relationship of 1 dish serving = 1 meal kit in the association table.
-        """
-        print("Checking premade dish data...")
-        
-        # Define premade dish data structure: (dish name, price, ingredient name, stock quantity, threshold)
-        premade_items = [
-            ("Taiwanese Braised Pork Rice (Premade)", 25.0, "Braised Pork Meal Kit", 50, 5),
-            ("Braised Beef Rice (Premade)", 28.0, "Braised Beef Meal Kit", 40, 5),
-            ("Italian Meat Sauce Pasta (Premade)", 26.0, "Meat Sauce Pasta Combo Kit", 30, 5),
-            ("Cantonese Sausage Fried Rice (Premade)", 22.0, "Sausage Fried Rice Meal Kit", 50, 10)
-        ]
-
-        for dish_name, price, ing_name, stock, threshold in premade_items:
-            # 1. Ensure the ingredient exists
-            self.cursor.execute("SELECT id FROM ingredients WHERE name = ?", (ing_name,))
-            res_ing = self.cursor.fetchone()
-            if not res_ing:
-                self.cursor.execute(
-                    "INSERT INTO ingredients (name, unit, stock, low_stock_threshold) VALUES (?, 'Bag', ?, ?)",
-                    (ing_name, stock, threshold)
-                )
-                ingredient_id = self.cursor.lastrowid
-                print(f"  + Added premade ingredient: {ing_name}")
-            else:
-                ingredient_id = res_ing['id']
-
-            # 2. Ensure the dish exists
-            self.cursor.execute("SELECT id FROM dishes WHERE name = ?", (dish_name,))
-            res_dish = self.cursor.fetchone()
-            if not res_dish:
-                self.cursor.execute(
-                    "INSERT INTO dishes (name, price, category, description) VALUES (?, ?, 'Premade Dishes', 'Quick and delicious, ready to eat after heating')",
-                    (dish_name, price)
-                )
-                dish_id = self.cursor.lastrowid
-                print(f"  + Added premade dish: {dish_name}")
-            else:
-                dish_id = res_dish['id']
-
-            # 3. Ensure the association exists (1 dish serving consumes 1 bag of ingredient)
-            self.cursor.execute(
-                "SELECT id FROM dish_ingredients WHERE dish_id = ? AND ingredient_id = ?", 
-                (dish_id, ingredient_id)
-            )
-            if not self.cursor.fetchone():
-                self.cursor.execute(
-                    "INSERT INTO dish_ingredients (dish_id, ingredient_id, quantity) VALUES (?, ?, 1.0)",
-                    (dish_id, ingredient_id)
-                )
-                print(f"  + Established association: {dish_name} -> {ing_name} (1:1)")
-    
-    def load_table_map(self):
+    def load_table_map(self, engine):
         """Load the mapping of table numbers to IDs (required for order management, avoiding hard-coded IDs)"""
         try:
-            self.cursor.execute("SELECT id, table_number FROM tables")
-            tables = self.cursor.fetchall()
-            self.table_map = {table['table_number']: table['id'] for table in tables}
+            self.table_map = engine.get_table_map()
             print(f"🪑 Loaded {len(self.table_map)} table mappings")
         except Exception as e:
             print(f"Failed to load table mappings: {e}")
             self.table_map = {}
 
+    def run_db(self, work, on_done=None, error_title="Error", error_prefix="", warning_title="Warning", on_error=None,
+               background=False):
+        """
+        Run work(engine) on the database thread and call on_done(result) on the Tk thread.
+        OrderError is shown as a warning with its own message, anything else as an error dialog.
+        """
+        def handle_error(e):
+            if on_error:
+                on_error(e)
+            elif isinstance(e, OrderError):
+                messagebox.showwarning(warning_title, str(e))
+            else:
+                messagebox.showerror(error_title, f"{error_prefix}{str(e)}")
+
+        action = profiler.current_action
+        if action:
+            # Attribute the queries to the action and time the database and display parts separately
+            work = lambda engine, work=work: profiler.run_action(action, work, engine)
+            if on_done:
+                on_done = timed(f"{action} (result)", on_done)
+        self.db.submit(work, on_done, handle_error, background)
+
+    def show_db_error(self, e):
+        messagebox.showerror("Database Error", str(e))
+
+    def set_busy(self, busy):
+        """Busy indicator for in-flight database requests"""
+        self.busy_var.set("Working..." if busy else "")
+        self.root.config(cursor="watch" if busy else "")
+
+    def on_close(self):
+        print(self.refresh.summary())
+        if profiler.enabled:
+            path = f"diagnostics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            profiler.dump_json(path)
+            print(f"Diagnostics written to {path}")
+        self.db.close()
+        self.root.destroy()
+
     # =========================================================================
     # Table Management Tab 
     # =========================================================================
-    def create_table_management_tab(self):
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Table Management")
+    def create_table_management_tab(self, tab):
 
         # Buttons
         button_frame = ttk.Frame(tab)
@@ -306,7 +205,7 @@ class RestaurantApp:
         h_scrollbar_table.pack(side=tk.BOTTOM, fill=tk.X)
 
         self.table_tree = ttk.Treeview(table_container, 
-                                    columns=("id", "table_number", "capacity", "status"), 
+                                    columns=("id", "table_number", "capacity", "status", "open_balance"), 
                                     show="headings",
                                     yscrollcommand=v_scrollbar_table.set,
                                     xscrollcommand=h_scrollbar_table.set)
@@ -319,8 +218,10 @@ class RestaurantApp:
         self.table_tree.heading("table_number", text="Table Number")
         self.table_tree.heading("capacity", text="Capacity")
         self.table_tree.heading("status", text="Status")
+        self.table_tree.heading("open_balance", text="Open Balance")
         
         self.table_tree.pack(fill=tk.BOTH, expand=True)
+        self.table_binder = KeyedTreeBinder(self.table_tree)
         self.table_tree.bind("<Double-1>", self.edit_table_status)
 
         self.refresh_tables()
@@ -342,16 +243,15 @@ class RestaurantApp:
             messagebox.showerror("Error", "Capacity must be an integer greater than 0")
             return
 
-        try:
-            table_number = f"Table {num}"
-            self.cursor.execute("INSERT INTO tables (table_number, capacity, status) VALUES (?, ?, 'Free')", (table_number, cap))
-            self.connection.commit()
-            self.refresh_tables()
+        table_number = f"Table {num}"
+
+        def added(_):
+            self.refresh.mark_dirty("tables")
             # Refresh table selection on order page
-            self.refresh_table_combo()
+            self.refresh.mark_dirty("table_combo")
             messagebox.showinfo("Success", f"Added successfully: {table_number}")
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Error", f"Table {table_number} already exists")
+
+        self.run_db(lambda engine: engine.add_table(table_number, cap), added, warning_title="Error")
 
     def delete_table(self):
         sel = self.table_tree.selection()
@@ -362,46 +262,42 @@ class RestaurantApp:
         table_id = table_data[0]
         table_number = table_data[1]
 
-        # Check if there are unfinished orders
-        self.cursor.execute("""
-            SELECT COUNT(*) FROM orders 
-            WHERE table_id = ? AND status IN ('Placed', 'In Progress', 'Served')
-        """, (table_id,))
-        if self.cursor.fetchone()[0] > 0:
-            messagebox.showerror("Error", "This table has unfinished orders and cannot be deleted!")
-            return
-
-        if messagebox.askyesno("Confirmation", f"Are you sure to delete table {table_number}? It cannot be recovered after deletion!"):
-            self.cursor.execute("DELETE FROM tables WHERE id=?", (table_id,))
-            self.connection.commit()
-            self.refresh_tables()
+        def deleted(_):
+            self.refresh.mark_dirty("tables")
             # Refresh table list in order management
-            self.refresh_table_combo()
+            self.refresh.mark_dirty("table_combo")
             messagebox.showinfo("Success", "Table deleted successfully")
+
+        def checked(has_unfinished):
+            # Check if there are unfinished orders
+            if has_unfinished:
+                messagebox.showerror("Error", "This table has unfinished orders and cannot be deleted!")
+                return
+            if messagebox.askyesno("Confirmation", f"Are you sure to delete table {table_number}? It cannot be recovered after deletion!"):
+                self.run_db(lambda engine: engine.delete_table(table_id), deleted, warning_title="Error")
+
+        self.run_db(lambda engine: engine.has_unfinished_orders(table_id), checked)
     
     def refresh_tables(self):
-        for item in self.table_tree.get_children():
-            self.table_tree.delete(item)
-        sql = "SELECT * FROM tables WHERE 1=1"
-        params = []
+        if "tables" not in self.built_tabs:
+            return
         search = self.table_search_var.get()
-        if search:
-            sql += " AND table_number LIKE ?"
-            params.append(f"%{search}%")
         status = self.table_status_var.get()
-        if status != "All":
-            sql += " AND status=?"
-            params.append(status)
-        self.cursor.execute(sql, params)
-        for row in self.cursor.fetchall():
-            self.table_tree.insert("", "end", values=tuple(row))
+        self.run_db(lambda engine: engine.list_tables(search, status), self.show_tables)
+
+    def show_tables(self, rows):
+        # Only changed rows are touched, selection and scroll position are kept
+        self.table_binder.bind(
+            (row['id'], (row['id'], row['table_number'], row['capacity'], row['status'], format_money(row['open_balance_cents'])), ())
+            for row in rows
+        )
 
     def edit_table_status(self, event):
         sel = self.table_tree.selection()
         if not sel:
             return
         row = self.table_tree.item(sel[0])["values"]
-        table_id, table_number, capacity, status = row
+        table_id, table_number, capacity, status, open_balance = row
 
         # Pop up number input dialog
         choice = simpledialog.askinteger(
@@ -420,16 +316,12 @@ class RestaurantApp:
 
         new_status = status_map[choice]
 
-        self.cursor.execute("UPDATE tables SET status=? WHERE id=?", (new_status, table_id))
-        self.connection.commit()
-        self.refresh_tables()
+        self.run_db(lambda engine: engine.set_table_status(table_id, new_status), lambda _: self.refresh.mark_dirty("tables"))
 
     # =========================================================================
     # Order Management Tab 
     # =========================================================================
-    def create_order_tab(self):
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Order Management")
+    def create_order_tab(self, tab):
 
         # total_var to display total price
         self.total_var = tk.StringVar(value="Total: 0 CNY")
@@ -463,7 +355,7 @@ class RestaurantApp:
         dish_h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
 
         self.dish_tree = ttk.Treeview(left_frame, 
-                                    columns=("id", "name", "price"), 
+                                    columns=("id", "name", "price", "servings"), 
                                     show="headings",
                                     yscrollcommand=dish_v_scrollbar.set,
                                     xscrollcommand=dish_h_scrollbar.set)
@@ -473,8 +365,12 @@ class RestaurantApp:
         self.dish_tree.heading("id", text="ID")
         self.dish_tree.heading("name", text="Name")
         self.dish_tree.heading("price", text="Price")
+        self.dish_tree.heading("servings", text="Servings Left")
+        self.dish_tree.tag_configure("sold_out", foreground="gray")
+        self.dish_servings = {}
         
         self.dish_tree.pack(fill=tk.BOTH, expand=True)
+        self.dish_binder = KeyedTreeBinder(self.dish_tree)
         self.dish_tree.bind("<Double-1>", self.add_dish_to_order)
 
         # Right: Order view
@@ -517,6 +413,8 @@ class RestaurantApp:
     # Modify the on_table_selected method to ensure storing the item_id of order items
     def on_table_selected(self, event=None):
         """When a table is selected, display the order dishes for that table"""
+        if "orders" not in self.built_tabs:
+            return
         table_number = self.selected_table_var.get()
         if not table_number:
             self.table_order_info_var.set("Please select a table")
@@ -530,97 +428,55 @@ class RestaurantApp:
 
         table_id = self.table_map[table_number]
 
-        try:
-            # Query all unpaid orders for this table
-            self.cursor.execute("""
-                SELECT o.id, o.status, o.total_amount
-                FROM orders o
-                WHERE o.table_id = ? AND o.status IN ('Placed', 'In Progress', 'Served')
-                ORDER BY o.id DESC
-            """, (table_id,))
-            
-            orders = self.cursor.fetchall()
-            
-            # Clear currently displayed order
-            self.clear_order_display()
-            self.current_order_items = {}
-            
-            if orders:
-                order_info = []
-                total_amount = 0
-                
-                # Iterate through all orders to get dish information
-                for order in orders:
-                    order_id = order['id']
-                    status = order['status']
-                    total_amount += order['total_amount'] if order['total_amount'] else 0
-                    
-                    # Query all dishes for this order (including order item ID)
-                    self.cursor.execute("""
-                        SELECT oi.id, oi.dish_id, d.name, d.price, oi.quantity, oi.subtotal, oi.status
-                        FROM order_items oi
-                        JOIN dishes d ON oi.dish_id = d.id
-                        WHERE oi.order_id = ?
-                    """, (order_id,))
-                    
-                    items = self.cursor.fetchall()
-                    
-                    for item in items:
-                        item_id = item['id']  # Get order item ID
-                        dish_id = item['dish_id']
-                        name = item['name']
-                        price = float(item['price'])
-                        quantity = item['quantity']
-                        subtotal = float(item['subtotal'])
-                        item_status = item['status']
-                        
-                        # Use composite key containing item_id to ensure uniqueness (key modification)
-                        key = f"{dish_id}_{order_id}_{item_id}"
-                        self.current_order_items[key] = {
-                            "item_id": item_id,  # Store order item ID
-                            "name": name, 
-                            "price": price, 
-                            "quantity": quantity, 
-                            "subtotal": subtotal,
-                            "status": item_status,
-                            "order_id": order_id,
-                            "dish_id": dish_id
-                        }
-                        
-                        # Add to order view display
-                        self.order_tree.insert(
-                            "",
-                            "end",
-                            values=(
-                                name,
-                                price,
-                                quantity,
-                                subtotal,
-                                item_status
-                            )
-                        )
-                    
-                    status_map = {
-                        'Placed': 'Pending',
-                        'In Progress': 'In Progress', 
-                        'Served': 'Completed'
-                    }
-                    status_display = status_map.get(status, status)
-                    order_info.append(f"Order {order_id} ({status_display})")
-                
-                display_text = f"Current Orders: {', '.join(order_info)}"
-                self.table_order_info_var.set(display_text)
-                self.total_var.set(f"Total: {total_amount:.2f} CNY")
-                
-            else:
-                self.table_order_info_var.set("No current orders")
-                self.total_var.set("Total: 0.00 CNY")
-                
-        except Exception as e:
+        def failed(e):
             print(f"Error in on_table_selected: {e}")
             self.table_order_info_var.set("Query error")
             self.clear_order_display()
 
+        # Load all unpaid orders for this table with their dishes in one query
+        self.run_db(
+            lambda engine: engine.load_open_bill(table_id),
+            lambda bill: self.show_open_bill(bill, "No current orders"),
+            on_error=failed
+        )
+
+    def show_open_bill(self, bill, empty_text):
+        """Display a bill loaded by OrderEngine.load_open_bill in the current order view"""
+        # Clear currently displayed order
+        self.clear_order_display()
+
+        if not bill['orders']:
+            self.table_order_info_var.set(empty_text)
+            return
+
+        order_info = []
+        status_map = {
+            'Placed': 'Pending',
+            'In Progress': 'In Progress', 
+            'Served': 'Completed'
+        }
+        for order in bill['orders']:
+            order_id = order['id']
+            for item in order['items']:
+                # Use composite key containing item_id to ensure uniqueness
+                key = f"{item['dish_id']}_{order_id}_{item['item_id']}"
+                self.current_order_items[key] = dict(item, order_id=order_id)
+
+                # Add to order view display
+                self.order_tree.insert("", "end", values=(
+                    item['name'],
+                    format_money(item['price_cents']),
+                    item['quantity'],
+                    format_money(item['subtotal_cents']),
+                    item['status']
+                ))
+
+            status_display = status_map.get(order['status'], order['status'])
+            order_info.append(f"Order {order_id} ({status_display})")
+
+        self.table_order_info_var.set(f"Current Orders: {', '.join(order_info)}")
+        self.total_var.set(f"Total: {format_money(bill['totals'].total)} CNY")
+
     def clear_order_display(self):
         """Clear order display"""
         for i in self.order_tree.get_children():
@@ -630,21 +486,33 @@ class RestaurantApp:
         self.current_order_id = None
 
     def refresh_table_combo(self):
-        self.cursor.execute("SELECT id, table_number FROM tables WHERE status IN ('Free', 'Occupied')")
-        tables = self.cursor.fetchall()
-        self.table_map = {t["table_number"]: t["id"] for t in tables}
+        if "orders" not in self.built_tabs:
+            return
+        self.run_db(lambda engine: engine.get_table_map(orderable_only=True), self.show_table_combo)
+
+    def show_table_combo(self, table_map):
+        self.table_map = table_map
         self.table_combo['values'] = list(self.table_map.keys())
-        if tables:
+        if self.table_map:
             self.table_combo.current(0)
             # Display table order information during initialization
-            self.root.after(100, self.on_table_selected)
+            self.refresh.mark_dirty("order")
     
     def refresh_dishes(self):
-        for i in self.dish_tree.get_children():
-            self.dish_tree.delete(i)
-        self.cursor.execute("SELECT id, name, price FROM dishes WHERE is_available=1")
-        for row in self.cursor.fetchall():
-            self.dish_tree.insert("", "end", values=tuple(row))
+        if "orders" not in self.built_tabs:
+            return
+        self.run_db(lambda engine: (engine.list_available_dishes(), engine.get_servings_remaining()),
+                    self.show_dishes)
+
+    def show_dishes(self, result):
+        dishes, self.dish_servings = result
+        rows = []
+        for dish in dishes:
+            servings = self.dish_servings.get(dish.id)
+            # Dishes without a recipe are not limited by stock
+            shown = "-" if servings is None else ("Sold out" if servings == 0 else servings)
+            rows.append((dish.id, (dish.id, dish.name, format_money(dish.price_cents), shown), ("sold_out",) if servings == 0 else ()))
+        self.dish_binder.bind(rows)
     
     def create_order(self):
         table_number = self.selected_table_var.get()
@@ -654,91 +522,14 @@ class RestaurantApp:
 
         table_id = self.table_map[table_number]
 
-        # Insert order with explicit current time
-        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        # Insert order
-        self.cursor.execute(
-            "INSERT INTO orders (table_id, created_by, order_date) VALUES (?, ?, ?)",
-            (table_id, "System Operator", current_time)
-        )
-        self.connection.commit()
+        def created(order_id):
+            self.current_order_id = order_id
+            messagebox.showinfo("Order", f"Order created, ID: {self.current_order_id}")
+            # Reload the table list and order display
+            self.refresh.mark_dirty("tables", "order")
 
-        self.current_order_id = self.cursor.lastrowid
-        messagebox.showinfo("Order", f"Order created, ID: {self.current_order_id}")
-
-        # Set table status to Occupied
-        self.cursor.execute("UPDATE tables SET status='Occupied' WHERE id=?", (table_id,))
-        self.connection.commit()
-        self.refresh_tables()
-        
-        # Reload order display
-        self.on_table_selected()
-
-    # =========================================================================
-    # Inventory Check and Deduction Logic Modification
-    # =========================================================================
-    def check_and_deduct_ingredients(self, dish_id, quantity=1, deduct=False):
-        """
-        Check and optionally deduct ingredient inventory, return the check result
-        Only when deduct=True will the inventory be actually deducted
-        """
-        try:
-            # Get all the ingredients needed for the dish
-            self.cursor.execute("""
-                SELECT di.ingredient_id, di.quantity, i.name, i.stock, i.unit 
-                FROM dish_ingredients di
-                JOIN ingredients i ON di.ingredient_id = i.id
-                WHERE di.dish_id = ?
-            """, (dish_id,))
-            
-            ingredients = self.cursor.fetchall()
-            if not ingredients:
-                messagebox.showwarning("Warning", "This dish has no ingredients configured and cannot be processed.")
-                return False
-            
-            # Check if the inventory is sufficient
-            insufficient = []
-            for ing in ingredients:
-                required = ing['quantity'] * quantity
-                if ing['stock'] < required:
-                    insufficient.append(
-                        f"{ing['name']}Not Enough (Demand: {required}{ing['unit']}, Current: {ing['stock']}{ing['unit']})"
-                    )
-            
-            if insufficient:
-                if not deduct:  # Return specific deficiency information in check-only mode
-                    return {"success": False, "message": "\n".join(insufficient)}
-                return False
-            
-            # If stock deduction is required and there is sufficient stock
-            if deduct:
-                for ing in ingredients:
-                    ingredient_id = ing['ingredient_id']
-                    required = ing['quantity'] * quantity
-                    old_stock = ing['stock']
-                    new_stock = old_stock - required
-                    
-                    # Update inventory
-                    self.cursor.execute(
-                        "UPDATE ingredients SET stock = ? WHERE id = ?",
-                        (new_stock, ingredient_id)
-                    )
-                    
-                    # Record inventory movement log
-                    self.cursor.execute("""
-                        INSERT INTO inventory_logs 
-                        (ingredient_id, change_type, quantity, old_stock, new_stock, reason, created_by)
-                        VALUES (?, 'Stock Out', ?, ?, ?, '订单消耗', '系统操作员')
-                    """, (ingredient_id, required, old_stock, new_stock))
-                
-                self.connection.commit()
-            
-            return {"success": True} if not deduct else True
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Inventory processing failed: {str(e)}")
-            return {"success": False, "message": str(e)} if not deduct else False
+        # Insert order and set table status to Occupied
+        self.run_db(lambda engine: engine.create_order(table_id, "System Operator"), created)
 
     # =========================================================================
     # Order management related modifications
@@ -750,49 +541,21 @@ class RestaurantApp:
             messagebox.showwarning("Warning", "Please select a table first")
             return
             
-        # Get the latest unfinished order for this table
         table_id = self.table_map[table_number]
-        self.cursor.execute("""
-            SELECT id FROM orders 
-            WHERE table_id = ? AND status IN ('Placed', 'In Progress', 'Served')
-            ORDER BY id DESC LIMIT 1
-        """, (table_id,))
-        
-        order_result = self.cursor.fetchone()
-        if not order_result:
-            messagebox.showwarning("Warning", "Please create an order for this table first.")
-            return
-            
-        order_id = order_result['id']
-        
         sel = self.dish_tree.selection()
         if not sel: return
             
-        dish_id, name, price = self.dish_tree.item(sel[0], "values")
-        dish_id = int(dish_id)
-        price = float(price)
+        dish_id = int(self.dish_tree.item(sel[0], "values")[0])
+        if self.dish_servings.get(dish_id) == 0 and not messagebox.askyesno(
+                "Sold Out", "This dish cannot be made from the current stock. Add it anyway?"):
+            return
 
-        try:
-            # Only add dishes to the order without checking inventory
-            self.cursor.execute(
-                "INSERT INTO order_items (order_id, dish_id, quantity, subtotal, status) VALUES (?, ?, ?, ?, 'Pending')",
-                (order_id, dish_id, 1, price)
-            )
-            
-            # Update the total order amount
-            self.cursor.execute("""
-                UPDATE orders 
-                SET total_amount = COALESCE(total_amount, 0) + ? 
-                WHERE id = ?
-            """, (price, order_id))
-            
-            self.connection.commit()
-            # Refresh order display
-            self.on_table_selected()
-            
-        except Exception as e:
-            self.connection.rollback()
-            messagebox.showerror("Error", f"Failed to add dish: {str(e)}")
+        # Only add dishes to the latest unfinished order without checking inventory, then refresh order display
+        self.run_db(
+            lambda engine: engine.add_dish_to_order(table_id, dish_id),
+            lambda _: self.refresh.mark_dirty("order"),
+            error_prefix="Failed to add dish: "
+        )
     
     def remove_one_dish(self):
         sel = self.order_tree.selection()
@@ -813,15 +576,15 @@ class RestaurantApp:
 
         # Match corresponding item_id from current_order_items (ensure on_table_selected has loaded item_id)
         item_id = None
-        target_price = float(price)
+        target_price = to_cents(price)
         target_quantity = int(quantity)
-        target_subtotal = float(subtotal)
+        target_subtotal = to_cents(subtotal)
         
         for item in self.current_order_items.values():
             if (item["name"] == name 
-                and abs(item["price"] - target_price) < 0.01 
+                and item["price_cents"] == target_price 
                 and item["quantity"] == target_quantity 
-                and abs(item["subtotal"] - target_subtotal) < 0.01 
+                and item["subtotal_cents"] == target_subtotal 
                 and item["status"] == status):
                 item_id = item.get("item_id")
                 break
@@ -830,141 +593,20 @@ class RestaurantApp:
             messagebox.showwarning("Prompt", "Corresponding dish information not found")
             return
 
-        try:
-            # 1. Get order ID associated with the order item
-            self.cursor.execute("SELECT order_id FROM order_items WHERE id = ?", (item_id,))
-            result = self.cursor.fetchone()
-            if not result:
-                messagebox.showerror("Error", "Dish record not found")
-                return
-            order_id = result['order_id']
-
-            # 2. Delete the order item
-            self.cursor.execute("DELETE FROM order_items WHERE id = ?", (item_id,))
-
-            # 3. Recalculate total order amount
-            self.cursor.execute("SELECT SUM(subtotal) as new_total FROM order_items WHERE order_id = ?", (order_id,))
-            total_result = self.cursor.fetchone()
-            new_total = total_result['new_total'] or 0
-
-            # 4. Check order status and update total amount
-            self.cursor.execute("SELECT status FROM orders WHERE id = ?", (order_id,))
-            order_status = self.cursor.fetchone()['status']
-            is_submitted = order_status in ('Placed', 'In Progress', 'Served')
-
-            if is_submitted:
-                self.cursor.execute("UPDATE orders SET total_amount = ? WHERE id = ?", (new_total, order_id))
-
-                # 5. If total amount is 0, delete order and associated items
-                if new_total <= 0:
-                    self.cursor.execute("DELETE FROM order_items WHERE order_id = ?", (order_id,))
-                    self.cursor.execute("DELETE FROM orders WHERE id = ?", (order_id,))
-                    self.connection.commit()
-                    messagebox.showinfo("Prompt", "Order total amount is now 0, order has been automatically deleted")
-                    self.refresh_order_display()
-                    return
-
-            # Commit transaction
-            self.connection.commit()
-            messagebox.showinfo("Success", "Dish deleted successfully, order total has been updated")
-            
-            # 6. Refresh display
-            self.refresh_order_display()
-
-        except Exception as e:
-            self.connection.rollback()
-            messagebox.showerror("Error", f"Deletion failed: {str(e)}")
-
-    def refresh_order_display(self):
-        """Refresh order display: update order item list, total price and status information"""
-        # Clear existing order display
-        for item in self.order_tree.get_children():
-            self.order_tree.delete(item)
-        
-        # Clear total price display
-        self.total_var.set("Total: 0.00 CNY")
-        
-        # Get currently selected table
-        current_table = self.selected_table_var.get()
-        if not current_table:
-            self.table_order_info_var.set("Please select a table to view orders")
-            return
-        
-        table_id = self.table_map.get(current_table)
-        if not table_id:
-            self.table_order_info_var.set("Table information not found")
-            return
-        
-        try:
-            # Query active orders for current table
-            self.cursor.execute("""
-                SELECT id, status, total_amount FROM orders 
-                WHERE table_id = ? AND status != 'Paid'
-            """, (table_id,))
-            active_orders = self.cursor.fetchall()
-            
-            if not active_orders:
-                self.table_order_info_var.set("No active orders for current table")
-                return
-            
-            # Handle multiple orders
-            order_info = []
-            total_amount = 0
-            self.current_order_items = {}  # Reset current order items
-            
-            for order in active_orders:
-                order_id = order['id']
-                order_status = order['status']
-                total_amount += order['total_amount'] or 0
-                
-                # Update order status display
-                status_map = {'Placed': 'Pending', 'In Progress': 'In Progress', 'Served': 'Completed'}
-                order_info.append(f"Order {order_id} ({status_map.get(order_status, order_status)})")
-                
-                # Load order items
-                self.cursor.execute("""
-                    SELECT oi.id, oi.dish_id, d.name, d.price, oi.quantity, oi.subtotal, oi.status
-                    FROM order_items oi
-                    JOIN dishes d ON oi.dish_id = d.id
-                    WHERE oi.order_id = ?
-                """, (order_id,))
-                
-                for item in self.cursor.fetchall():
-                    item_id = item['id']
-                    dish_id = item['dish_id']
-                    name = item['name']
-                    price = float(item['price'])
-                    quantity = item['quantity']
-                    subtotal = float(item['subtotal'])
-                    item_status = item['status']
-                    
-                    # Update current_order_items
-                    key = f"{dish_id}_{order_id}_{item_id}"
-                    self.current_order_items[key] = {
-                        "item_id": item_id,
-                        "name": name,
-                        "price": price,
-                        "quantity": quantity,
-                        "subtotal": subtotal,
-                        "status": item_status,
-                        "order_id": order_id,
-                        "dish_id": dish_id
-                    }
-                    
-                    # Add to order tree display
-                    self.order_tree.insert("", "end", values=(
-                        name, price, quantity, subtotal, item_status
-                    ))
-            
-            # Update total price and status display
-            self.table_order_info_var.set(f"Current Orders: {', '.join(order_info)}")
-            self.total_var.set(f"Total: {total_amount:.2f} CNY")
+        def removed(order_deleted):
+            if order_deleted:
+                messagebox.showinfo("Prompt", "Order total amount is now 0, order has been automatically deleted")
+            else:
+                messagebox.showinfo("Success", "Dish deleted successfully, order total has been updated")
             
-            # Refresh kitchen orders
-            self.refresh_kitchen_orders()
+            # Refresh display
+            self.refresh.mark_dirty("order", "kitchen", "inventory", "dishes")
 
-        except Exception as e:
-            messagebox.showerror("Refresh Failed", f"Error updating order display: {str(e)}")
+        # Delete the item, recalculate the order total and drop the order if it became empty
+        self.run_db(
+            lambda engine: engine.remove_order_item(item_id), removed,
+            error_prefix="Deletion failed: ", warning_title="Error"
+        )
 
     def submit_order(self):
         """Submit order - Check if all dishes have sufficient stock at this time (using allowed status values)"""
@@ -974,62 +616,13 @@ class RestaurantApp:
             return
 
         table_id = self.table_map[table_number]
-        
-        # Retrieve the current table's unsubmitted orders (orders with the status 'Placed')
-        self.cursor.execute("""
-            SELECT id FROM orders 
-            WHERE table_id = ? AND status = 'Placed'
-            ORDER BY id DESC LIMIT 1
-        """, (table_id,))
-        
-        order_result = self.cursor.fetchone()
-        if not order_result:
-            messagebox.showwarning("Warning", "No orders available for submission")
-            return
-            
-        order_id = order_result['id']
-        
-        # Retrieve all pending dishes in the order
-        self.cursor.execute("""
-            SELECT oi.dish_id, oi.quantity, d.name 
-            FROM order_items oi
-            JOIN dishes d ON oi.dish_id = d.id
-            WHERE oi.order_id = ? AND oi.status = 'Pending'
-        """, (order_id,))
-        
-        order_items = self.cursor.fetchall()
-        if not order_items:
-            messagebox.showwarning("Warning", "There are no dishes to be submitted in the order.")
-            return
-        
-        # Check the inventory of all dishes to ensure sufficient stock
-        insufficient_items = []
-        for item in order_items:
-            dish_id = item['dish_id']
-            quantity = item['quantity']
-            dish_name = item['name']
-            
-            check_result = self.check_and_deduct_ingredients(dish_id, quantity)
-            if not check_result["success"]:
-                insufficient_items.append(f"Dish《{dish_name}》: {check_result['message']}")
-        
-        if insufficient_items:
-            messagebox.showerror("Insufficient stock", 
-                            "The following dishes are out of stock and cannot be ordered:\n" + "\n".join(insufficient_items))
-            return
-        
-        # Inventory check passed, updating order status to 'In Progress' (using database-allowed statuses)
-        try:
-            self.cursor.execute(
-                "UPDATE orders SET status = 'In Progress' WHERE id = ?", 
-                (order_id,)
-            )
-            self.connection.commit()
+
+        def submitted(order_id):
             messagebox.showinfo("Success", f"Order {order_id} Submission successful！")
-            self.on_table_selected()  # Refresh order display
-        except Exception as e:
-            self.connection.rollback()
-            messagebox.showerror("Error", f"Failed to submit order: {str(e)}")
+            self.refresh.mark_dirty("order", "inventory", "dishes")  # Refresh order display
+
+        # Check the inventory of all pending dishes, then move the order to 'In Progress'
+        self.run_db(lambda engine: engine.submit_order(table_id), submitted, error_prefix="Failed to submit order: ")
 
     def checkout_order(self):
         """Handle order checkout process"""
@@ -1043,27 +636,25 @@ class RestaurantApp:
             messagebox.showerror("Error", "Table information does not exist")
             return
 
-        # Get unpaid orders for current table
-        self.cursor.execute("""
-            SELECT id, total_amount FROM orders 
-            WHERE table_id = ? AND status IN ('Placed', 'In Progress', 'Served')
-        """, (table_id,))
-        
-        orders = self.cursor.fetchall()
-        if not orders:
-            messagebox.showinfo("Prompt", "No orders available for checkout at this table")
-            return
+        def loaded(bill):
+            orders = bill['orders']
+            if not orders:
+                messagebox.showinfo("Prompt", "No orders available for checkout at this table")
+                return
 
-        # Calculate total amount
-        total_amount = sum(order['total_amount'] or 0 for order in orders)
-        if total_amount <= 0:
-            messagebox.showinfo("Prompt", "Order total amount is 0, no need to checkout")
-            return
+            # Subtotal, discount, service charge and tax were computed once when the bill was loaded
+            totals = bill['totals']
+            if totals.total <= 0:
+                messagebox.showinfo("Prompt", "Order total amount is 0, no need to checkout")
+                return
+
+            # Create payment method selection dialog
+            self.show_payment_method_dialog(orders, totals, table_id)
 
-        # Create payment method selection dialog
-        self.show_payment_method_dialog(orders, total_amount, table_id)
+        # Get unpaid orders (with their dishes, reused for the receipt) for current table
+        self.run_db(lambda engine: engine.load_open_bill(table_id), loaded)
     
-    def show_payment_method_dialog(self, orders, total_amount, table_id):
+    def show_payment_method_dialog(self, orders, totals, table_id):
             """Display payment method selection dialog"""
             dialog = tk.Toplevel(self.root)
             dialog.title("Select Payment Method")
@@ -1080,7 +671,7 @@ class RestaurantApp:
             y = (self.root.winfo_height() // 2) - (height // 2) + self.root.winfo_y()
             dialog.geometry(f"+{x}+{y}")
 
-            ttk.Label(dialog, text=f"Total Order Amount: ¥{total_amount:.2f}", font=("Arial", 12, "bold")).pack(pady=20)
+            ttk.Label(dialog, text=f"Total Order Amount: ¥{format_money(totals.total)}", font=("Arial", 12, "bold")).pack(pady=20)
 
             # Payment method button frame
             btn_frame = ttk.Frame(dialog)
@@ -1091,7 +682,7 @@ class RestaurantApp:
                 btn_frame, 
                 text="WeChat Pay", 
                 width=15,
-                command=lambda: self.process_wechat_alipay_payment(dialog, orders, total_amount, table_id, "WeChat Pay")
+                command=lambda: self.process_wechat_alipay_payment(dialog, orders, totals, table_id, "WeChat Pay")
             ).pack(pady=5)
 
             # Alipay button
@@ -1099,7 +690,7 @@ class RestaurantApp:
                 btn_frame, 
                 text="Alipay", 
                 width=15,
-                command=lambda: self.process_wechat_alipay_payment(dialog, orders, total_amount, table_id, "Alipay")
+                command=lambda: self.process_wechat_alipay_payment(dialog, orders, totals, table_id, "Alipay")
             ).pack(pady=5)
 
             # Cash Payment button
@@ -1107,10 +698,10 @@ class RestaurantApp:
                 btn_frame, 
                 text="Cash Payment", 
                 width=15,
-                command=lambda: self.process_cash_payment(dialog, orders, total_amount, table_id)
+                command=lambda: self.process_cash_payment(dialog, orders, totals, table_id)
             ).pack(pady=5)
     
-    def process_wechat_alipay_payment(self, dialog, orders, total_amount, table_id, payment_method):
+    def process_wechat_alipay_payment(self, dialog, orders, totals, table_id, payment_method):
         """Process WeChat or Alipay payment, display amount and QR code"""
         dialog.destroy()  # Close previous window
         
@@ -1124,7 +715,7 @@ class RestaurantApp:
         # 1. Display payment amount
         ttk.Label(
             pay_window, 
-            text=f"Please Pay: {total_amount:.2f} CNY", 
+            text=f"Please Pay: {format_money(totals.total)} CNY", 
             font=("Arial", 16, "bold")
         ).pack(pady=20)
 
@@ -1136,6 +727,9 @@ class RestaurantApp:
         image_path = f"{payment_method.lower().replace(' ', '_')}_qrcode.jpg"
 
         try:
+            # PIL is only needed here, so it is imported on first use rather than at startup
+            from PIL import Image, ImageTk
+
             # Open and resize image
             img = Image.open(image_path)
             img = img.resize((250, 250), Image.LANCZOS)  # High-quality resizing
@@ -1162,58 +756,50 @@ class RestaurantApp:
             ).pack(pady=50)
 
         # 3. Payment confirmation logic
+        def paid(result):
+            # WeChat/Alipay payment amount equals receivable amount, no change
+            current_time, settled = result
+            messagebox.showinfo(
+                "Success", 
+                f"{payment_method} payment successful!\nTransaction amount: ¥{format_money(settled.total)}"
+            )
+            
+            self.print_receipt(
+            orders=orders,
+            bill=settled,
+            payment_method=payment_method,
+            checkout_time=current_time
+            )
+            
+            pay_window.destroy()  # Close payment window
+            
+            # Refresh interface data
+            self.refresh.mark_dirty("order", "kitchen", "tables", "inventory", "dishes", "reports")
+
+        def failed(e):
+            confirm_button.state(["!disabled"])
+            messagebox.showerror("Error", f"Payment processing failed: {str(e)}")
+
         def confirm_payment():
-            try:
-                current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                # Update status of all related orders
-                for order in orders:
-                    order_id = order['id']
-                    self.cursor.execute("""
-                        UPDATE orders SET 
-                            status = 'Paid',
-                            checkout_time = ?,
-                            payment_method = ?,
-                            total_amount = ?,
-                            received_amount = ?,
-                            change_amount = 0
-                        WHERE id = ?
-                    """, (current_time, payment_method, total_amount, total_amount, order_id))
-                
-                self.connection.commit()
-                messagebox.showinfo(
-                    "Success", 
-                    f"{payment_method} payment successful!\nTransaction amount: ¥{total_amount:.2f}"
-                )
-                
-                self.print_receipt(
-                orders=orders,
-                total_amount=total_amount,
-                payment_method=payment_method,
-                checkout_time=current_time,
-                received=total_amount,  # WeChat/Alipay payment amount equals receivable amount
-                change=0  # No change
-                )
-                
-                pay_window.destroy()  # Close payment window
-                
-                # Refresh interface data
-                self.refresh_order_display()
-                self.refresh_tables()
-                
-            except Exception as e:
-                self.connection.rollback()
-                messagebox.showerror("Error", f"Payment processing failed: {str(e)}")
+            # Disabled while the request is in flight so the bill cannot be paid twice
+            confirm_button.state(["disabled"])
+            # Update status of all related orders (received amount equals amount due)
+            self.run_db(
+                lambda engine: engine.checkout(table_id, [order['id'] for order in orders], payment_method, totals),
+                paid, on_error=failed
+            )
 
         # 4. Bottom buttons
         btn_frame = ttk.Frame(pay_window)
         btn_frame.pack(pady=30)
         
-        ttk.Button(
+        confirm_button = ttk.Button(
             btn_frame, 
             text="Confirm Payment", 
             width=20,
             command=confirm_payment
-        ).pack(side=tk.LEFT, padx=10)
+        )
+        confirm_button.pack(side=tk.LEFT, padx=10)
         
         ttk.Button(
             btn_frame, 
@@ -1221,7 +807,7 @@ class RestaurantApp:
             command=pay_window.destroy
         ).pack(side=tk.LEFT, padx=10)
 
-    def process_cash_payment(self, dialog, orders, total_amount, table_id):
+    def process_cash_payment(self, dialog, orders, totals, table_id):
         """Process cash payment"""
         dialog.destroy()
         
@@ -1234,7 +820,7 @@ class RestaurantApp:
         cash_dialog.grab_set()
 
         # Display amount due
-        ttk.Label(cash_dialog, text=f"Amount Due: ¥{total_amount:.2f}", font=("Arial", 10)).pack(pady=5)
+        ttk.Label(cash_dialog, text=f"Amount Due: ¥{format_money(totals.total)}", font=("Arial", 10)).pack(pady=5)
         
         # Received amount input
         ttk.Label(cash_dialog, text="Please enter received amount:").pack(pady=5)
@@ -1254,12 +840,11 @@ class RestaurantApp:
         # Calculate change in real-time
         def calculate_change(*args):
             try:
-                received = float(received_var.get())
-                change = received - total_amount
+                change = to_cents(received_var.get()) - totals.total
                 if change >= 0:
-                    change_var.set(f"Change: ¥{change:.2f}")
+                    change_var.set(f"Change: ¥{format_money(change)}")
                 else:
-                    change_var.set(f"Insufficient amount, short by: ¥{abs(change):.2f}")
+                    change_var.set(f"Insufficient amount, short by: ¥{format_money(-change)}")
             except ValueError:
                 change_var.set("Please enter a valid amount")
 
@@ -1268,66 +853,56 @@ class RestaurantApp:
         # Confirm payment button
         def confirm_cash_payment():
             try:
-                received_amount = float(received_var.get())
-                if received_amount < total_amount:
-                    messagebox.showwarning("Warning", "Insufficient received amount!")
-                    return
-                    
-                change_amount = received_amount - total_amount
-                current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                
-                # Update order status
-                for order in orders:
-                    order_id = order['id']
-                    self.cursor.execute("""
-                        UPDATE orders SET 
-                            status = 'Paid',
-                            checkout_time = ?,
-                            payment_method = 'Cash Payment',
-                            received_amount = ?,
-                            change_amount = ?
-                        WHERE id = ?
-                    """, (current_time, received_amount, change_amount, order_id))
-
-                # Update table status to Free
-                self.cursor.execute("UPDATE tables SET status = 'Free' WHERE id = ?", (table_id,))
-                
-                self.connection.commit()
+                received = to_cents(received_var.get())
+            except ValueError:
+                messagebox.showerror("Error", "Please enter a valid amount")
+                return
+            if received < totals.total:
+                messagebox.showwarning("Warning", "Insufficient received amount!")
+                return
+
+            def paid(result):
+                current_time, settled = result
                 messagebox.showinfo("Success", 
-                    f"Cash payment successful!\nAmount Due: ¥{total_amount:.2f}\n"
-                    f"Received: ¥{received_amount:.2f}\nChange: ¥{change_amount:.2f}")
+                    f"Cash payment successful!\nAmount Due: ¥{format_money(settled.total)}\n"
+                    f"Received: ¥{format_money(settled.received)}\nChange: ¥{format_money(settled.change)}")
                 
                 self.print_receipt(
                     orders=orders,
-                    total_amount=total_amount,
+                    bill=settled,
                     payment_method="Cash Payment",
-                    checkout_time=current_time,
-                    received=received_amount,
-                    change=change_amount
+                    checkout_time=current_time
                 )
 
                 cash_dialog.destroy()
                 
                 # Refresh interface
-                self.refresh_order_display()
-                self.refresh_tables()
-                
-            except ValueError:
-                messagebox.showerror("Error", "Please enter a valid amount")
-            except Exception as e:
-                self.connection.rollback()
+                self.refresh.mark_dirty("order", "kitchen", "tables", "inventory", "dishes", "reports")
+
+            def failed(e):
+                confirm_button.state(["!disabled"])
                 messagebox.showerror("Error", f"Payment processing failed: {str(e)}")
 
+            # Update order status and set table status to Free (button disabled while in flight)
+            confirm_button.state(["disabled"])
+            self.run_db(
+                lambda engine: engine.checkout(
+                    table_id, [order['id'] for order in orders], "Cash Payment", totals, received
+                ),
+                paid, on_error=failed
+            )
+
         btn_frame = ttk.Frame(cash_dialog)
         btn_frame.pack(pady=10)
         
-        ttk.Button(btn_frame, text="Confirm Receipt", command=confirm_cash_payment).pack(side=tk.LEFT, padx=10)
+        confirm_button = ttk.Button(btn_frame, text="Confirm Receipt", command=confirm_cash_payment)
+        confirm_button.pack(side=tk.LEFT, padx=10)
         ttk.Button(btn_frame, text="Cancel", command=cash_dialog.destroy).pack(side=tk.LEFT, padx=10)
         
         # Auto-focus on input field
         received_entry.focus_set()
 
-    def build_receipt(self, table_number, orders, payment_method, received, change, checkout_time):
+    def build_receipt(self, table_number, orders, payment_method, bill, checkout_time):
         """Build receipt content"""
         receipt = []
         receipt.append("="*40)
@@ -1339,39 +914,43 @@ class RestaurantApp:
         receipt.append(f"{'Item Name':<18} {'Qty':<6} {'Price':<8} {'Subtotal':<8}")
         receipt.append("-"*40)
         
-        total_amount = 0
-        
-        # Iterate through dishes of all orders
+        # Iterate through dishes of all orders (totals come from the settled bill)
         for order in orders:
-            order_id = order['id']
-            self.cursor.execute("""
-                SELECT d.name, oi.quantity, d.price, oi.subtotal 
-                FROM order_items oi
-                JOIN dishes d ON oi.dish_id = d.id
-                WHERE oi.order_id = ?
-            """, (order_id,))
-            items = self.cursor.fetchall()
-            
-            for item in items:
+            for item in order['items']:
                 name = item['name']
                 quantity = item['quantity']
-                price = item['price']
-                subtotal = item['subtotal']
-                total_amount += subtotal
-                receipt.append(f"{name[:15]:<18} {quantity:<6} {price:.2f}CNY  {subtotal:.2f}CNY")
+                price = format_money(item['price_cents'])
+                subtotal = format_money(item['subtotal_cents'])
+                receipt.append(f"{name[:15]:<18} {quantity:<6} {price}CNY  {subtotal}CNY")
         
         receipt.append("-"*40)
-        receipt.append(f"{'Total:':<32} {total_amount:.2f}CNY")
+        for label, amount in self.bill_lines(bill):
+            receipt.append(f"{label + ':':<32} {amount}CNY")
         receipt.append(f"Payment Method: {payment_method}")
-        receipt.append(f"Received Amount: {received:.2f}CNY")
-        receipt.append(f"Change: {change:.2f}CNY")
+        receipt.append(f"Received Amount: {format_money(bill.received)}CNY")
+        receipt.append(f"Change: {format_money(bill.change)}CNY")
         receipt.append("="*40)
         receipt.append("Thank you for your patronage, come again soon!")
         
         return "\n".join(receipt)
     
-    def print_receipt(self, orders, total_amount, payment_method, checkout_time, received=0, change=0):
-        """Print receipt"""
+    @staticmethod
+    def bill_lines(bill):
+        """(label, amount) receipt lines for the bill total, with the charges that apply"""
+        lines = []
+        if bill.discount or bill.service_charge or bill.tax:
+            lines.append(("Subtotal", format_money(bill.subtotal)))
+            if bill.discount:
+                lines.append(("Discount", format_money(-bill.discount)))
+            if bill.service_charge:
+                lines.append(("Service Charge", format_money(bill.service_charge)))
+            if bill.tax:
+                lines.append(("Tax", format_money(bill.tax)))
+        lines.append(("Total", format_money(bill.total)))
+        return lines
+
+    def print_receipt(self, orders, bill, payment_method, checkout_time):
+        """Print receipt for a settled Bill"""
         receipt = f"""
         =================================
                 Restaurant Receipt
@@ -1383,27 +962,21 @@ class RestaurantApp:
         
         for order in orders:
             receipt += f"Order ID: {order['id']}\n"
-            # Get order details
-            self.cursor.execute("""
-                SELECT d.name, oi.quantity, oi.subtotal
-                FROM order_items oi
-                JOIN dishes d ON oi.dish_id = d.id
-                WHERE oi.order_id = ?
-            """, (order['id'],))
-            
-            for item in self.cursor.fetchall():
-                receipt += f"  {item['name']} ×{item['quantity']}  {item['subtotal']:.2f}CNY\n"
+            for item in order['items']:
+                receipt += f"  {item['name']} ×{item['quantity']}  {format_money(item['subtotal_cents'])}CNY\n"
         
-        receipt += f"""
+        receipt += """
         ---------------------------------
-        Amount Due: {total_amount:.2f}CNY
         """
+        for label, amount in self.bill_lines(bill):
+            label = "Amount Due" if label == "Total" else label
+            receipt += f"{label}: {amount}CNY\n"
         
         # Display received amount and change for cash payment
         if payment_method == "Cash Payment":
             receipt += f"""
-        Received Amount: {received:.2f}CNY
-        Change Amount: {change:.2f}CNY
+        Received Amount: {format_money(bill.received)}CNY
+        Change Amount: {format_money(bill.change)}CNY
         """
         
         receipt += f"""
@@ -1418,9 +991,7 @@ class RestaurantApp:
     # =========================================================================
     #  Kitchen Tab 
     # =========================================================================
-    def create_kitchen_tab(self):
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Kitchen View")
+    def create_kitchen_tab(self, tab):
 
         # Order Filtering Framework
         filter_frame = ttk.Frame(tab)
@@ -1443,7 +1014,8 @@ class RestaurantApp:
         kitchen_h_scroll.pack(side=tk.BOTTOM, fill=tk.X)
 
         self.kitchen_tree = ttk.Treeview(order_frame,
-                                        columns=("order_id", "table_number", "dish", "quantity", "status", "order_time"),
+                                        columns=("order_id", "table_number", "dish", "quantity", "status", "order_time",
+                                                 "start_by"),
                                         show="headings",
                                         yscrollcommand=kitchen_v_scroll.set,
                                         xscrollcommand=kitchen_h_scroll.set)
@@ -1457,8 +1029,11 @@ class RestaurantApp:
         self.kitchen_tree.heading("quantity", text="Quantity")
         self.kitchen_tree.heading("status", text="Status")
         self.kitchen_tree.heading("order_time", text="Order Time")
+        self.kitchen_tree.heading("start_by", text="Start By")
+        self.kitchen_tree.tag_configure("late", foreground="red")
 
         self.kitchen_tree.pack(fill=tk.BOTH, expand=True)
+        self.kitchen_binder = KeyedTreeBinder(self.kitchen_tree)
 
         # Status update button
         button_frame = ttk.Frame(tab)
@@ -1466,41 +1041,184 @@ class RestaurantApp:
         ttk.Button(button_frame, text="Start Preparation", command=self.start_preparation).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Mark as Served", command=self.mark_as_served).pack(side=tk.LEFT, padx=5)
 
+        # All-day view: open portions per dish, grouped by station, for cooking in batches
+        all_day_frame = ttk.LabelFrame(tab, text="All Day")
+        all_day_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        self.all_day_tree = ttk.Treeview(all_day_frame,
+                                         columns=("station", "dish", "pending", "in_progress", "tickets", "oldest"),
+                                         show="headings", height=8)
+        for col, text in (("station", "Station"), ("dish", "Dish"), ("pending", "Pending"),
+                          ("in_progress", "In Progress"), ("tickets", "Tickets"), ("oldest", "Oldest Ticket")):
+            self.all_day_tree.heading(col, text=text)
+        self.all_day_tree.pack(fill=tk.BOTH, expand=True)
+        self.all_day_binder = KeyedTreeBinder(self.all_day_tree)
+
+        batch_frame = ttk.Frame(tab)
+        batch_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        ttk.Button(batch_frame, text="Start Batch", command=self.start_batch).pack(side=tk.LEFT, padx=5)
+        ttk.Button(batch_frame, text="Complete Batch", command=self.complete_batch).pack(side=tk.LEFT, padx=5)
+
+        # Live updates: a full load now, then only the order items changed since (by any terminal)
+        self.kitchen_seq = None
+        self.kitchen_poll_pending = False
+        # Pending tickets in start-by order; the list shows them first, then the other items
+        self.kitchen_queue = KitchenScheduler()
+        self.kitchen_items = {}  # item_id -> row currently in the kitchen list
+        self.kitchen_late_shown = None  # late ticket count of the last render
         self.refresh_kitchen_orders()
+        self.root.after(KITCHEN_POLL_MS, self.poll_kitchen_orders)
 
     def refresh_kitchen_orders(self):
         """Refresh the kitchen order list, using status values that meet the constraints as query conditions."""
-        for item in self.kitchen_tree.get_children():
-            self.kitchen_tree.delete(item)
-        
+        if "kitchen" not in self.built_tabs:
+            return
         status_filter = self.kitchen_status_var.get()
-        query = """
-            SELECT oi.id, o.id as order_id, t.table_number, d.name as dish, oi.quantity, oi.status, o.order_date
-            FROM order_items oi
-            JOIN orders o ON oi.order_id = o.id
-            JOIN tables t ON o.table_id = t.id
-            JOIN dishes d ON oi.dish_id = d.id
-            WHERE 1=1
+        self.run_db(lambda engine: (engine.get_kitchen_snapshot(status_filter), engine.get_prep_estimates()),
+                    self.show_kitchen_orders)
+
+    def render_kitchen(self, changed=True):
         """
-        params = []
-        
-        # Filter criteria only use status values allowed by the database
-        if status_filter != "All":
-            query += " AND oi.status = ?"
-            params.append(status_filter) 
-        
-        query += " ORDER BY o.order_date DESC, oi.id"
-        self.cursor.execute(query, params)
-        
-        for row in self.cursor.fetchall():
-            self.kitchen_tree.insert("", "end", values=(
-                row['order_id'],
-                row['table_number'],
-                row['dish'],
-                row['quantity'],
-                row['status'],
-                row['order_date']
-            ), tags=(row['id'],))  
+        Re-bind the kitchen list. Without changed, only when another ticket passed its start-by
+        time since the last render (late_count only looks at the top of the heap), so idle polls cost nothing.
+        """
+        now = datetime.now().timestamp()
+        late = self.kitchen_queue.late_count(now)
+        if not changed and late == self.kitchen_late_shown:
+            return
+        self.kitchen_late_shown = late
+        self.kitchen_binder.bind(self.kitchen_rows(now))
+
+    def kitchen_rows(self, now):
+        """The kitchen list in display order: queued tickets by start-by time, then the rest newest first"""
+        queued = self.kitchen_queue.ordered()
+        others = sorted((row for item_id, row in self.kitchen_items.items() if item_id not in self.kitchen_queue),
+                        key=lambda row: (row['order_ts'] or 0, -row['id']), reverse=True)
+        rows = [(start_by, self.kitchen_items[item_id]) for start_by, item_id in queued]
+        rows += [(None, row) for row in others]
+        # Keyed by order item ID, which also stays in the tags (first) for the kitchen actions
+        return ((row['id'], (
+            row['order_id'],
+            row['table_number'],
+            row['dish'],
+            row['quantity'],
+            row['status'],
+            row['order_date'],
+            "" if start_by is None else datetime.fromtimestamp(start_by).strftime('%H:%M')
+        ), (row['id'], "late") if start_by is not None and start_by < now else (row['id'],)) for start_by, row in rows)
+
+    def apply_kitchen_rows(self, rows, removed_ids=()):
+        """Keep kitchen_items and the ticket queue in step with the rows loaded or polled"""
+        for item_id in removed_ids:
+            self.kitchen_items.pop(item_id, None)
+            self.kitchen_queue.remove(item_id)
+        for row in rows:
+            self.kitchen_items[row['id']] = row
+            if row['status'] == 'Pending':
+                self.kitchen_queue.push(row['id'], row['order_id'], row['dish_id'], row['order_ts'] / 1000)
+            else:
+                self.kitchen_queue.remove(row['id'])
+
+    def show_kitchen_orders(self, result):
+        (self.kitchen_seq, rows), estimates = result
+        self.kitchen_queue.clear()
+        self.kitchen_queue.set_estimates(estimates)
+        self.kitchen_items = {}
+        self.apply_kitchen_rows(rows)
+        self.render_kitchen()
+        self.refresh_kitchen_all_day()
+
+    def refresh_kitchen_all_day(self):
+        if "kitchen" not in self.built_tabs:
+            return
+        self.run_db(lambda engine: engine.list_kitchen_all_day(), self.show_kitchen_all_day, background=True)
+
+    def show_kitchen_all_day(self, rows):
+        now = datetime.now()
+
+        def age(order_date):
+            try:
+                minutes = int((now - datetime.strptime(order_date, '%Y-%m-%d %H:%M:%S')).total_seconds() // 60)
+            except (TypeError, ValueError):
+                return order_date
+            return f"{minutes} min" if minutes < 60 else f"{minutes // 60} h {minutes % 60} min"
+
+        self.all_day_binder.bind((row['dish_id'], (
+            row['station'] or "",
+            row['dish'],
+            row['pending'],
+            row['in_progress'],
+            row['tickets'],
+            age(row['oldest'])
+        ), (row['dish_id'],)) for row in rows)
+
+    def selected_batch_dish(self):
+        selected = self.all_day_tree.selection()
+        if not selected:
+            messagebox.showwarning("Warning", "Please select a dish in the All Day list")
+            return None
+        return int(self.all_day_tree.item(selected[0], "tags")[0])
+
+    def start_batch(self):
+        """Start every pending portion of the selected dish with one combined inventory deduction"""
+        dish_id = self.selected_batch_dish()
+        if dish_id is None:
+            return
+
+        def started(result):
+            name, items, portions = result
+            messagebox.showinfo("Success", f"Started {portions} x {name} ({items} tickets)")
+            self.refresh.mark_dirty("kitchen", "order", "inventory", "dishes")
+
+        self.run_db(lambda engine: engine.start_batch(dish_id), started, error_prefix="Failed to start batch: ")
+
+    def complete_batch(self):
+        """Mark every In Progress portion of the selected dish as completed"""
+        dish_id = self.selected_batch_dish()
+        if dish_id is None:
+            return
+
+        def completed(result):
+            name, items, portions = result
+            messagebox.showinfo("Success", f"Completed {portions} x {name} ({items} tickets)")
+            self.refresh.mark_dirty("kitchen", "order")
+
+        self.run_db(lambda engine: engine.complete_batch(dish_id), completed, error_prefix="Failed to complete batch: ")
+
+    def poll_kitchen_orders(self):
+        """Timer: pull kitchen changes every KITCHEN_POLL_MS"""
+        self.root.after(KITCHEN_POLL_MS, self.poll_kitchen_orders)
+        self.pull_kitchen_changes()
+
+    def pull_kitchen_changes(self):
+        """Fetch the order items changed since the last load; the re-bind only touches those rows"""
+        if "kitchen" not in self.built_tabs or self.kitchen_poll_pending or self.kitchen_seq is None:
+            return
+        self.kitchen_poll_pending = True
+        since = self.kitchen_seq
+        status_filter = self.kitchen_status_var.get()
+
+        def pulled(changes):
+            self.kitchen_poll_pending = False
+            # A full refresh (e.g. a filter change) replaced the list while this poll was queued
+            if since != self.kitchen_seq or status_filter != self.kitchen_status_var.get():
+                return
+            if changes.resync:
+                self.refresh_kitchen_orders()
+                return
+            self.kitchen_seq = changes.seq
+            changed = bool(changes.rows or changes.removed_ids)
+            if changed:
+                self.apply_kitchen_rows(changes.rows, changes.removed_ids)
+                self.refresh_kitchen_all_day()
+            # Checked on every poll as well, so tickets turn red when their start-by time passes
+            self.render_kitchen(changed)
+
+        def failed(e):
+            self.kitchen_poll_pending = False
+            print(f"Kitchen update failed: {e}")
+
+        self.run_db(lambda engine: engine.poll_kitchen_changes(since, status_filter), pulled,
+                    on_error=failed, background=True)
 
     def start_preparation(self):
         """Change the dish status to "In Progress" and deduct inventory"""
@@ -1512,48 +1230,12 @@ class RestaurantApp:
         # Get the selected order item ID
         item_id = self.kitchen_tree.item(selected[0], "tags")[0]
         
-        # Query order item details
-        self.cursor.execute("""
-            SELECT oi.dish_id, oi.quantity, oi.status, d.name
-            FROM order_items oi
-            JOIN dishes d ON oi.dish_id = d.id
-            WHERE oi.id = ?
-        """, (item_id,))
-        
-        item = self.cursor.fetchone()
-        if not item:
-            messagebox.showerror("Error", "Selected item not found")
-            return
-        
-        # Check if the current status is Pending
-        if item['status'] != 'Pending':
-            messagebox.showwarning("Warning", "Only pending items can be started")
-            return
-        
-        # Check and deduct inventory
-        result = self.check_and_deduct_ingredients(
-            dish_id=item['dish_id'],
-            quantity=item['quantity'],
-            deduct=True
-        )
-        
-        if not result:
-            messagebox.showerror("Inventory Error", "Failed to deduct ingredients. Check inventory status.")
-            return
-        
-        # Update status after successful inventory deduction
-        try:
-            self.cursor.execute(
-                "UPDATE order_items SET status = 'In Progress' WHERE id = ?",
-                (item_id,)
-            )
-            self.connection.commit()
-            messagebox.showinfo("Success", f"Started preparing {item['name']}")
-            self.refresh_kitchen_orders()
-            self.on_table_selected()  # Refresh order page display
-        except Exception as e:
-            self.connection.rollback()
-            messagebox.showerror("Error", f"Failed to update status: {str(e)}")
+        def started(name):
+            messagebox.showinfo("Success", f"Started preparing {name}")
+            self.refresh.mark_dirty("kitchen", "order", "inventory", "dishes")  # Kitchen list and order page display
+
+        # Check the item is pending, deduct inventory and update its status
+        self.run_db(lambda engine: engine.start_preparation(item_id), started, error_prefix="Failed to update status: ")
 
     def mark_as_served(self):
         """Change the dish status to 'Completed' (order item) and synchronously update the order status to 'Served' (in compliance with the orders table constraints)"""
@@ -1564,61 +1246,12 @@ class RestaurantApp:
         
         item_id = self.kitchen_tree.item(selected[0], "tags")[0]
         
-        # Check if the current status is In Progress (can only be changed from In Progress to Completed)
-        self.cursor.execute("""
-            SELECT status, d.name 
-            FROM order_items oi 
-            JOIN dishes d ON oi.dish_id = d.id 
-            WHERE oi.id = ?
-        """, (item_id,))
-        item = self.cursor.fetchone()
-        
-        if not item:
-            messagebox.showerror("Error", "Selected item not found")
-            return
-            
-        if item['status'] != 'In Progress':
-            messagebox.showwarning("Warning", "Only items in progress can be marked as completed")
-            return
-        
-        try:
-            # 1. Update the order item status to 'Completed' (assuming the order_items table constraints allow it)
-            self.cursor.execute(
-                "UPDATE order_items SET status = 'Completed' WHERE id = ?",
-                (item_id,)
-            )
-            
-            # 2. Get the order ID to which the current order item belongs
-            self.cursor.execute("""
-                SELECT o.id 
-                FROM orders o
-                JOIN order_items oi ON o.id = oi.order_id
-                WHERE oi.id = ?
-            """, (item_id,))
-            order_id = self.cursor.fetchone()['id']
-            
-            # 3. Check if all dishes in this order have been completed
-            self.cursor.execute("""
-                SELECT COUNT(*) as remaining 
-                FROM order_items 
-                WHERE order_id = ? AND status != 'Completed'
-            """, (order_id,))
-            
-            # 4. If all dishes are completed, update the order status to 'Served' (in compliance with the CHECK constraint in the orders table).
-            if self.cursor.fetchone()['remaining'] == 0:
-                self.cursor.execute("""
-                    UPDATE orders 
-                    SET status = 'Served' 
-                    WHERE id = ?
-                """, (order_id,))
-            
-            self.connection.commit()
-            messagebox.showinfo("Success", f"{item['name']} marked as completed")
-            self.refresh_kitchen_orders()
-            self.on_table_selected()  # Refresh order page display
-        except Exception as e:
-            self.connection.rollback()
-            messagebox.showerror("Error", f"Failed to update status: {str(e)}")
+        def served(name):
+            messagebox.showinfo("Success", f"{name} marked as completed")
+            self.refresh.mark_dirty("kitchen", "order")  # Kitchen list and order page display
+
+        # Only In Progress items can become Completed; the order becomes 'Served' once all of its items are completed
+        self.run_db(lambda engine: engine.mark_as_served(item_id), served, error_prefix="Failed to update status: ")
 
     def update_kitchen_item_status(self, event):
         """Double-click to directly switch the order item status: Pending → In Progress → Completed"""
@@ -1626,79 +1259,19 @@ class RestaurantApp:
         if not sel:
             return
         
-        item = self.kitchen_tree.item(sel[0])
-        item_id = item['values'][0]
-        current_status = item['values'][4]
+        item_id = self.kitchen_tree.item(sel[0], "tags")[0]
         
-        # Define the state switching sequence
-        status_sequence = {
-            "Pending": "In Progress",
-            "In Progress": "Completed",
-            "Completed": "Completed"  # The status will not change once completed.
-        }
-        
-        # Get new status
-        new_status = status_sequence.get(current_status, current_status)
-        
-        # If the status remains unchanged, no action is required.
-        if new_status == current_status:
-            return
-        
-        # Update database
-        try:
-            self.cursor.execute(
-                "UPDATE order_items SET status = ? WHERE id = ?",
-                (new_status, item_id)
-            )
-            self.connection.commit()
-            
-            # If all items are completed, update the order status
-            self.cursor.execute("SELECT order_id FROM order_items WHERE id = ?", (item_id,))
-            order_id = self.cursor.fetchone()['order_id']
-            
-            self.cursor.execute("SELECT status FROM order_items WHERE order_id = ?", (order_id,))
-            all_statuses = [row['status'] for row in self.cursor.fetchall()]
-            
-            if all(s == "Completed" for s in all_statuses):
-                self.cursor.execute("UPDATE orders SET status = 'Served' WHERE id = ?", (order_id,))
-                self.connection.commit()
-            
-            self.refresh_kitchen_orders()
-            # Refresh the order management interface simultaneously
-            self.on_table_selected()
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to update status: {str(e)}")
+        def advanced(_):
+            # Refresh the kitchen list and the order management interface simultaneously
+            self.refresh.mark_dirty("kitchen", "order", "inventory", "dishes")
+
+        # Update database; the order becomes 'Served' once all of its items are completed
+        self.run_db(lambda engine: engine.advance_item_status(item_id), advanced, error_prefix="Failed to update status: ")
 
-    def refresh_kitchen_view(self):
-        """Refresh kitchen view (using database-allowed status values)"""
-        for item in self.kitchen_tree.get_children():
-            self.kitchen_tree.delete(item)
-        
-        self.cursor.execute("""
-            SELECT oi.order_id, t.table_number, d.name, oi.status, o.order_date
-            FROM order_items oi
-            JOIN orders o ON oi.order_id = o.id
-            JOIN tables t ON o.table_id = t.id
-            JOIN dishes d ON oi.dish_id = d.id
-            WHERE o.status IN ('In Progress', 'Served') 
-            ORDER BY o.order_date DESC, oi.status
-        """)
-        
-        for row in self.cursor.fetchall():
-            self.kitchen_tree.insert("", "end", values=(
-                row['order_id'],
-                row['table_number'],
-                row['name'],
-                row['status'],
-                row['order_date']
-            ))
     # =========================================================================
     # Inventory Management Tab 
     # =========================================================================
-    def create_inventory_tab(self):
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Inventory Management")
+    def create_inventory_tab(self, tab):
 
         # Buttons
         button_frame = ttk.Frame(tab)
@@ -1720,7 +1293,7 @@ class RestaurantApp:
 
         self.inventory_tree = ttk.Treeview(
             inventory_container,
-            columns=("id", "name", "unit", "stock", "low_stock_threshold", "status"),
+            columns=("id", "name", "unit", "stock", "reserved", "available", "low_stock_threshold", "status"),
             show="headings",
             yscrollcommand=v_scrollbar_inventory.set,
             xscrollcommand=h_scrollbar_inventory.set
@@ -1730,32 +1303,41 @@ class RestaurantApp:
         v_scrollbar_inventory.config(command=self.inventory_tree.yview)
         h_scrollbar_inventory.config(command=self.inventory_tree.xview)
 
-        for col in ("id", "name", "unit", "stock", "low_stock_threshold", "status"):
+        for col in ("id", "name", "unit", "stock", "reserved", "available", "low_stock_threshold", "status"):
             self.inventory_tree.heading(col, text=col)
         self.inventory_tree.pack(fill=tk.BOTH, expand=True)
+        self.inventory_binder = KeyedTreeBinder(self.inventory_tree)
 
         self.refresh_inventory()
 
     def refresh_inventory(self):
-        for item in self.inventory_tree.get_children():
-            self.inventory_tree.delete(item)
-        self.cursor.execute("SELECT * FROM ingredients s")
-        for row in self.cursor.fetchall():
+        if "inventory" not in self.built_tabs:
+            return
+        self.run_db(lambda engine: engine.list_ingredients(), self.show_inventory)
+
+    def show_inventory(self, ingredients):
+        rows = []
+        for row in ingredients:
             # Format stock to two decimal places
             formatted_stock = f"{row['stock']:.2f}"
+            # Stock not yet promised to submitted orders
+            available = row['stock'] - row['reserved']
             # Determine inventory status
-            if row['stock'] <= row['low_stock_threshold']:
+            if available <= row['low_stock_threshold']:
                 status = "Need Restock"
             else:
                 status = "Normal"
-            self.inventory_tree.insert("", "end", values=(
+            rows.append((row['id'], (
                 row['id'],
                 row['name'],
                 row['unit'],
                 formatted_stock,  # Display two decimal places
+                f"{row['reserved']:.2f}",
+                f"{available:.2f}",
                 row['low_stock_threshold'],
                 status  # Add status information
-            ))
+            ), ()))
+        self.inventory_binder.bind(rows)
 
     def add_ingredient(self):
         name = simpledialog.askstring("Add Ingredient", "Ingredient Name:")
@@ -1769,20 +1351,16 @@ class RestaurantApp:
         try:
             stock = float(simpledialog.askstring("Add Ingredient", "Initial Stock:"))
             threshold = float(simpledialog.askstring("Add Ingredient", "Low Stock Threshold:"))
-            
-            self.cursor.execute("""
-                INSERT INTO ingredients (name, unit, stock, low_stock_threshold)
-                VALUES (?, ?, ?, ?)
-            """, (name, unit, stock, threshold))
-            
-            self.connection.commit()
-            self.refresh_inventory()
-            messagebox.showinfo("Success", f"Ingredient '{name}' added successfully")
-            
-        except ValueError:
+        except (TypeError, ValueError):
             messagebox.showerror("Error", "Stock and threshold must be numbers")
-        except Exception as e:
-            messagebox.showerror("Error", f"Add failed: {str(e)}")
+            return
+
+        def added(_):
+            self.refresh.mark_dirty("inventory", "dishes")
+            messagebox.showinfo("Success", f"Ingredient '{name}' added successfully")
+
+        self.run_db(lambda engine: engine.add_ingredient(name, unit, stock, threshold), added,
+                    error_prefix="Add failed: ")
 
     def delete_ingredient(self):
         sel = self.inventory_tree.selection()
@@ -1795,22 +1373,18 @@ class RestaurantApp:
         if not values:
             return
             
-        ingredient_id, name, unit, stock, threshold, status = values
+        ingredient_id, name, unit, stock, reserved, available, threshold, status = values
 
         # Confirm deletion
         confirm = messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete '{name}'?")
         if not confirm:
             return
 
-        try:
-            self.cursor.execute("DELETE FROM ingredients WHERE id = ?", (ingredient_id,))
-            self.connection.commit()
-            
-            self.refresh_inventory()
+        def deleted(_):
+            self.refresh.mark_dirty("inventory", "dishes")
             messagebox.showinfo("Success", f"Ingredient '{name}' has been deleted")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Delete failed: {str(e)}")
+
+        self.run_db(lambda engine: engine.delete_ingredient(ingredient_id), deleted, error_prefix="Delete failed: ")
 
     def update_ingredient(self):
         sel = self.inventory_tree.selection()
@@ -1824,7 +1398,7 @@ class RestaurantApp:
             return
             
         # Adjust variable count to match columns including status
-        ingredient_id, name, unit, current_stock, threshold, status = values
+        ingredient_id, name, unit, current_stock, reserved, available, threshold, status = values
         
         try:
             new_stock = float(simpledialog.askstring(
@@ -1833,23 +1407,192 @@ class RestaurantApp:
                 initialvalue=current_stock
             ))
             
-            if new_stock < 0:
-                messagebox.showerror("Error", "Stock cannot be negative")
-                return
-                
-            self.cursor.execute(
-                "UPDATE ingredients SET stock = ? WHERE id = ?",
-                (new_stock, ingredient_id)
-            )
-            
-            self.connection.commit()
-            self.refresh_inventory()
+        except (TypeError, ValueError):
+            messagebox.showerror("Error", "Stock must be a number")
+            return
+
+        if new_stock < 0:
+            messagebox.showerror("Error", "Stock cannot be negative")
+            return
+
+        def updated(_):
+            self.refresh.mark_dirty("inventory", "dishes")
             messagebox.showinfo("Success", f"Ingredient '{name}' stock has been updated")
-            
+
+        self.run_db(lambda engine: engine.set_ingredient_stock(ingredient_id, new_stock), updated,
+                    error_prefix="Update failed: ")
+
+    # =========================================================================
+    # Reports Tab
+    # =========================================================================
+    def create_reports_tab(self, tab):
+
+        # Controls
+        control_frame = ttk.Frame(tab)
+        control_frame.pack(fill=tk.X, padx=10, pady=10)
+        ttk.Label(control_frame, text="Period:").pack(side=tk.LEFT)
+        self.report_period_var = tk.StringVar(value="Last 90 days")
+        period_combo = ttk.Combobox(control_frame, textvariable=self.report_period_var, values=list(REPORT_PERIODS),
+                                    state="readonly", width=15)
+        period_combo.pack(side=tk.LEFT, padx=5)
+        period_combo.bind("<<ComboboxSelected>>", lambda e: self.refresh_reports())
+        ttk.Label(control_frame, text="Group by:").pack(side=tk.LEFT, padx=(15, 0))
+        self.report_by_var = tk.StringVar(value="dish")
+        by_combo = ttk.Combobox(control_frame, textvariable=self.report_by_var, values=REPORT_GROUPINGS,
+                                state="readonly", width=10)
+        by_combo.pack(side=tk.LEFT, padx=5)
+        by_combo.bind("<<ComboboxSelected>>", lambda e: self.refresh_reports())
+        ttk.Button(control_frame, text="Refresh", command=self.refresh_reports).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Rebuild Rollups", command=self.rebuild_reports).pack(side=tk.LEFT, padx=5)
+
+        # Report List
+        report_frame = ttk.Frame(tab)
+        report_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        report_v_scroll = ttk.Scrollbar(report_frame, orient=tk.VERTICAL)
+        report_v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.report_tree = ttk.Treeview(report_frame, columns=("label", "count", "revenue", "share"), show="headings",
+                                        yscrollcommand=report_v_scroll.set)
+        report_v_scroll.config(command=self.report_tree.yview)
+        for col, text, width in [("label", "Dish", 250), ("count", "Items", 100), ("revenue", "Revenue", 120),
+                                 ("share", "Share", 80)]:
+            self.report_tree.heading(col, text=text)
+            self.report_tree.column(col, width=width)
+        self.report_tree.pack(fill=tk.BOTH, expand=True)
+        self.report_total_var = tk.StringVar(value="")
+        ttk.Label(tab, textvariable=self.report_total_var, anchor=tk.W).pack(fill=tk.X, padx=10, pady=10)
+
+        self.refresh_reports()
+
+    def refresh_reports(self):
+        if "reports" not in self.built_tabs:
+            return
+        start_day, end_day = period(REPORT_PERIODS[self.report_period_var.get()])
+        by = self.report_by_var.get()
+        self.run_db(lambda engine: sales_summary(engine.read_connection, start_day, end_day, by),
+                    lambda rows: self.show_reports(rows, by), background=True)
+
+    def show_reports(self, rows, by):
+        count_label = "Items" if by == "dish" else "Orders"
+        self.report_tree.heading("label", text=by.capitalize())
+        self.report_tree.heading("count", text=count_label)
+        total = sum(row['revenue_cents'] for row in rows)
+        self.report_tree.delete(*self.report_tree.get_children())
+        for row in rows:
+            share = row['revenue_cents'] / total * 100 if total else 0
+            self.report_tree.insert("", tk.END, values=(row['label'], row['count'],
+                                                        f"¥{format_money(row['revenue_cents'])}", f"{share:.1f}%"))
+        self.report_total_var.set(
+            f"{count_label}: {sum(row['count'] for row in rows)}    Revenue: ¥{format_money(total)}")
+
+    def rebuild_reports(self):
+        """Catch-up job for paid orders that reached the database without the checkout trigger (bulk loads, restores)"""
+        if not messagebox.askyesno("Confirm", "Recompute the sales rollups from all paid orders?"):
+            return
+
+        def rebuilt(_):
+            messagebox.showinfo("Success", "Sales rollups rebuilt")
+            self.refresh.mark_dirty("reports")
+        self.run_db(lambda engine: rebuild_rollups(engine.connection), rebuilt, error_prefix="Rebuild failed: ")
+
+    # =========================================================================
+    # Diagnostics Tab
+    # =========================================================================
+    def create_diagnostics_tab(self, tab):
+
+        # Controls
+        control_frame = ttk.Frame(tab)
+        control_frame.pack(fill=tk.X, padx=10, pady=10)
+        self.trace_var = tk.BooleanVar(value=profiler.enabled)
+        ttk.Checkbutton(control_frame, text="Trace SQL and actions", variable=self.trace_var,
+                        command=self.toggle_tracing).pack(side=tk.LEFT, padx=5)
+        ttk.Label(control_frame, text="Slow query (ms):").pack(side=tk.LEFT, padx=(15, 5))
+        self.slow_ms_var = tk.StringVar(value=f"{profiler.slow_ms:g}")
+        slow_entry = ttk.Entry(control_frame, textvariable=self.slow_ms_var, width=8)
+        slow_entry.pack(side=tk.LEFT)
+        slow_entry.bind("<Return>", lambda e: self.set_slow_threshold())
+        ttk.Button(control_frame, text="Refresh", command=self.refresh_diagnostics).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Reset", command=self.reset_diagnostics).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Dump JSON", command=self.dump_diagnostics).pack(side=tk.LEFT, padx=5)
+        self.diagnostics_summary = tk.StringVar(value="")
+        ttk.Label(tab, textvariable=self.diagnostics_summary, anchor=tk.W).pack(fill=tk.X, padx=10)
+
+        panes = ttk.PanedWindow(tab, orient=tk.VERTICAL)
+        panes.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        latency_columns = ("count", "rows", "total_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms")
+
+        # Per-action latency (ui: Tk handler, db: worker thread, (result): displaying the result)
+        self.action_tree = ttk.Treeview(panes, columns=("action",) + latency_columns, show="headings", height=8)
+        # Per-statement latency; "traced" counts statements SQLite ran, including trigger bodies
+        self.statement_tree = ttk.Treeview(panes, columns=latency_columns + ("traced", "sql"), show="headings",
+                                           height=10)
+        self.slow_tree = ttk.Treeview(panes, columns=("time", "ms", "rows", "action", "sql"), show="headings",
+                                      height=6)
+        for tree in (self.action_tree, self.statement_tree, self.slow_tree):
+            for col in tree["columns"]:
+                tree.heading(col, text=col)
+                tree.column(col, width=400 if col == "sql" else 160 if col in ("action", "time") else 70,
+                            stretch=col == "sql")
+            panes.add(tree, weight=1)
+        self.action_binder = KeyedTreeBinder(self.action_tree)
+        self.statement_binder = KeyedTreeBinder(self.statement_tree)
+
+        self.refresh_diagnostics()
+
+    def toggle_tracing(self):
+        if self.trace_var.get():
+            profiler.enable()
+        else:
+            profiler.disable()
+        self.refresh_diagnostics()
+
+    def set_slow_threshold(self):
+        try:
+            profiler.slow_ms = float(self.slow_ms_var.get())
         except ValueError:
-            messagebox.showerror("Error", "Stock must be a number")
-        except Exception as e:
-            messagebox.showerror("Error", f"Update failed: {str(e)}")
+            messagebox.showerror("Error", "Please enter a number of milliseconds")
+            self.slow_ms_var.set(f"{profiler.slow_ms:g}")
+
+    def refresh_diagnostics(self):
+        """Reads the in-memory profiler only, so it runs on the Tk thread"""
+        if "diagnostics" not in self.built_tabs:
+            return
+        snapshot = profiler.snapshot()
+        latency_keys = ("count", "rows", "total_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms")
+
+        actions = sorted(snapshot["actions"].items(), key=lambda item: -item[1]["total_ms"])
+        self.action_binder.bind(
+            (name, (name,) + tuple(stats[key] for key in latency_keys), ()) for name, stats in actions
+        )
+        statements = sorted(snapshot["statements"].items(), key=lambda item: -item[1]["total_ms"])
+        self.statement_binder.bind(
+            (sql, tuple(stats[key] for key in latency_keys) + (stats["traced"], sql), ()) for sql, stats in statements
+        )
+        self.slow_tree.delete(*self.slow_tree.get_children())
+        for entry in reversed(snapshot["slow_queries"]):
+            self.slow_tree.insert("", tk.END, values=(entry["time"], entry["ms"], entry["rows"],
+                                                      entry["action"] or "", entry["sql"]))
+
+        state = "on" if snapshot["enabled"] else "off"
+        self.diagnostics_summary.set(f"Tracing {state} since {snapshot['since'] or '-'}; "
+                                     f"{len(statements)} statements, {len(snapshot['slow_queries'])} slow; "
+                                     f"{self.refresh.summary()}")
+
+    def reset_diagnostics(self):
+        profiler.reset()
+        self.refresh_diagnostics()
+
+    def dump_diagnostics(self):
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json", filetypes=[("JSON", "*.json")],
+            initialfile=f"diagnostics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        if not path:
+            return
+        try:
+            profiler.dump_json(path)
+            messagebox.showinfo("Success", f"Diagnostics written to {path}")
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not write {path}: {str(e)}")
 
 if __name__ == "__main__":
     root = tk.Tk()
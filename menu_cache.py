@@ -0,0 +1,78 @@
+"""
+Process-wide menu and recipe cache.
+
+Dishes and their recipes (dish_ingredients) are loaded once and kept in memory,
+keyed by dish_id, with each recipe stored as two parallel compact arrays.
+Every change to dishes, dish_ingredients or ingredient names/units bumps
+catalog_version (maintained by triggers, see migrations.py), and engines check
+PRAGMA data_version before trusting the cache, so edits made by another process
+are picked up without re-reading the menu on every call.
+"""
+import threading
+from array import array
+from collections import namedtuple
+
+DishEntry = namedtuple("DishEntry", "id name price_cents category is_available ingredient_ids quantities")
+IngredientEntry = namedtuple("IngredientEntry", "id name unit")
+
+
+class MenuCache:
+    def __init__(self):
+        self.version = None  # catalog_version the cache was loaded at, None when invalid
+        self.dishes = {}
+        self.ingredients = {}
+        self.dishes_by_ingredient = {}  # ingredient_id -> dish IDs whose recipe uses it
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self.version = None
+
+    def ensure_current(self, connection, check_version=True):
+        """Reload when invalidated, or when catalog_version moved (check_version=False skips the lookup)"""
+        if self.version is not None and not check_version:
+            return
+        version = connection.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()[0]
+        if version != self.version:
+            with self._lock:
+                if version != self.version:
+                    self._load(connection, version)
+
+    def _load(self, connection, version):
+        ingredients = {
+            row[0]: IngredientEntry(row[0], row[1], row[2])
+            for row in connection.execute("SELECT id, name, unit FROM ingredients")
+        }
+
+        recipes = {}
+        for dish_id, ingredient_id, quantity in connection.execute(
+                "SELECT dish_id, ingredient_id, quantity FROM dish_ingredients ORDER BY dish_id"):
+            ids, quantities = recipes.setdefault(dish_id, (array('q'), array('d')))
+            ids.append(ingredient_id)
+            quantities.append(quantity)
+
+        dishes = {}
+        dishes_by_ingredient = {}
+        for dish_id, name, price_cents, category, is_available in connection.execute(
+                "SELECT id, name, price_cents, category, is_available FROM dishes ORDER BY id"):
+            ids, quantities = recipes.get(dish_id, (array('q'), array('d')))
+            dishes[dish_id] = DishEntry(dish_id, name, price_cents, category, is_available, ids, quantities)
+            for ingredient_id in ids:
+                dishes_by_ingredient.setdefault(ingredient_id, array('q')).append(dish_id)
+
+        self.dishes = dishes
+        self.ingredients = ingredients
+        self.dishes_by_ingredient = dishes_by_ingredient
+        self.version = version
+
+    def available_dishes(self):
+        return [dish for dish in self.dishes.values() if dish.is_available == 1]
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_menu_cache(db_path):
+    """The shared cache for a database file (one per process)"""
+    with _caches_lock:
+        return _caches.setdefault(db_path, MenuCache())
@@ -0,0 +1,989 @@
+"""
+Versioned schema migrations.
+
+The schema version is stored in SQLite's PRAGMA user_version. Each migration
+runs once, in its own transaction, and bumps user_version when it succeeds,
+so startup never has to probe the schema again.
+"""
+import re
+
+
+def _baseline_schema(cursor):
+    """Tables created by the original connect_to_database"""
+    # 1. Tables Table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tables (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_number TEXT UNIQUE NOT NULL,
+            capacity INTEGER NOT NULL,
+            status TEXT NOT NULL CHECK(status IN ('Free', 'Occupied', 'Reserved', 'Under Maintenance')) DEFAULT 'Free'
+        )
+    ''')
+
+    # 2. Dishes Table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dishes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            price REAL NOT NULL,
+            category TEXT,
+            description TEXT,
+            is_available INTEGER DEFAULT 1
+        )
+    ''')
+
+    # 3. Ingredients Table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingredients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            unit TEXT NOT NULL,
+            stock REAL NOT NULL,
+            low_stock_threshold REAL NOT NULL
+        )
+    ''')
+
+    # 4. Dish-Ingredients Association Table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dish_ingredients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dish_id INTEGER NOT NULL,
+            ingredient_id INTEGER NOT NULL,
+            quantity REAL NOT NULL,
+            FOREIGN KEY (dish_id) REFERENCES dishes(id) ON DELETE CASCADE,
+            FOREIGN KEY (ingredient_id) REFERENCES ingredients(id) ON DELETE CASCADE,
+            UNIQUE (dish_id, ingredient_id)
+        )
+    ''')
+
+    # 5. Orders Table (checkout amounts are added by migration 2)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_id INTEGER NOT NULL,
+            created_by TEXT NOT NULL,
+            order_date TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            total_amount REAL,
+            status TEXT DEFAULT 'Placed',
+            checkout_time TEXT,
+            payment_method TEXT,
+            FOREIGN KEY (table_id) REFERENCES tables(id) ON UPDATE CASCADE ON DELETE CASCADE
+        )
+    ''')
+
+    # 6. Order Items Table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            dish_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            subtotal REAL NOT NULL,
+            status TEXT DEFAULT 'Pending',
+            FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
+            FOREIGN KEY (dish_id) REFERENCES dishes(id) ON UPDATE CASCADE
+        )
+    ''')
+
+    # 7. Inventory Logs Table (change types match restaurant_system.sql and the values written on deduction)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS inventory_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ingredient_id INTEGER NOT NULL,
+            change_type TEXT NOT NULL CHECK(change_type IN ('Stock In','Stock Out','Adjustment')),
+            quantity REAL NOT NULL,
+            old_stock REAL NOT NULL,
+            new_stock REAL NOT NULL,
+            reason TEXT,
+            created_by TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (ingredient_id) REFERENCES ingredients(id) ON UPDATE CASCADE
+        )
+    ''')
+
+
+def _checkout_amounts(cursor):
+    """Received/change columns on orders (databases created by older builds may already have them)"""
+    cursor.execute("PRAGMA table_info(orders)")
+    order_columns = [row[1] for row in cursor.fetchall()]
+    if "received_amount" not in order_columns:
+        cursor.execute("ALTER TABLE orders ADD COLUMN received_amount REAL")
+    if "change_amount" not in order_columns:
+        cursor.execute("ALTER TABLE orders ADD COLUMN change_amount REAL")
+
+
+def _hot_query_indexes(cursor):
+    """Indexes for the per-table order lookups, per-order item lookups and kitchen status filter"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_table_status ON orders (table_id, status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_order_items_order_status ON order_items (order_id, status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_order_items_status ON order_items (status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_inventory_logs_ingredient_time ON inventory_logs (ingredient_id, created_at)")
+    cursor.execute("ANALYZE")
+
+
+def _catalog_version(cursor):
+    """Counter bumped by triggers whenever the menu, recipes or ingredient names change (read by menu_cache)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)")
+    # Stock updates must not invalidate the cache, so ingredients only track name/unit changes
+    watched = [
+        ("dishes", "INSERT", ""), ("dishes", "UPDATE", ""), ("dishes", "DELETE", ""),
+        ("dish_ingredients", "INSERT", ""), ("dish_ingredients", "UPDATE", ""), ("dish_ingredients", "DELETE", ""),
+        ("ingredients", "INSERT", ""), ("ingredients", "UPDATE", " OF name, unit"), ("ingredients", "DELETE", ""),
+    ]
+    for table, event, columns in watched:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_catalog_version
+            AFTER {event}{columns} ON {table}
+            BEGIN
+                UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+
+def _app_settings(cursor):
+    """Key/value settings, e.g. the seed data stamp checked by the startup fast path"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS app_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+
+
+def _order_total_triggers(cursor):
+    """
+    Materialized money totals kept in step by triggers:
+    orders.total_amount = SUM(order_items.subtotal), and
+    tables.open_balance = SUM(total_amount) of the table's Placed/In Progress/Served orders.
+    """
+    open_statuses = "('Placed', 'In Progress', 'Served')"
+
+    cursor.execute("PRAGMA table_info(tables)")
+    if "open_balance" not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE tables ADD COLUMN open_balance REAL NOT NULL DEFAULT 0")
+
+    # 1. Backfill open orders and every table's balance (paid history is left as recorded, see OrderEngine.find_total_drift)
+    cursor.execute(f'''
+        UPDATE orders SET total_amount = ROUND((
+            SELECT COALESCE(SUM(subtotal), 0) FROM order_items WHERE order_id = orders.id
+        ), 2)
+        WHERE status IN {open_statuses}
+    ''')
+    cursor.execute(f'''
+        UPDATE tables SET open_balance = ROUND((
+            SELECT COALESCE(SUM(total_amount), 0) FROM orders
+            WHERE table_id = tables.id AND status IN {open_statuses}
+        ), 2)
+    ''')
+
+    # 2. Item changes move the order total
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_insert_total
+        AFTER INSERT ON order_items
+        BEGIN
+            UPDATE orders SET total_amount = ROUND(COALESCE(total_amount, 0) + NEW.subtotal, 2)
+            WHERE id = NEW.order_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_delete_total
+        AFTER DELETE ON order_items
+        BEGIN
+            UPDATE orders SET total_amount = ROUND(COALESCE(total_amount, 0) - OLD.subtotal, 2)
+            WHERE id = OLD.order_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_update_total
+        AFTER UPDATE OF subtotal, order_id ON order_items
+        BEGIN
+            UPDATE orders SET total_amount = ROUND(COALESCE(total_amount, 0) - OLD.subtotal, 2)
+            WHERE id = OLD.order_id;
+            UPDATE orders SET total_amount = ROUND(COALESCE(total_amount, 0) + NEW.subtotal, 2)
+            WHERE id = NEW.order_id;
+        END
+    ''')
+
+    # 3. Order total, status and table changes move the table's open balance
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_insert_open_balance
+        AFTER INSERT ON orders
+        WHEN NEW.status IN {open_statuses} AND COALESCE(NEW.total_amount, 0) != 0
+        BEGIN
+            UPDATE tables SET open_balance = ROUND(open_balance + NEW.total_amount, 2) WHERE id = NEW.table_id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_delete_open_balance
+        AFTER DELETE ON orders
+        WHEN OLD.status IN {open_statuses} AND COALESCE(OLD.total_amount, 0) != 0
+        BEGIN
+            UPDATE tables SET open_balance = ROUND(open_balance - OLD.total_amount, 2) WHERE id = OLD.table_id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_update_open_balance
+        AFTER UPDATE OF total_amount, status, table_id ON orders
+        WHEN OLD.status IN {open_statuses} OR NEW.status IN {open_statuses}
+        BEGIN
+            UPDATE tables SET open_balance = ROUND(open_balance - COALESCE(OLD.total_amount, 0), 2)
+            WHERE id = OLD.table_id AND OLD.status IN {open_statuses};
+            UPDATE tables SET open_balance = ROUND(open_balance + COALESCE(NEW.total_amount, 0), 2)
+            WHERE id = NEW.table_id AND NEW.status IN {open_statuses};
+        END
+    ''')
+
+
+def _kitchen_change_log(cursor):
+    """
+    Append-only log of order_items changes for live displays.
+    Readers remember the last seq they saw and fetch "seq > ?" through the rowid,
+    so a poll costs the same however long the order history is. Every 1000th
+    entry trims the log to the latest 10000.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_item_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL
+        )
+    ''')
+    for event, row in (("INSERT", "NEW"), ("UPDATE OF status, quantity, order_id, dish_id", "NEW"), ("DELETE", "OLD")):
+        name = event.split()[0].lower()
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_order_items_{name}_change_log
+            AFTER {event} ON order_items
+            BEGIN
+                INSERT INTO order_item_changes (item_id) VALUES ({row}.id);
+            END
+        ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_order_item_changes_trim
+        AFTER INSERT ON order_item_changes
+        WHEN NEW.seq % 1000 = 0
+        BEGIN
+            DELETE FROM order_item_changes WHERE seq <= NEW.seq - 10000;
+        END
+    ''')
+
+
+def _archive_index(cursor):
+    """Lets archive.py find finished orders older than the cut-off without scanning the live table"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_status_checkout ON orders (status, checkout_time)")
+
+
+def _inventory_reservations(cursor):
+    """
+    Ingredient reservations held by submitted, not yet started order items.
+    submit_order inserts one row per (item, ingredient); triggers drop them when the item
+    leaves Pending (preparation deducts the stock instead), is deleted, or its order is
+    cancelled or paid. Available-to-promise is stock minus the ingredient's reservations,
+    summed through the covering (ingredient_id, quantity) index.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS inventory_reservations (
+            order_item_id INTEGER NOT NULL,
+            ingredient_id INTEGER NOT NULL,
+            quantity REAL NOT NULL,
+            PRIMARY KEY (order_item_id, ingredient_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_reservations_ingredient ON inventory_reservations (ingredient_id, quantity)"
+    )
+
+    # 1. Orders submitted before this migration reserve what their pending items still need
+    cursor.execute('''
+        INSERT OR IGNORE INTO inventory_reservations (order_item_id, ingredient_id, quantity)
+        SELECT oi.id, di.ingredient_id, di.quantity * oi.quantity
+        FROM order_items oi
+        JOIN orders o ON o.id = oi.order_id
+        JOIN dish_ingredients di ON di.dish_id = oi.dish_id
+        WHERE oi.status = 'Pending' AND o.status = 'In Progress'
+    ''')
+
+    # 2. Release paths
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_status_release
+        AFTER UPDATE OF status ON order_items
+        WHEN OLD.status = 'Pending' AND NEW.status != 'Pending'
+        BEGIN
+            DELETE FROM inventory_reservations WHERE order_item_id = OLD.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_delete_release
+        AFTER DELETE ON order_items
+        BEGIN
+            DELETE FROM inventory_reservations WHERE order_item_id = OLD.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_quantity_reservation
+        AFTER UPDATE OF quantity ON order_items
+        WHEN OLD.quantity != NEW.quantity AND OLD.quantity > 0
+        BEGIN
+            UPDATE inventory_reservations SET quantity = quantity * NEW.quantity / OLD.quantity
+            WHERE order_item_id = NEW.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_closed_release
+        AFTER UPDATE OF status ON orders
+        WHEN NEW.status IN ('Paid', 'Cancelled') AND OLD.status != NEW.status
+        BEGIN
+            DELETE FROM inventory_reservations
+            WHERE order_item_id IN (SELECT id FROM order_items WHERE order_id = NEW.id);
+        END
+    ''')
+
+
+def _prep_times(cursor):
+    """
+    Learned prep times. Triggers stamp order_items.started_at/completed_at on the
+    Pending -> In Progress -> Completed transitions, and each completion folds its
+    duration into dish_prep_times: a running mean over the first 20 samples, then an
+    exponential moving average with the same weight, so estimates follow the kitchen
+    as it speeds up or slows down. Durations over two hours (an item left In Progress)
+    are ignored.
+    """
+    cursor.execute("PRAGMA table_info(order_items)")
+    columns = [row[1] for row in cursor.fetchall()]
+    for column in ("started_at", "completed_at"):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE order_items ADD COLUMN {column} TEXT")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dish_prep_times (
+            dish_id INTEGER PRIMARY KEY,
+            samples INTEGER NOT NULL,
+            avg_seconds REAL NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_started_at
+        AFTER UPDATE OF status ON order_items
+        WHEN NEW.status = 'In Progress' AND OLD.status != 'In Progress'
+        BEGIN
+            UPDATE order_items SET started_at = datetime('now', 'localtime') WHERE id = NEW.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_completed_at
+        AFTER UPDATE OF status ON order_items
+        WHEN NEW.status = 'Completed' AND OLD.status = 'In Progress'
+        BEGIN
+            UPDATE order_items SET completed_at = datetime('now', 'localtime') WHERE id = NEW.id;
+            INSERT INTO dish_prep_times (dish_id, samples, avg_seconds)
+            SELECT NEW.dish_id, 1, seconds
+            FROM (SELECT (julianday('now', 'localtime') - julianday(OLD.started_at)) * 86400 AS seconds)
+            WHERE seconds BETWEEN 0 AND 7200
+            ON CONFLICT (dish_id) DO UPDATE SET
+                samples = samples + 1,
+                avg_seconds = avg_seconds + (excluded.avg_seconds - avg_seconds) / MIN(samples + 1, 20);
+        END
+    ''')
+
+
+def _order_item_events(cursor):
+    """
+    Append-only status history of order items, written by triggers in the same
+    transaction as each change: 'Pending' when an item is added, 'Submitted' when its
+    order is submitted, then every status it moves to. Times carry milliseconds.
+    (status, at) serves time-range scans, (item_id, status, at) the per-item lookups
+    of analytics.py.
+    """
+    now = "strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')"
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_item_events (
+            id INTEGER PRIMARY KEY,
+            item_id INTEGER NOT NULL,
+            dish_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            at TEXT NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_order_item_events_status_at ON order_item_events (status, at)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_order_item_events_item ON order_item_events (item_id, status, at)"
+    )
+
+    # 1. History recorded by the prep-time columns so far
+    for status, column in (("In Progress", "started_at"), ("Completed", "completed_at")):
+        cursor.execute(f'''
+            INSERT INTO order_item_events (item_id, dish_id, status, at)
+            SELECT id, dish_id, '{status}', {column} FROM order_items WHERE {column} IS NOT NULL
+        ''')
+
+    # 2. Event triggers
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_insert_event
+        AFTER INSERT ON order_items
+        BEGIN
+            INSERT INTO order_item_events (item_id, dish_id, status, at) VALUES (NEW.id, NEW.dish_id, NEW.status, {now});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_status_event
+        AFTER UPDATE OF status ON order_items
+        WHEN NEW.status != OLD.status
+        BEGIN
+            INSERT INTO order_item_events (item_id, dish_id, status, at) VALUES (NEW.id, NEW.dish_id, NEW.status, {now});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_submitted_event
+        AFTER UPDATE OF status ON orders
+        WHEN OLD.status = 'Placed' AND NEW.status = 'In Progress'
+        BEGIN
+            INSERT INTO order_item_events (item_id, dish_id, status, at)
+            SELECT id, dish_id, 'Submitted', {now} FROM order_items WHERE order_id = NEW.id AND status = 'Pending';
+        END
+    ''')
+
+
+SALES_ROLLUP_TABLES = ("sales_hourly", "sales_by_dish", "sales_by_payment", "sales_by_table")
+
+
+def _sales_rollups(cursor):
+    """
+    Daily sales rollups for reports.py, keyed by the checkout day: per hour, dish,
+    payment method and table. A trigger folds each order into them as it is paid,
+    so a report over any period reads a few rows per day instead of the order
+    history. Archiving orders leaves the rollups as they are.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sales_hourly (
+            day TEXT NOT NULL,
+            hour INTEGER NOT NULL,
+            orders INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY (day, hour)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sales_by_dish (
+            day TEXT NOT NULL,
+            dish_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY (day, dish_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sales_by_payment (
+            day TEXT NOT NULL,
+            payment_method TEXT NOT NULL,
+            orders INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY (day, payment_method)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sales_by_table (
+            day TEXT NOT NULL,
+            table_id INTEGER NOT NULL,
+            orders INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY (day, table_id)
+        ) WITHOUT ROWID
+    ''')
+
+    # 1. Rollup trigger; day and hour come from the TEXT checkout_time
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_paid_rollup
+        AFTER UPDATE OF status ON orders
+        WHEN NEW.status = 'Paid' AND OLD.status != 'Paid' AND NEW.checkout_time IS NOT NULL
+        BEGIN
+            INSERT INTO sales_hourly (day, hour, orders, revenue)
+            VALUES (substr(NEW.checkout_time, 1, 10), CAST(substr(NEW.checkout_time, 12, 2) AS INTEGER),
+                    1, COALESCE(NEW.total_amount, 0))
+            ON CONFLICT (day, hour) DO UPDATE SET
+                orders = orders + 1, revenue = ROUND(revenue + excluded.revenue, 2);
+            INSERT INTO sales_by_payment (day, payment_method, orders, revenue)
+            VALUES (substr(NEW.checkout_time, 1, 10), COALESCE(NEW.payment_method, ''), 1, COALESCE(NEW.total_amount, 0))
+            ON CONFLICT (day, payment_method) DO UPDATE SET
+                orders = orders + 1, revenue = ROUND(revenue + excluded.revenue, 2);
+            INSERT INTO sales_by_table (day, table_id, orders, revenue)
+            VALUES (substr(NEW.checkout_time, 1, 10), NEW.table_id, 1, COALESCE(NEW.total_amount, 0))
+            ON CONFLICT (day, table_id) DO UPDATE SET
+                orders = orders + 1, revenue = ROUND(revenue + excluded.revenue, 2);
+            INSERT INTO sales_by_dish (day, dish_id, quantity, revenue)
+            SELECT substr(NEW.checkout_time, 1, 10), dish_id, SUM(quantity), ROUND(SUM(subtotal), 2)
+            FROM order_items WHERE order_id = NEW.id
+            GROUP BY dish_id
+            ON CONFLICT (day, dish_id) DO UPDATE SET
+                quantity = quantity + excluded.quantity, revenue = ROUND(revenue + excluded.revenue, 2);
+        END
+    ''')
+
+    # 2. Backfill from the orders already paid (REAL revenue; migration 16 converts it to fen)
+    revenue = "ROUND(SUM(COALESCE(o.total_amount, 0)), 2)"
+    paid = "FROM orders o WHERE o.status = 'Paid' AND o.checkout_time IS NOT NULL"
+    cursor.execute(f'''
+        INSERT INTO sales_hourly (day, hour, orders, revenue)
+        SELECT substr(o.checkout_time, 1, 10), CAST(substr(o.checkout_time, 12, 2) AS INTEGER), COUNT(*), {revenue}
+        {paid} GROUP BY 1, 2
+    ''')
+    cursor.execute(f'''
+        INSERT INTO sales_by_payment (day, payment_method, orders, revenue)
+        SELECT substr(o.checkout_time, 1, 10), COALESCE(o.payment_method, ''), COUNT(*), {revenue}
+        {paid} GROUP BY 1, 2
+    ''')
+    cursor.execute(f'''
+        INSERT INTO sales_by_table (day, table_id, orders, revenue)
+        SELECT substr(o.checkout_time, 1, 10), o.table_id, COUNT(*), {revenue}
+        {paid} GROUP BY 1, 2
+    ''')
+    cursor.execute('''
+        INSERT INTO sales_by_dish (day, dish_id, quantity, revenue)
+        SELECT substr(o.checkout_time, 1, 10), oi.dish_id, SUM(oi.quantity), ROUND(SUM(oi.subtotal), 2)
+        FROM orders o JOIN order_items oi ON oi.order_id = o.id
+        WHERE o.status = 'Paid' AND o.checkout_time IS NOT NULL
+        GROUP BY 1, 2
+    ''')
+
+
+def rebuild_sales_rollups(cursor, since_day=None, orders="orders", order_items="order_items"):
+    """
+    Recompute the sales rollups from paid orders checked out on or after since_day
+    (all of them when None). orders/order_items name the source tables, so reports.py
+    can rebuild from the all_orders/all_order_items views when the history is attached.
+    Runs inside the caller's transaction.
+    """
+    since = since_day or ""
+    for table in SALES_ROLLUP_TABLES:
+        cursor.execute(f"DELETE FROM {table} WHERE day >= ?", (since,))
+    paid = f"FROM {orders} o WHERE o.status = 'Paid' AND o.checkout_time >= ?"
+    revenue = f"SUM({PAID_CENTS_SQL.format(order='o')})"
+    cursor.execute(f'''
+        INSERT INTO sales_hourly (day, hour, orders, revenue_cents)
+        SELECT substr(o.checkout_time, 1, 10), CAST(substr(o.checkout_time, 12, 2) AS INTEGER), COUNT(*), {revenue}
+        {paid} GROUP BY 1, 2
+    ''', (since,))
+    cursor.execute(f'''
+        INSERT INTO sales_by_payment (day, payment_method, orders, revenue_cents)
+        SELECT substr(o.checkout_time, 1, 10), COALESCE(o.payment_method, ''), COUNT(*), {revenue}
+        {paid} GROUP BY 1, 2
+    ''', (since,))
+    cursor.execute(f'''
+        INSERT INTO sales_by_table (day, table_id, orders, revenue_cents)
+        SELECT substr(o.checkout_time, 1, 10), o.table_id, COUNT(*), {revenue}
+        {paid} GROUP BY 1, 2
+    ''', (since,))
+    cursor.execute(f'''
+        INSERT INTO sales_by_dish (day, dish_id, quantity, revenue_cents)
+        SELECT substr(o.checkout_time, 1, 10), oi.dish_id, SUM(oi.quantity), SUM(COALESCE(oi.subtotal_cents, 0))
+        FROM {orders} o JOIN {order_items} oi ON oi.order_id = o.id
+        WHERE o.status = 'Paid' AND o.checkout_time >= ?
+        GROUP BY 1, 2
+    ''', (since,))
+
+
+# Integer epoch-millisecond twins of the TEXT time columns: table -> {column: (text column, text is local time)}.
+# orders are stamped with local time by the engine; inventory_logs.created_at defaults to CURRENT_TIMESTAMP (UTC).
+EPOCH_COLUMNS = {
+    "orders": {"order_ts": ("order_date", True), "checkout_ts": ("checkout_time", True)},
+    "inventory_logs": {"created_ts": ("created_at", False)},
+}
+BACKFILL_BATCH = 50000
+
+
+def epoch_ms_sql(text_column, local):
+    """SQL expression converting a '%Y-%m-%d %H:%M:%S' column to epoch milliseconds (NULL stays NULL)"""
+    modifier = ", 'utc'" if local else ""
+    return f"CAST(strftime('%s', {text_column}{modifier}) AS INTEGER) * 1000"
+
+
+def _backfill_in_batches(cursor, table, assignments):
+    """UPDATE table SET assignments over id ranges, so each statement touches a bounded slice of a large table"""
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+    max_id = cursor.fetchone()[0]
+    for low in range(0, max_id, BACKFILL_BATCH):
+        cursor.execute(f"UPDATE {table} SET {assignments} WHERE id > ? AND id <= ?", (low, low + BACKFILL_BATCH))
+
+
+def _epoch_time_columns(cursor):
+    """
+    INTEGER epoch-ms columns next to the TEXT times: orders.order_ts/checkout_ts and
+    inventory_logs.created_ts. The engine writes both forms; fallback triggers fill the
+    integer one for rows written with the TEXT time only. Range queries compare
+    integers through the new indexes instead of scanning strings.
+    """
+    # 1. Columns
+    for table, columns in EPOCH_COLUMNS.items():
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = [row[1] for row in cursor.fetchall()]
+        for column in columns:
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER")
+
+    # 2. Backfill in id ranges
+    for table, columns in EPOCH_COLUMNS.items():
+        _backfill_in_batches(
+            cursor, table, ", ".join(f"{column} = {epoch_ms_sql(text, local)}" for column, (text, local) in columns.items())
+        )
+
+    # 3. Indexes, built once after the backfill
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_order_ts ON orders (order_ts)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_status_checkout_ts ON orders (status, checkout_ts)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_inventory_logs_created_ts ON inventory_logs (created_ts)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_inventory_logs_ingredient_ts ON inventory_logs (ingredient_id, created_ts)"
+    )
+
+    # 4. Fallback triggers for writers that only set the TEXT column
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_order_ts
+        AFTER INSERT ON orders
+        WHEN NEW.order_ts IS NULL
+        BEGIN
+            UPDATE orders SET order_ts = {epoch_ms_sql("NEW.order_date", True)} WHERE id = NEW.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_checkout_ts
+        AFTER UPDATE OF checkout_time ON orders
+        WHEN NEW.checkout_time IS NOT NULL AND NEW.checkout_ts IS NULL
+        BEGIN
+            UPDATE orders SET checkout_ts = {epoch_ms_sql("NEW.checkout_time", True)} WHERE id = NEW.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_inventory_logs_created_ts
+        AFTER INSERT ON inventory_logs
+        WHEN NEW.created_ts IS NULL
+        BEGIN
+            UPDATE inventory_logs SET created_ts = {epoch_ms_sql("NEW.created_at", False)} WHERE id = NEW.id;
+        END
+    ''')
+    for table in EPOCH_COLUMNS:
+        cursor.execute(f"ANALYZE {table}")
+
+
+# INTEGER fen columns and the REAL columns they replace: table -> {cents column: REAL column}
+MONEY_COLUMNS = {
+    "dishes": {"price_cents": "price"},
+    "order_items": {"subtotal_cents": "subtotal"},
+    "orders": {"total_cents": "total_amount", "received_cents": "received_amount", "change_cents": "change_amount"},
+    "tables": {"open_balance_cents": "open_balance"},
+}
+
+
+def cents_sql(real_column):
+    """SQL expression converting a REAL amount to integer fen, rounded to the nearest fen (NULL stays NULL)"""
+    return f"CAST(ROUND({real_column} * 100) AS INTEGER)"
+
+
+def _money_cents(cursor):
+    """
+    Money as INTEGER fen (money.py). The order-total triggers of migration 6 are
+    replaced by ones that add and subtract integers: orders.total_cents =
+    SUM(order_items.subtotal_cents) and tables.open_balance_cents = SUM(total_cents)
+    of the open orders. They also write the REAL column next to each one (cents / 100.0)
+    for readers that still use it. Rows written with a REAL price or subtotal only
+    get their cents from fallback triggers.
+    """
+    open_statuses = "('Placed', 'In Progress', 'Served')"
+
+    # 1. Columns, converted in bulk
+    for table, columns in MONEY_COLUMNS.items():
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = [row[1] for row in cursor.fetchall()]
+        for column in columns:
+            if column not in existing:
+                default = " NOT NULL DEFAULT 0" if table == "tables" else ""
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER{default}")
+        _backfill_in_batches(
+            cursor, table, ", ".join(f"{column} = {cents_sql(real)}" for column, real in columns.items())
+        )
+
+    # 2. Open orders and table balances summed again in fen (paid history keeps its recorded total)
+    cursor.execute(f'''
+        UPDATE orders SET total_cents = (
+            SELECT COALESCE(SUM(subtotal_cents), 0) FROM order_items WHERE order_id = orders.id
+        )
+        WHERE status IN {open_statuses}
+    ''')
+    cursor.execute(f'''
+        UPDATE tables SET open_balance_cents = (
+            SELECT COALESCE(SUM(total_cents), 0) FROM orders
+            WHERE table_id = tables.id AND status IN {open_statuses}
+        )
+    ''')
+
+    # 3. Integer total triggers, under the names of the REAL ones they replace
+    for name in ("trg_order_items_insert_total", "trg_order_items_delete_total", "trg_order_items_update_total",
+                 "trg_orders_insert_open_balance", "trg_orders_delete_open_balance",
+                 "trg_orders_update_open_balance"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    def add_to_order(order_id, cents):
+        return f'''
+            UPDATE orders SET total_cents = COALESCE(total_cents, 0) + {cents},
+                              total_amount = (COALESCE(total_cents, 0) + {cents}) / 100.0
+            WHERE id = {order_id};'''
+
+    def add_to_table(table_id, cents, status):
+        return f'''
+            UPDATE tables SET open_balance_cents = open_balance_cents + {cents},
+                              open_balance = (open_balance_cents + {cents}) / 100.0
+            WHERE id = {table_id} AND {status} IN {open_statuses};'''
+
+    cursor.execute(f'''
+        CREATE TRIGGER trg_order_items_insert_total
+        AFTER INSERT ON order_items
+        WHEN COALESCE(NEW.subtotal_cents, 0) != 0
+        BEGIN{add_to_order("NEW.order_id", "NEW.subtotal_cents")}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_order_items_delete_total
+        AFTER DELETE ON order_items
+        WHEN COALESCE(OLD.subtotal_cents, 0) != 0
+        BEGIN{add_to_order("OLD.order_id", "-OLD.subtotal_cents")}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_order_items_update_total
+        AFTER UPDATE OF subtotal_cents, order_id ON order_items
+        BEGIN{add_to_order("OLD.order_id", "-COALESCE(OLD.subtotal_cents, 0)")}{add_to_order("NEW.order_id", "COALESCE(NEW.subtotal_cents, 0)")}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_orders_insert_open_balance
+        AFTER INSERT ON orders
+        WHEN NEW.status IN {open_statuses} AND COALESCE(NEW.total_cents, 0) != 0
+        BEGIN{add_to_table("NEW.table_id", "NEW.total_cents", "NEW.status")}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_orders_delete_open_balance
+        AFTER DELETE ON orders
+        WHEN OLD.status IN {open_statuses} AND COALESCE(OLD.total_cents, 0) != 0
+        BEGIN{add_to_table("OLD.table_id", "-OLD.total_cents", "OLD.status")}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_orders_update_open_balance
+        AFTER UPDATE OF total_cents, status, table_id ON orders
+        WHEN OLD.status IN {open_statuses} OR NEW.status IN {open_statuses}
+        BEGIN{add_to_table("OLD.table_id", "-COALESCE(OLD.total_cents, 0)", "OLD.status")}{add_to_table("NEW.table_id", "COALESCE(NEW.total_cents, 0)", "NEW.status")}
+        END
+    ''')
+
+    # 4. Fallback triggers for writers that only set the REAL price or subtotal
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_dishes_price_cents
+        AFTER INSERT ON dishes
+        WHEN NEW.price_cents IS NULL
+        BEGIN
+            UPDATE dishes SET price_cents = {cents_sql("NEW.price")} WHERE id = NEW.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_dishes_price_update_cents
+        AFTER UPDATE OF price ON dishes
+        WHEN NEW.price IS NOT OLD.price AND NEW.price_cents IS OLD.price_cents
+        BEGIN
+            UPDATE dishes SET price_cents = {cents_sql("NEW.price")} WHERE id = NEW.id;
+        END
+    ''')
+    # The insert total trigger skipped the row; setting subtotal_cents fires the update one
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_subtotal_cents
+        AFTER INSERT ON order_items
+        WHEN NEW.subtotal_cents IS NULL
+        BEGIN
+            UPDATE order_items SET subtotal_cents = {cents_sql("NEW.subtotal")} WHERE id = NEW.id;
+        END
+    ''')
+
+
+INVENTORY_CHANGE_TYPES_CHECK = "CHECK(change_type IN ('Stock In','Stock Out','Adjustment'))"
+
+
+def _inventory_log_change_types(cursor):
+    """
+    Databases created by the first release of the app have inventory_logs with
+    CHECK(change_type IN ('Inbound','Outbound','Adjustment')). CREATE TABLE IF NOT EXISTS in
+    the baseline migration left that table in place, so writing 'Stock Out' on deduction failed.
+    SQLite cannot alter a CHECK constraint: the table is rebuilt with the current one
+    (Inbound -> Stock In, Outbound -> Stock Out) and its indexes and triggers are recreated.
+    """
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'inventory_logs'")
+    table_sql = cursor.fetchone()[0]
+    if "'Inbound'" not in table_sql:
+        return
+
+    # 1. Indexes and triggers are dropped with the old table
+    cursor.execute('''
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name = 'inventory_logs' AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    ''')
+    dependents = [row[0] for row in cursor.fetchall()]
+    cursor.execute("PRAGMA table_info(inventory_logs)")
+    columns = [row[1] for row in cursor.fetchall()]
+
+    # 2. New table with every current column and the new check, rows copied with the types mapped
+    new_sql = re.sub(r"CHECK\s*\(\s*change_type\s+IN\s*\([^)]*\)\s*\)", INVENTORY_CHANGE_TYPES_CHECK, table_sql)
+    new_sql = re.sub(r"^CREATE TABLE\s+(IF NOT EXISTS\s+)?\"?inventory_logs\"?", "CREATE TABLE inventory_logs_new",
+                     new_sql)
+    cursor.execute(new_sql)
+    selected = ", ".join(
+        "CASE change_type WHEN 'Inbound' THEN 'Stock In' WHEN 'Outbound' THEN 'Stock Out' ELSE change_type END"
+        if column == "change_type" else column
+        for column in columns
+    )
+    cursor.execute(f"INSERT INTO inventory_logs_new ({', '.join(columns)}) SELECT {selected} FROM inventory_logs")
+
+    # 3. Swap the tables and put the indexes and triggers back
+    cursor.execute("DROP TABLE inventory_logs")
+    cursor.execute("ALTER TABLE inventory_logs_new RENAME TO inventory_logs")
+    for statement in dependents:
+        cursor.execute(statement)
+    cursor.execute("ANALYZE inventory_logs")
+
+
+# What an order brought in, in fen: the share of the settled bill (after discount, service
+# charge and tax) recorded at checkout, or the item total for orders paid before that existed
+PAID_CENTS_SQL = "COALESCE({order}.paid_cents, {order}.total_cents, 0)"
+
+SALES_ROLLUP_KEYS = {
+    "sales_hourly": ("hour INTEGER NOT NULL", "orders"),
+    "sales_by_dish": ("dish_id INTEGER NOT NULL", "quantity"),
+    "sales_by_payment": ("payment_method TEXT NOT NULL", "orders"),
+    "sales_by_table": ("table_id INTEGER NOT NULL", "orders"),
+}
+
+
+def _sales_rollups_cents(cursor):
+    """
+    Rollup revenue in integer fen (revenue_cents), counting what was actually collected:
+    checkout records each order's share of the settled bill in orders.paid_cents, and the
+    rollup trigger adds that instead of the pre-discount/tax total. Dish revenue stays the
+    item subtotals at menu prices. Existing rollup rows are converted in place rather than
+    rebuilt, so revenue of archived orders is kept.
+    """
+    # 1. Collected amount per order; orders paid so far were charged their item total
+    cursor.execute("PRAGMA table_info(orders)")
+    if "paid_cents" not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE orders ADD COLUMN paid_cents INTEGER")
+    _backfill_in_batches(cursor, "orders", "paid_cents = CASE WHEN status = 'Paid' THEN total_cents END")
+
+    # 2. Rollup tables rebuilt with an INTEGER revenue column
+    cursor.execute("DROP TRIGGER IF EXISTS trg_orders_paid_rollup")
+    for table, (key, count) in SALES_ROLLUP_KEYS.items():
+        key_name = key.split()[0]
+        cursor.execute(f'''
+            CREATE TABLE {table}_cents (
+                day TEXT NOT NULL,
+                {key},
+                {count} INTEGER NOT NULL,
+                revenue_cents INTEGER NOT NULL,
+                PRIMARY KEY (day, {key_name})
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute(f'''
+            INSERT INTO {table}_cents (day, {key_name}, {count}, revenue_cents)
+            SELECT day, {key_name}, {count}, {cents_sql("revenue")} FROM {table}
+        ''')
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {table}_cents RENAME TO {table}")
+
+    # 3. Rollup trigger on the integer columns
+    day = "substr(NEW.checkout_time, 1, 10)"
+    revenue = PAID_CENTS_SQL.format(order="NEW")
+    cursor.execute(f'''
+        CREATE TRIGGER trg_orders_paid_rollup
+        AFTER UPDATE OF status ON orders
+        WHEN NEW.status = 'Paid' AND OLD.status != 'Paid' AND NEW.checkout_time IS NOT NULL
+        BEGIN
+            INSERT INTO sales_hourly (day, hour, orders, revenue_cents)
+            VALUES ({day}, CAST(substr(NEW.checkout_time, 12, 2) AS INTEGER), 1, {revenue})
+            ON CONFLICT (day, hour) DO UPDATE SET
+                orders = orders + 1, revenue_cents = revenue_cents + excluded.revenue_cents;
+            INSERT INTO sales_by_payment (day, payment_method, orders, revenue_cents)
+            VALUES ({day}, COALESCE(NEW.payment_method, ''), 1, {revenue})
+            ON CONFLICT (day, payment_method) DO UPDATE SET
+                orders = orders + 1, revenue_cents = revenue_cents + excluded.revenue_cents;
+            INSERT INTO sales_by_table (day, table_id, orders, revenue_cents)
+            VALUES ({day}, NEW.table_id, 1, {revenue})
+            ON CONFLICT (day, table_id) DO UPDATE SET
+                orders = orders + 1, revenue_cents = revenue_cents + excluded.revenue_cents;
+            INSERT INTO sales_by_dish (day, dish_id, quantity, revenue_cents)
+            SELECT {day}, dish_id, SUM(quantity), SUM(COALESCE(subtotal_cents, 0))
+            FROM order_items WHERE order_id = NEW.id
+            GROUP BY dish_id
+            ON CONFLICT (day, dish_id) DO UPDATE SET
+                quantity = quantity + excluded.quantity, revenue_cents = revenue_cents + excluded.revenue_cents;
+        END
+    ''')
+
+
+# (version, description, function) — append only, never renumber
+MIGRATIONS = [
+    (1, "baseline schema", _baseline_schema),
+    (2, "checkout amount columns", _checkout_amounts),
+    (3, "hot query indexes", _hot_query_indexes),
+    (4, "catalog version triggers", _catalog_version),
+    (5, "app settings", _app_settings),
+    (6, "trigger-maintained order totals", _order_total_triggers),
+    (7, "kitchen change log", _kitchen_change_log),
+    (8, "archive lookup index", _archive_index),
+    (9, "inventory reservations", _inventory_reservations),
+    (10, "learned prep times", _prep_times),
+    (11, "order item status events", _order_item_events),
+    (12, "sales rollups", _sales_rollups),
+    (13, "epoch time columns", _epoch_time_columns),
+    (14, "integer money columns", _money_cents),
+    (15, "inventory log change types", _inventory_log_change_types),
+    (16, "sales rollups in fen", _sales_rollups_cents),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(connection):
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(connection):
+    """Apply all pending migrations, return the list of versions applied"""
+    applied = []
+    current = get_schema_version(connection)
+    for version, description, apply in MIGRATIONS:
+        if version <= current:
+            continue
+        cursor = connection.cursor()
+        try:
+            cursor.execute("BEGIN")
+            apply(cursor)
+            # PRAGMA values cannot be bound as parameters
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        print(f"  + Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
+
+
+def find_scans(connection, queries):
+    """
+    Run EXPLAIN QUERY PLAN for each (name, sql, params) and
+    return (name, plan detail) for every step that falls back to a full table SCAN.
+    """
+    violations = []
+    for name, sql, params in queries:
+        for row in connection.execute("EXPLAIN QUERY PLAN " + sql, params):
+            detail = row[3]
+            if detail.startswith("SCAN ") and "CONSTANT ROW" not in detail:
+                violations.append((name, detail))
+    return violations
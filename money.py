@@ -0,0 +1,106 @@
+"""
+Exact money in integer minor units (fen: 1 CNY = 100).
+
+Prices, item subtotals, order totals and table balances are stored as INTEGER
+*_cents columns (the REAL columns are kept as mirrors for older readers, see
+migrations.py), so sums never pick up binary rounding error. Amounts typed by
+the user are parsed with Decimal and rounded half up to the fen.
+
+BillCalculator turns the loaded items of a bill into subtotal, discount,
+service charge, tax, total and change in one pass. Rates are in basis points
+(1% = 100) and each charge is rounded half up once, on the whole bill.
+"""
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+CENTS_PER_UNIT = 100
+MAX_CENTS = 2 ** 63 - 1  # largest value of an SQLite INTEGER column
+
+# Bill rates in app_settings, in basis points; missing keys mean 0
+RATE_SETTINGS = ("discount_bp", "service_charge_bp", "tax_bp")
+
+Bill = namedtuple("Bill", "subtotal discount service_charge tax total received change")
+
+
+def to_cents(value):
+    """
+    Integer fen of a user-entered amount ("12.5", 12.5, Decimal); ValueError when it is not a number
+    or does not fit in an INTEGER column ("1e27", inf)
+    """
+    try:
+        amount = Decimal(str(value).strip())
+        if not amount.is_finite() or abs(amount) > Decimal(MAX_CENTS) / CENTS_PER_UNIT:
+            raise ValueError(f"Not an amount: {value!r}")
+        return int((amount * CENTS_PER_UNIT).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except ArithmeticError:
+        # InvalidOperation and the other decimal signals
+        raise ValueError(f"Not an amount: {value!r}")
+
+
+def from_cents(cents):
+    """Float amount for display and JSON (never for arithmetic)"""
+    return cents / CENTS_PER_UNIT
+
+
+def format_money(cents):
+    """1250 -> '12.50', -5 -> '-0.05'"""
+    sign = "-" if cents < 0 else ""
+    units, fen = divmod(abs(cents), CENTS_PER_UNIT)
+    return f"{sign}{units}.{fen:02d}"
+
+
+def apply_rate(cents, basis_points):
+    """cents * rate, rounded half up (for non-negative amounts)"""
+    return (cents * basis_points + 5000) // 10000
+
+
+class BillCalculator:
+    def __init__(self, discount_bp=0, service_charge_bp=0, tax_bp=0):
+        self.discount_bp = discount_bp
+        self.service_charge_bp = service_charge_bp
+        self.tax_bp = tax_bp
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Build from {key: value} rows of app_settings (RATE_SETTINGS keys)"""
+        return cls(*(int(settings.get(key, 0)) for key in RATE_SETTINGS))
+
+    def compute(self, items, received=None):
+        """
+        Bill for `items` (dicts with subtotal_cents): the subtotal is summed in one pass, then
+        the discount comes off it, the service charge applies to the discounted amount and tax
+        to both. change is None when received is None (electronic payments pay the total).
+        """
+        subtotal = 0
+        for item in items:
+            subtotal += item['subtotal_cents']
+        discount = apply_rate(subtotal, self.discount_bp)
+        net = subtotal - discount
+        service_charge = apply_rate(net, self.service_charge_bp)
+        tax = apply_rate(net + service_charge, self.tax_bp)
+        total = net + service_charge + tax
+        change = None if received is None else received - total
+        return Bill(subtotal, discount, service_charge, tax, total, received, change)
+
+
+def allocate(cents, weights):
+    """
+    Split cents over non-negative weights in proportion (largest remainder first), so the parts
+    add up to cents exactly; with no weight at all the first part takes everything
+    """
+    if not weights:
+        return []
+    total_weight = sum(weights)
+    if total_weight <= 0:
+        return [cents] + [0] * (len(weights) - 1)
+    parts = [cents * weight // total_weight for weight in weights]
+    by_remainder = sorted(range(len(weights)), key=lambda n: cents * weights[n] % total_weight, reverse=True)
+    for n in by_remainder[:cents - sum(parts)]:
+        parts[n] += 1
+    return parts
+
+
+def settle(bill, received=None):
+    """The same bill paid with `received` fen (the total when None); no item is looked at again"""
+    received = bill.total if received is None else received
+    return bill._replace(received=received, change=received - bill.total)
@@ -0,0 +1,1086 @@
+import os
+import sqlite3
+from collections import namedtuple
+from datetime import datetime
+
+from menu_cache import get_menu_cache
+from money import RATE_SETTINGS, BillCalculator, allocate, settle
+from migrations import SCHEMA_VERSION, get_schema_version, migrate
+from servings import get_servings_counter
+from storage import get_pool
+
+DEFAULT_DB_PATH = "restaurant_system.db"
+
+# Bump when the sample/premade data inserted by initialize_database changes
+SEED_VERSION = 1
+
+# Order statuses that still belong to a table's open bill
+OPEN_ORDER_STATUSES = ('Placed', 'In Progress', 'Served')
+
+# -------------------------- Hot Queries --------------------------
+OPEN_ORDERS_SQL = """
+    SELECT o.id, o.status, o.total_cents
+    FROM orders o
+    WHERE o.table_id = ? AND o.status IN ('Placed', 'In Progress', 'Served')
+    ORDER BY o.id DESC
+"""
+
+UNFINISHED_ORDER_COUNT_SQL = """
+    SELECT COUNT(*) FROM orders
+    WHERE table_id = ? AND status IN ('Placed', 'In Progress', 'Served')
+"""
+
+OPEN_BILL_SQL = """
+    SELECT o.id AS order_id, o.status AS order_status, o.total_cents,
+           oi.id AS item_id, oi.dish_id, d.name, d.price_cents, oi.quantity, oi.subtotal_cents, oi.status
+    FROM orders o
+    LEFT JOIN order_items oi ON oi.order_id = o.id
+    LEFT JOIN dishes d ON oi.dish_id = d.id
+    WHERE o.table_id = ? AND o.status IN ('Placed', 'In Progress', 'Served')
+    ORDER BY o.id DESC, oi.id
+"""
+
+PENDING_ORDER_ITEMS_SQL = """
+    SELECT id, dish_id, quantity
+    FROM order_items
+    WHERE order_id = ? AND status = 'Pending'
+"""
+
+REMAINING_ITEMS_SQL = """
+    SELECT COUNT(*) as remaining
+    FROM order_items
+    WHERE order_id = ? AND status != 'Completed'
+"""
+
+KITCHEN_ITEMS_SQL = """
+    SELECT oi.id, o.id as order_id, t.table_number, oi.dish_id, d.name as dish, oi.quantity, oi.status, o.order_date,
+           o.order_ts
+    FROM order_items oi
+    JOIN orders o ON oi.order_id = o.id
+    JOIN tables t ON o.table_id = t.id
+    JOIN dishes d ON oi.dish_id = d.id
+"""
+
+KITCHEN_CHANGES_SQL = "SELECT seq, item_id FROM order_item_changes WHERE seq > ? ORDER BY seq"
+
+# All-day view: open kitchen work per dish, grouped by station (the dish category)
+KITCHEN_ALL_DAY_SQL = """
+    SELECT d.category AS station, oi.dish_id, d.name AS dish,
+           SUM(CASE WHEN oi.status = 'Pending' THEN oi.quantity ELSE 0 END) AS pending,
+           SUM(CASE WHEN oi.status = 'In Progress' THEN oi.quantity ELSE 0 END) AS in_progress,
+           COUNT(*) AS tickets,
+           MIN(o.order_date) AS oldest
+    FROM order_items oi
+    JOIN orders o ON oi.order_id = o.id
+    JOIN dishes d ON oi.dish_id = d.id
+    WHERE oi.status IN ('Pending', 'In Progress')
+    GROUP BY oi.dish_id
+    ORDER BY d.category, oldest
+"""
+
+BATCH_ITEMS_SQL = "SELECT id, order_id, quantity FROM order_items WHERE status = ? AND dish_id = ? ORDER BY id"
+
+# Outstanding reservations of one ingredient, summed from the covering index
+RESERVED_SQL = "SELECT COALESCE(SUM(quantity), 0) FROM inventory_reservations WHERE ingredient_id = ?"
+
+# Stock and available-to-promise (stock minus reservations) of the given ingredients
+AVAILABLE_STOCK_SQL = """
+    SELECT i.id, i.stock, (
+        SELECT COALESCE(SUM(r.quantity), 0) FROM inventory_reservations r WHERE r.ingredient_id = i.id
+    ) AS reserved
+    FROM ingredients i
+    WHERE i.id IN ({placeholders})
+"""
+
+# Recompute totals (in fen, so any difference is drift) from order_items in bulk and
+# compare them with the trigger-maintained columns
+ORDER_TOTAL_DRIFT_SQL = """
+    SELECT o.id, o.table_id, o.status, COALESCE(o.total_cents, 0) AS recorded, COALESCE(s.total, 0) AS expected
+    FROM orders o
+    LEFT JOIN (SELECT order_id, SUM(subtotal_cents) AS total FROM order_items GROUP BY order_id) s ON s.order_id = o.id
+    WHERE COALESCE(o.total_cents, 0) != COALESCE(s.total, 0)
+"""
+
+TABLE_BALANCE_DRIFT_SQL = """
+    SELECT t.id, t.table_number, t.open_balance_cents AS recorded, COALESCE(s.total, 0) AS expected
+    FROM tables t
+    LEFT JOIN (
+        SELECT o.table_id, SUM(oi.subtotal_cents) AS total
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id
+        WHERE o.status IN ('Placed', 'In Progress', 'Served')
+        GROUP BY o.table_id
+    ) s ON s.table_id = t.id
+    WHERE t.open_balance_cents != COALESCE(s.total, 0)
+"""
+
+# Available-to-promise stock of every ingredient, for the servings-remaining counts
+ALL_AVAILABLE_STOCK_SQL = """
+    SELECT i.id, i.stock - COALESCE(r.reserved, 0) AS available
+    FROM ingredients i
+    LEFT JOIN (
+        SELECT ingredient_id, SUM(quantity) AS reserved FROM inventory_reservations GROUP BY ingredient_id
+    ) r ON r.ingredient_id = i.id
+"""
+
+# Time ranges over the epoch-ms columns, [start, end) in milliseconds
+ORDERS_PLACED_BETWEEN_SQL = """
+    SELECT COUNT(*) AS orders, COALESCE(SUM(total_cents), 0) AS revenue_cents
+    FROM orders WHERE order_ts >= ? AND order_ts < ?
+"""
+
+ORDERS_PAID_BETWEEN_SQL = """
+    SELECT COUNT(*) AS orders, COALESCE(SUM(COALESCE(paid_cents, total_cents)), 0) AS revenue_cents
+    FROM orders WHERE status = 'Paid' AND checkout_ts >= ? AND checkout_ts < ?
+"""
+
+INVENTORY_MOVEMENTS_BETWEEN_SQL = """
+    SELECT change_type, COUNT(*) AS movements, COALESCE(SUM(quantity), 0) AS quantity
+    FROM inventory_logs WHERE created_ts >= ? AND created_ts < ?
+    GROUP BY change_type
+"""
+
+# Queries that must be served by an index: (name, sql, sample parameters).
+# benchmarks/check_query_plans.py fails when any of them plans a full SCAN.
+HOT_QUERIES = [
+    ("open orders by table", OPEN_ORDERS_SQL, (1,)),
+    ("open bill by table", OPEN_BILL_SQL, (1,)),
+    ("unfinished order count by table", UNFINISHED_ORDER_COUNT_SQL, (1,)),
+    ("latest placed order by table",
+     "SELECT id FROM orders WHERE table_id = ? AND status IN (?) ORDER BY id DESC LIMIT 1", (1, 'Placed')),
+    ("pending items by order", PENDING_ORDER_ITEMS_SQL, (1,)),
+    ("remaining items by order", REMAINING_ITEMS_SQL, (1,)),
+    ("kitchen items by status",
+     KITCHEN_ITEMS_SQL + " WHERE oi.status = ? ORDER BY o.order_ts DESC, oi.id", ('Pending',)),
+    ("kitchen changes since", KITCHEN_CHANGES_SQL, (0,)),
+    ("kitchen items by id", KITCHEN_ITEMS_SQL + " WHERE oi.id IN (?, ?)", (1, 2)),
+    ("reserved by ingredient", RESERVED_SQL, (1,)),
+    ("kitchen all-day", KITCHEN_ALL_DAY_SQL, ()),
+    ("batch items by dish", BATCH_ITEMS_SQL, ('Pending', 1)),
+    ("orders placed in range", ORDERS_PLACED_BETWEEN_SQL, (0, 1)),
+    ("orders paid in range", ORDERS_PAID_BETWEEN_SQL, (0, 1)),
+    ("inventory movements in range", INVENTORY_MOVEMENTS_BETWEEN_SQL, (0, 1)),
+]
+
+# Result of OrderEngine.poll_kitchen_changes: rows are the changed items that match the filter
+# (display order), removed_ids the ones to drop; resync means the log was trimmed past `since`
+KitchenChanges = namedtuple("KitchenChanges", "seq rows removed_ids resync")
+
+
+class OrderError(Exception):
+    """Raised when an order/kitchen/inventory operation cannot be carried out"""
+
+
+def now_str():
+    """Current time in the format stored in the TEXT time columns"""
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def epoch_ms(moment=None):
+    """Epoch milliseconds of a local datetime (default: now), as stored in the *_ts columns"""
+    return int((moment or datetime.now()).timestamp() * 1000)
+
+
+def now_stamps():
+    """(TEXT, epoch ms) of one reading of the clock, for writing both forms of a time"""
+    now = datetime.now()
+    return now.strftime('%Y-%m-%d %H:%M:%S'), epoch_ms(now)
+
+
+def _as_epoch_ms(moment):
+    return epoch_ms(moment) if isinstance(moment, datetime) else int(moment)
+
+
+class OrderEngine:
+    """
+    GUI-free order, kitchen and inventory engine.
+    Every method works on plain Python values and raises OrderError with a
+    user-facing message when an operation is rejected, so the Tk tabs, scripts
+    and benchmarks can share the same code path.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, connection=None, profile=None):
+        self.db_path = db_path
+        if connection is not None:
+            # A caller-supplied connection serves both reads and writes
+            self.pool = None
+            self.connection = self.read_connection = connection
+            self.connection.row_factory = sqlite3.Row
+        else:
+            # Writes go through self.connection, plain listings through a read-only connection
+            self.pool = get_pool(db_path, profile)
+            self.connection = self.pool.acquire()
+            self.read_connection = self.pool.acquire(readonly=True)
+        self.cursor = self.connection.cursor()
+        self.read_cursor = self.read_connection.cursor()
+        self.menu_cache = get_menu_cache(os.path.abspath(db_path))
+        self._data_version = None
+        self._changes_seen = None  # (data_version, seq) of the last kitchen poll
+        self.servings = get_servings_counter(os.path.abspath(db_path))
+        self._servings_seen = None  # (data_version, catalog version) of the last servings update
+
+    def close(self):
+        if self.pool is None:
+            self.connection.close()
+            return
+        self.pool.release(self.connection)
+        self.pool.release(self.read_connection, readonly=True)
+
+    # =========================================================================
+    # Schema and Sample Data
+    # =========================================================================
+    def is_bootstrapped(self):
+        """True when the schema is at SCHEMA_VERSION and the seed data at SEED_VERSION"""
+        if get_schema_version(self.read_connection) != SCHEMA_VERSION:
+            return False
+        row = self.read_connection.execute("SELECT value FROM app_settings WHERE key = 'seed_version'").fetchone()
+        return row is not None and int(row[0]) == SEED_VERSION
+
+    def initialize_database(self):
+        """
+        Bring the schema up to date and insert the sample data on first run.
+        Return False without touching the database when both are already current.
+        """
+        if self.is_bootstrapped():
+            return False
+
+        # -------------------------- Table Structure Creation --------------------------
+        migrate(self.connection)
+
+        # -------------------------- Data Initialization --------------------------
+        # Insert regular sample dishes
+        self.cursor.execute("SELECT COUNT(*) FROM dishes")
+        if self.cursor.fetchone()[0] == 0:
+            sample_dishes = [
+                ("Kung Pao Chicken", 38.0, "Sichuan Cuisine", "Classic Sichuan dish, spicy and fragrant"),
+                ("Yu-Shiang Shredded Pork", 32.0, "Sichuan Cuisine", "Yu-Shiang flavor, perfect with rice"),
+                ("Mapo Tofu", 28.0, "Sichuan Cuisine", "Spicy and fragrant, tender tofu"),
+                ("Twice-Cooked Pork", 36.0, "Sichuan Cuisine", "Fat but not greasy, spicy and delicious"),
+                ("Boiled Fish with Spicy Sauce", 48.0, "Sichuan Cuisine", "Tender fish, spicy and fragrant")
+            ]
+            self.cursor.executemany("INSERT INTO dishes (name, price, category, description) VALUES (?, ?, ?, ?)", sample_dishes)
+
+        # Insert regular ingredients
+        self.cursor.execute("SELECT COUNT(*) FROM ingredients")
+        if self.cursor.fetchone()[0] == 0:
+            sample_ingredients = [
+                ("Chicken", "kg", 50, 10), ("Pork", "kg", 40, 5), ("Tofu", "kg", 30, 5),
+                ("Green Pepper", "kg", 20, 5), ("Onion", "kg", 15, 3), ("Chili Pepper", "kg", 10, 2),
+                ("Peanuts", "kg", 10, 2), ("Fish Fillet", "kg", 20, 5), ("Garlic", "kg", 5, 1), ("Ginger", "kg", 5, 1)
+            ]
+            self.cursor.executemany("INSERT INTO ingredients (name, unit, stock, low_stock_threshold) VALUES (?, ?, ?, ?)", sample_ingredients)
+
+        # Insert regular recipes
+        self.cursor.execute("SELECT COUNT(*) FROM dish_ingredients")
+        if self.cursor.fetchone()[0] == 0:
+            sample_dish_ingredients = [
+                (1, 1, 0.3), (1, 4, 0.1), (1, 5, 0.05), (1, 7, 0.05), # Kung Pao Chicken
+                (2, 2, 0.3), (2, 4, 0.1), (2, 5, 0.05), (2, 9, 0.02), (2, 10, 0.01), # Yu-Shiang Shredded Pork
+                (3, 3, 0.25), (3, 2, 0.05), (3, 6, 0.02), # Mapo Tofu
+                (4, 2, 0.3), (4, 4, 0.1), (4, 9, 0.02), (4, 10, 0.01), # Twice-Cooked Pork
+                (5, 8, 0.3), (5, 4, 0.1), (5, 9, 0.02), (5, 10, 0.01), (5, 6, 0.02) # Boiled Fish with Spicy Sauce
+            ]
+            self.cursor.executemany("INSERT INTO dish_ingredients (dish_id, ingredient_id, quantity) VALUES (?, ?, ?)", sample_dish_ingredients)
+
+        # Insert tables
+        self.cursor.execute("SELECT COUNT(*) FROM tables")
+        if self.cursor.fetchone()[0] == 0:
+            sample_tables = [("Table 1", 4), ("Table 2", 6), ("Table 3", 2), ("Table 4", 8), ("Table 5", 4)]
+            self.cursor.executemany("INSERT INTO tables (table_number, capacity) VALUES (?, ?)", sample_tables)
+
+        # -------------------------- Core Modification: Initialize Premade Dish Data --------------------------
+        self.initialize_premade_data()
+
+        self.cursor.execute(
+            "INSERT OR REPLACE INTO app_settings (key, value) VALUES ('seed_version', ?)", (str(SEED_VERSION),)
+        )
+        self.connection.commit()
+        self.invalidate_menu()
+        print("Database initialization completed (including premade dishes)")
+        return True
+
+    def initialize_premade_data(self):
+        """
+        Initialize premade dish data.
+        Logic:
+        1. Add 'xxx Meal Kit' to the ingredients table.
+        2. Add 'xxx (Premade)' to the dishes table.
+        3. Establish the relationship of 1 dish serving = 1 meal kit in the association table.
+        """
+        print("Checking premade dish data...")
+
+        # Define premade dish data structure: (dish name, price, ingredient name, stock quantity, threshold)
+        premade_items = [
+            ("Taiwanese Braised Pork Rice (Premade)", 25.0, "Braised Pork Meal Kit", 50, 5),
+            ("Braised Beef Rice (Premade)", 28.0, "Braised Beef Meal Kit", 40, 5),
+            ("Italian Meat Sauce Pasta (Premade)", 26.0, "Meat Sauce Pasta Combo Kit", 30, 5),
+            ("Cantonese Sausage Fried Rice (Premade)", 22.0, "Sausage Fried Rice Meal Kit", 50, 10)
+        ]
+
+        for dish_name, price, ing_name, stock, threshold in premade_items:
+            # 1. Ensure the ingredient exists
+            self.cursor.execute("SELECT id FROM ingredients WHERE name = ?", (ing_name,))
+            res_ing = self.cursor.fetchone()
+            if not res_ing:
+                self.cursor.execute(
+                    "INSERT INTO ingredients (name, unit, stock, low_stock_threshold) VALUES (?, 'Bag', ?, ?)",
+                    (ing_name, stock, threshold)
+                )
+                ingredient_id = self.cursor.lastrowid
+                print(f"  + Added premade ingredient: {ing_name}")
+            else:
+                ingredient_id = res_ing['id']
+
+            # 2. Ensure the dish exists
+            self.cursor.execute("SELECT id FROM dishes WHERE name = ?", (dish_name,))
+            res_dish = self.cursor.fetchone()
+            if not res_dish:
+                self.cursor.execute(
+                    "INSERT INTO dishes (name, price, category, description) VALUES (?, ?, 'Premade Dishes', 'Quick and delicious, ready to eat after heating')",
+                    (dish_name, price)
+                )
+                dish_id = self.cursor.lastrowid
+                print(f"  + Added premade dish: {dish_name}")
+            else:
+                dish_id = res_dish['id']
+
+            # 3. Ensure the association exists (1 dish serving consumes 1 bag of ingredient)
+            self.cursor.execute(
+                "SELECT id FROM dish_ingredients WHERE dish_id = ? AND ingredient_id = ?",
+                (dish_id, ingredient_id)
+            )
+            if not self.cursor.fetchone():
+                self.cursor.execute(
+                    "INSERT INTO dish_ingredients (dish_id, ingredient_id, quantity) VALUES (?, ?, 1.0)",
+                    (dish_id, ingredient_id)
+                )
+                print(f"  + Established association: {dish_name} -> {ing_name} (1:1)")
+
+    # =========================================================================
+    # Tables
+    # =========================================================================
+    def list_tables(self, search="", status="All"):
+        sql = "SELECT * FROM tables WHERE 1=1"
+        params = []
+        if search:
+            sql += " AND table_number LIKE ?"
+            params.append(f"%{search}%")
+        if status != "All":
+            sql += " AND status=?"
+            params.append(status)
+        self.read_cursor.execute(sql, params)
+        return self.read_cursor.fetchall()
+
+    def get_table_map(self, orderable_only=False):
+        """Mapping of table numbers to IDs; orderable_only keeps Free/Occupied tables"""
+        sql = "SELECT id, table_number FROM tables"
+        if orderable_only:
+            sql += " WHERE status IN ('Free', 'Occupied')"
+        self.read_cursor.execute(sql)
+        return {t["table_number"]: t["id"] for t in self.read_cursor.fetchall()}
+
+    def add_table(self, table_number, capacity):
+        try:
+            self.cursor.execute("INSERT INTO tables (table_number, capacity, status) VALUES (?, ?, 'Free')", (table_number, capacity))
+            self.connection.commit()
+        except sqlite3.IntegrityError:
+            self.connection.rollback()
+            raise OrderError(f"Table {table_number} already exists")
+        return self.cursor.lastrowid
+
+    def table_exists(self, table_id):
+        self.read_cursor.execute("SELECT 1 FROM tables WHERE id=?", (table_id,))
+        return self.read_cursor.fetchone() is not None
+
+    def has_unfinished_orders(self, table_id):
+        self.read_cursor.execute(UNFINISHED_ORDER_COUNT_SQL, (table_id,))
+        return self.read_cursor.fetchone()[0] > 0
+
+    def delete_table(self, table_id):
+        if self.has_unfinished_orders(table_id):
+            raise OrderError("This table has unfinished orders and cannot be deleted!")
+        self.cursor.execute("DELETE FROM tables WHERE id=?", (table_id,))
+        self.connection.commit()
+
+    def set_table_status(self, table_id, status):
+        self.cursor.execute("UPDATE tables SET status=? WHERE id=?", (status, table_id))
+        self.connection.commit()
+
+    # =========================================================================
+    # Menu
+    # =========================================================================
+    def get_menu(self):
+        """
+        The shared menu/recipe cache, made current first.
+        catalog_version is only read when PRAGMA data_version shows another connection committed;
+        writes made through this engine invalidate the cache directly.
+        """
+        data_version = self.read_connection.execute("PRAGMA data_version").fetchone()[0]
+        other_commits = data_version != self._data_version
+        self._data_version = data_version
+        self.menu_cache.ensure_current(self.read_connection, check_version=other_commits)
+        return self.menu_cache
+
+    def invalidate_menu(self):
+        self.menu_cache.invalidate()
+
+    def list_available_dishes(self):
+        """Available dishes (DishEntry tuples with id, name, price_cents, ...) from the menu cache"""
+        return self.get_menu().available_dishes()
+
+    def get_servings_remaining(self):
+        """
+        {dish_id: portions the available-to-promise stock can still make, None for dishes without a recipe}
+        for the whole menu. Only dishes whose ingredients moved since the last call are recomputed.
+        """
+        menu = self.get_menu()
+        # get_menu has just read data_version; with a separate read connection an unchanged value
+        # means no connection, this engine's writer included, committed since the last update
+        seen = (self._data_version, menu.version)
+        if self.pool is not None and seen == self._servings_seen:
+            return self.servings.servings
+        self.read_cursor.execute(ALL_AVAILABLE_STOCK_SQL)
+        self.servings.update(menu, {row['id']: row['available'] for row in self.read_cursor.fetchall()})
+        self._servings_seen = seen
+        return self.servings.servings
+
+    # =========================================================================
+    # Orders
+    # =========================================================================
+    def get_open_orders(self, table_id):
+        """All unpaid orders of a table, newest first"""
+        self.read_cursor.execute(OPEN_ORDERS_SQL, (table_id,))
+        return self.read_cursor.fetchall()
+
+    def get_bill_calculator(self):
+        """BillCalculator with the discount, service charge and tax rates from app_settings"""
+        placeholders = ", ".join("?" for _ in RATE_SETTINGS)
+        rows = self.read_connection.execute(
+            f"SELECT key, value FROM app_settings WHERE key IN ({placeholders})", RATE_SETTINGS
+        ).fetchall()
+        return BillCalculator.from_settings({row['key']: row['value'] for row in rows})
+
+    def load_open_bill(self, table_id):
+        """
+        Load a table's whole open bill with one joined query.
+        Return {"orders": [...], "items": [...], "totals": Bill}; each order is a dict with
+        id, status, total_cents and its list of items (item_id, dish_id, name, price_cents,
+        quantity, subtotal_cents, status), newest order first. items lists every item once more
+        across orders, and totals is the BillCalculator result over them (amounts in fen).
+        """
+        self.read_cursor.execute(OPEN_BILL_SQL, (table_id,))
+        orders = []
+        items = []
+        current = None
+        for row in self.read_cursor.fetchall():
+            if current is None or current['id'] != row['order_id']:
+                current = {
+                    "id": row['order_id'],
+                    "status": row['order_status'],
+                    "total_cents": row['total_cents'] or 0,
+                    "items": []
+                }
+                orders.append(current)
+            if row['item_id'] is not None:
+                item = {
+                    "item_id": row['item_id'],
+                    "dish_id": row['dish_id'],
+                    "name": row['name'],
+                    "price_cents": row['price_cents'],
+                    "quantity": row['quantity'],
+                    "subtotal_cents": row['subtotal_cents'],
+                    "status": row['status']
+                }
+                current['items'].append(item)
+                items.append(item)
+        return {"orders": orders, "items": items, "totals": self.get_bill_calculator().compute(items)}
+
+    def get_latest_open_order_id(self, table_id, statuses=OPEN_ORDER_STATUSES):
+        placeholders = ", ".join("?" for _ in statuses)
+        self.cursor.execute(f"""
+            SELECT id FROM orders
+            WHERE table_id = ? AND status IN ({placeholders})
+            ORDER BY id DESC LIMIT 1
+        """, (table_id, *statuses))
+        row = self.cursor.fetchone()
+        return row['id'] if row else None
+
+    def create_order(self, table_id, created_by="System Operator"):
+        """Open a new order for the table and mark the table Occupied, return the order ID"""
+        order_date, order_ts = now_stamps()
+        try:
+            self.cursor.execute(
+                "INSERT INTO orders (table_id, created_by, order_date, order_ts) VALUES (?, ?, ?, ?)",
+                (table_id, created_by, order_date, order_ts)
+            )
+            order_id = self.cursor.lastrowid
+            self.cursor.execute("UPDATE tables SET status='Occupied' WHERE id=?", (table_id,))
+            if self.cursor.rowcount != 1:
+                raise OrderError("Table not found")
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return order_id
+
+    def add_dish_to_order(self, table_id, dish_id, quantity=1):
+        """Add a dish to the table's latest open order (no inventory check), return the order item ID"""
+        order_id = self.get_latest_open_order_id(table_id)
+        if order_id is None:
+            raise OrderError("Please create an order for this table first.")
+
+        dish = self.get_menu().dishes.get(dish_id)
+        if not dish:
+            raise OrderError("Dish not found")
+        subtotal_cents = dish.price_cents * quantity
+
+        try:
+            self.cursor.execute("""
+                INSERT INTO order_items (order_id, dish_id, quantity, subtotal, subtotal_cents, status)
+                VALUES (?, ?, ?, ?, ?, 'Pending')
+            """, (order_id, dish_id, quantity, subtotal_cents / 100, subtotal_cents))
+            # The order total and table balance are updated by triggers
+            item_id = self.cursor.lastrowid
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return item_id
+
+    def remove_order_item(self, item_id):
+        """
+        Remove a pending order item (triggers take its subtotal off the order and table totals).
+        Return True when the order became empty and was deleted as well.
+        """
+        try:
+            # 1. Get order ID associated with the order item
+            self.cursor.execute("SELECT order_id, status FROM order_items WHERE id = ?", (item_id,))
+            result = self.cursor.fetchone()
+            if not result:
+                raise OrderError("Dish record not found")
+            if result['status'] != 'Pending':
+                raise OrderError(f"Dish status is '{result['status']}', cannot be deleted")
+            order_id = result['order_id']
+
+            # 2. Delete the order item
+            self.cursor.execute("DELETE FROM order_items WHERE id = ?", (item_id,))
+
+            # 3. Read the order's new total
+            self.cursor.execute("SELECT status, total_cents FROM orders WHERE id = ?", (order_id,))
+            order = self.cursor.fetchone()
+            order_deleted = False
+            if order['status'] in OPEN_ORDER_STATUSES:
+                # 4. If total amount is 0, delete order and associated items
+                if (order['total_cents'] or 0) <= 0:
+                    self.cursor.execute("DELETE FROM order_items WHERE order_id = ?", (order_id,))
+                    self.cursor.execute("DELETE FROM orders WHERE id = ?", (order_id,))
+                    order_deleted = True
+
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return order_deleted
+
+    def submit_order(self, table_id):
+        """Submit the table's latest placed order once every pending dish has enough stock, return the order ID"""
+        order_id = self.get_latest_open_order_id(table_id, statuses=('Placed',))
+        if order_id is None:
+            raise OrderError("No orders available for submission")
+
+        # Retrieve all pending dishes in the order
+        self.cursor.execute(PENDING_ORDER_ITEMS_SQL, (order_id,))
+        order_items = self.cursor.fetchall()
+        if not order_items:
+            raise OrderError("There are no dishes to be submitted in the order.")
+
+        def out_of_stock(shortages):
+            dishes = self.get_menu().dishes
+            dish_names = ", ".join(
+                f"《{dishes[item['dish_id']].name if item['dish_id'] in dishes else item['dish_id']}》" for item in order_items
+            )
+            return OrderError(
+                "The following ingredients are out of stock and the order cannot be submitted:\n"
+                + "\n".join(shortages) + f"\n\nDishes in this order: {dish_names}"
+            )
+
+        # Check the summed ingredient needs of all dishes against what is not yet promised to other orders
+        items = [(item['dish_id'], item['quantity']) for item in order_items]
+        shortages = self.check_order_ingredients(items)
+        if shortages:
+            raise out_of_stock(shortages)
+
+        try:
+            # Reserve, then re-check inside the write transaction: an order submitted from another
+            # terminal since the check above can no longer take the same stock
+            self.reserve_order_items(order_items)
+            shortages = self.check_order_ingredients(items, reserved_by_self=True)
+            if shortages:
+                raise out_of_stock(shortages)
+            self.cursor.execute("UPDATE orders SET status = 'In Progress' WHERE id = ?", (order_id,))
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return order_id
+
+    def checkout(self, table_id, order_ids, payment_method, bill, received=None):
+        """
+        Mark the given orders Paid and free the table. bill is the Bill loaded with them
+        (load_open_bill()['totals']), so nothing is summed again; received is in fen and defaults
+        to the total (electronic payments). Each order records its share of the bill total
+        (paid_cents, split by item totals) for the sales rollups.
+        The bill is checked again inside the write transaction: OrderError when the table's open
+        orders are no longer exactly order_ids (paid elsewhere, or an order added since) or their
+        total no longer matches, so a double submit or a stale dialog cannot pay twice.
+        Return (checkout_time, settled Bill with received and change).
+        """
+        bill = settle(bill, received)
+        if bill.change < 0:
+            raise OrderError("Insufficient received amount!")
+        checkout_time, checkout_ts = now_stamps()
+
+        try:
+            if not self.connection.in_transaction:
+                self.cursor.execute("BEGIN IMMEDIATE")
+            self.cursor.execute(OPEN_ORDERS_SQL, (table_id,))
+            totals = {row['id']: row['total_cents'] or 0 for row in self.cursor.fetchall()}
+            if set(totals) != set(order_ids) or len(order_ids) != len(set(order_ids)):
+                raise OrderError("This bill has changed (paid or updated elsewhere), please reload it")
+            current = self.get_bill_calculator().compute([{"subtotal_cents": sum(totals.values())}])
+            if (current.subtotal, current.total) != (bill.subtotal, bill.total):
+                raise OrderError("The bill total has changed, please reload it")
+            shares = allocate(bill.total, [totals[order_id] for order_id in order_ids])
+            self.cursor.executemany("""
+                UPDATE orders SET
+                    status = 'Paid',
+                    checkout_time = ?,
+                    checkout_ts = ?,
+                    payment_method = ?,
+                    paid_cents = ?,
+                    received_amount = ?,
+                    received_cents = ?,
+                    change_amount = ?,
+                    change_cents = ?
+                WHERE id = ? AND status IN ('Placed', 'In Progress', 'Served')
+            """, [(checkout_time, checkout_ts, payment_method, share, bill.received / 100, bill.received,
+                   bill.change / 100, bill.change, order_id) for order_id, share in zip(order_ids, shares)])
+            if self.cursor.rowcount != len(order_ids):
+                raise OrderError("This bill has changed (paid or updated elsewhere), please reload it")
+
+            # Update table status to Free
+            self.cursor.execute("UPDATE tables SET status = 'Free' WHERE id = ?", (table_id,))
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return checkout_time, bill
+
+    def find_total_drift(self):
+        """
+        Recompute order totals and table open balances (in fen) from order_items in bulk.
+        Return (orders, tables): rows whose recorded value differs from the recomputed one.
+        """
+        self.read_cursor.execute(ORDER_TOTAL_DRIFT_SQL)
+        orders = self.read_cursor.fetchall()
+        self.read_cursor.execute(TABLE_BALANCE_DRIFT_SQL)
+        tables = self.read_cursor.fetchall()
+        return orders, tables
+
+    def repair_totals(self):
+        """Overwrite drifted order totals and table balances with the recomputed values, return (orders, tables) fixed"""
+        try:
+            self.cursor.execute(ORDER_TOTAL_DRIFT_SQL)
+            orders = self.cursor.fetchall()
+            # The update triggers carry each order correction over to its table
+            self.cursor.executemany(
+                "UPDATE orders SET total_cents = ?, total_amount = ? / 100.0 WHERE id = ?",
+                [(row['expected'], row['expected'], row['id']) for row in orders]
+            )
+            self.cursor.execute(TABLE_BALANCE_DRIFT_SQL)
+            tables = self.cursor.fetchall()
+            self.cursor.executemany(
+                "UPDATE tables SET open_balance_cents = ?, open_balance = ? / 100.0 WHERE id = ?",
+                [(row['expected'], row['expected'], row['id']) for row in tables]
+            )
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return len(orders), len(tables)
+
+    # =========================================================================
+    # Inventory Check and Deduction
+    # =========================================================================
+    def _get_requirements(self, items):
+        """
+        Sum the ingredient needs of a list of (dish_id, quantity) pairs from the cached recipes,
+        then read the current stock and reservations of those ingredients with one query.
+        Return {ingredient_id: {"name", "unit", "stock", "reserved", "required"}}.
+        """
+        menu = self.get_menu()
+        requirements = {}
+        for dish_id, quantity in items:
+            dish = menu.dishes.get(dish_id)
+            configured = False
+            if dish:
+                for ingredient_id, per_serving in zip(dish.ingredient_ids, dish.quantities):
+                    ingredient = menu.ingredients.get(ingredient_id)
+                    if ingredient is None:
+                        continue
+                    configured = True
+                    need = requirements.setdefault(ingredient_id, {
+                        "name": ingredient.name, "unit": ingredient.unit, "stock": 0, "reserved": 0, "required": 0
+                    })
+                    need['required'] += per_serving * quantity
+            if not configured:
+                raise OrderError("This dish has no ingredients configured and cannot be processed.")
+        if not requirements:
+            return {}
+
+        placeholders = ", ".join("?" for _ in requirements)
+        self.cursor.execute(AVAILABLE_STOCK_SQL.format(placeholders=placeholders), list(requirements))
+        for row in self.cursor.fetchall():
+            requirements[row['id']]['stock'] = row['stock']
+            requirements[row['id']]['reserved'] = row['reserved']
+        return requirements
+
+    def check_order_ingredients(self, items, reserved_by_self=False):
+        """
+        Check a whole order's (dish_id, quantity) list against available-to-promise stock (stock minus
+        reservations), return shortage messages (empty when stock is sufficient).
+        With reserved_by_self the items' own reservations are already part of the reserved amounts.
+        """
+        insufficient = []
+        for need in self._get_requirements(items).values():
+            available = need['stock'] - need['reserved']
+            if reserved_by_self:
+                available += need['required']
+            if available < need['required'] - 1e-9:
+                insufficient.append(
+                    f"{need['name']}Not Enough (Demand: {need['required']:g}{need['unit']}, "
+                    f"Available: {available:g}{need['unit']} of {need['stock']:g}{need['unit']} in stock)"
+                )
+        return insufficient
+
+    def reserve_order_items(self, order_items):
+        """
+        Reserve the recipe ingredients of order items (rows with id, dish_id, quantity).
+        The caller checks availability and commits or rolls back.
+        """
+        menu = self.get_menu()
+        reservations = []
+        for item in order_items:
+            dish = menu.dishes.get(item['dish_id'])
+            if dish is None:
+                continue
+            for ingredient_id, per_serving in zip(dish.ingredient_ids, dish.quantities):
+                if ingredient_id in menu.ingredients:
+                    reservations.append((item['id'], ingredient_id, per_serving * item['quantity']))
+        self.cursor.executemany("""
+            INSERT INTO inventory_reservations (order_item_id, ingredient_id, quantity) VALUES (?, ?, ?)
+            ON CONFLICT (order_item_id, ingredient_id) DO UPDATE SET quantity = excluded.quantity
+        """, reservations)
+
+    def get_available_to_promise(self, ingredient_ids):
+        """{ingredient_id: stock minus outstanding reservations}"""
+        if not ingredient_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in ingredient_ids)
+        self.read_cursor.execute(AVAILABLE_STOCK_SQL.format(placeholders=placeholders), list(ingredient_ids))
+        return {row['id']: row['stock'] - row['reserved'] for row in self.read_cursor.fetchall()}
+
+    def deduct_order_ingredients(self, items, own_reservations=None):
+        """
+        Deduct a whole order's (dish_id, quantity) list and log the movements in bulk.
+        Stock reserved by other orders cannot be deducted; own_reservations ({ingredient_id: quantity})
+        is what these items hold themselves and is released by the triggers once they leave Pending.
+        The guard in the UPDATE makes it safe against concurrent deductions and reservations;
+        raise OrderError if any ingredient runs short. The caller commits or rolls back.
+        """
+        own_reservations = own_reservations or {}
+        requirements = self._get_requirements(items)
+        if any(need['stock'] - need['reserved'] + own_reservations.get(ingredient_id, 0) < need['required'] - 1e-9
+               for ingredient_id, need in requirements.items()):
+            raise OrderError("Failed to deduct ingredients. Check inventory status.")
+
+        # Update inventory (the first write opens the transaction and takes the write lock)
+        self.cursor.executemany(
+            "UPDATE ingredients SET stock = stock - ? WHERE id = ? AND stock - (" + RESERVED_SQL + ") + ? >= ? - 1e-9",
+            [(need['required'], ingredient_id, ingredient_id, own_reservations.get(ingredient_id, 0), need['required'])
+             for ingredient_id, need in requirements.items()]
+        )
+        if self.cursor.rowcount != len(requirements):
+            raise OrderError("Failed to deduct ingredients. Check inventory status.")
+
+        # Read back the stock written inside this transaction for the movement log
+        placeholders = ", ".join("?" for _ in requirements)
+        self.cursor.execute(f"SELECT id, stock FROM ingredients WHERE id IN ({placeholders})", list(requirements))
+        new_stocks = {row['id']: row['stock'] for row in self.cursor.fetchall()}
+
+        # Record inventory movement logs (created_at keeps its CURRENT_TIMESTAMP default)
+        created_ts = epoch_ms()
+        self.cursor.executemany("""
+            INSERT INTO inventory_logs
+            (ingredient_id, change_type, quantity, old_stock, new_stock, reason, created_by, created_ts)
+            VALUES (?, 'Stock Out', ?, ?, ?, '订单消耗', '系统操作员', ?)
+        """, [
+            (ingredient_id, need['required'], new_stocks[ingredient_id] + need['required'], new_stocks[ingredient_id],
+             created_ts)
+            for ingredient_id, need in requirements.items()
+        ])
+
+    # =========================================================================
+    # Kitchen
+    # =========================================================================
+    def list_kitchen_items(self, status_filter="All"):
+        query = KITCHEN_ITEMS_SQL + " WHERE 1=1"
+        params = []
+
+        # Filter criteria only use status values allowed by the database
+        if status_filter != "All":
+            query += " AND oi.status = ?"
+            params.append(status_filter)
+
+        query += " ORDER BY o.order_ts DESC, oi.id"
+        self.read_cursor.execute(query, params)
+        return self.read_cursor.fetchall()
+
+    def get_kitchen_snapshot(self, status_filter="All"):
+        """Return (seq, rows): the change-log position to poll from and the full kitchen list"""
+        # Read the position first: a change racing with the list is then delivered again, never lost
+        seq = self.read_connection.execute("SELECT COALESCE(MAX(seq), 0) FROM order_item_changes").fetchone()[0]
+        return seq, self.list_kitchen_items(status_filter)
+
+    def poll_kitchen_changes(self, since, status_filter="All"):
+        """
+        Changes to order items after change-log position `since`, as a KitchenChanges delta.
+        PRAGMA data_version short-circuits the poll when nothing was committed since the last one.
+        """
+        data_version = self.read_connection.execute("PRAGMA data_version").fetchone()[0]
+        if self._changes_seen == (data_version, since):
+            return KitchenChanges(since, [], [], False)
+
+        self.read_cursor.execute(KITCHEN_CHANGES_SQL, (since,))
+        changes = self.read_cursor.fetchall()
+        if not changes:
+            self._changes_seen = (data_version, since)
+            return KitchenChanges(since, [], [], False)
+        self._changes_seen = (data_version, changes[-1]['seq'])
+        if changes[0]['seq'] > since + 1 and since > 0:
+            # Entries between `since` and the oldest one left were trimmed
+            return KitchenChanges(changes[-1]['seq'], [], [], True)
+
+        item_ids = list(dict.fromkeys(row['item_id'] for row in changes))
+        placeholders = ", ".join("?" for _ in item_ids)
+        self.read_cursor.execute(
+            KITCHEN_ITEMS_SQL + f" WHERE oi.id IN ({placeholders}) ORDER BY o.order_ts DESC, oi.id", item_ids
+        )
+        rows = [row for row in self.read_cursor.fetchall() if status_filter == "All" or row['status'] == status_filter]
+        shown = {row['id'] for row in rows}
+        return KitchenChanges(changes[-1]['seq'], rows, [item_id for item_id in item_ids if item_id not in shown], False)
+
+    def get_prep_estimates(self):
+        """{dish_id: learned prep time in seconds} for every dish that has been cooked and timed"""
+        self.read_cursor.execute("SELECT dish_id, avg_seconds FROM dish_prep_times")
+        return {row['dish_id']: row['avg_seconds'] for row in self.read_cursor.fetchall()}
+
+    def list_kitchen_all_day(self):
+        """Pending and In Progress portions per dish with ticket counts and the oldest order time, by station"""
+        self.read_cursor.execute(KITCHEN_ALL_DAY_SQL)
+        return self.read_cursor.fetchall()
+
+    def _get_batch(self, dish_id, status):
+        """(dish name, item rows) of every item of a dish in the given status, oldest first"""
+        dish = self.get_menu().dishes.get(dish_id)
+        if dish is None:
+            raise OrderError("Dish not found")
+        self.cursor.execute(BATCH_ITEMS_SQL, (status, dish_id))
+        items = self.cursor.fetchall()
+        if not items:
+            raise OrderError(f"No {status.lower()} items of {dish.name}")
+        return dish.name, items
+
+    def start_batch(self, dish_id):
+        """
+        Start every pending item of a dish together: one combined ingredient deduction (using the
+        items' reservations) and one status update. Return (dish name, items started, portions).
+        """
+        name, items = self._get_batch(dish_id, 'Pending')
+        item_ids = [item['id'] for item in items]
+        portions = sum(item['quantity'] for item in items)
+        placeholders = ", ".join("?" for _ in item_ids)
+        self.cursor.execute(f"""
+            SELECT ingredient_id, SUM(quantity) AS quantity FROM inventory_reservations
+            WHERE order_item_id IN ({placeholders}) GROUP BY ingredient_id
+        """, item_ids)
+        reserved = {row['ingredient_id']: row['quantity'] for row in self.cursor.fetchall()}
+
+        try:
+            self.deduct_order_ingredients([(dish_id, portions)], reserved)
+            self.cursor.execute(
+                f"UPDATE order_items SET status = 'In Progress' WHERE id IN ({placeholders}) AND status = 'Pending'",
+                item_ids
+            )
+            if self.cursor.rowcount != len(item_ids):
+                raise OrderError("Some of these items were changed at another terminal, please refresh and retry")
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return name, len(item_ids), portions
+
+    def complete_batch(self, dish_id):
+        """
+        Complete every In Progress item of a dish with one status update; orders left with no
+        unfinished items become Served. Return (dish name, items completed, portions).
+        """
+        name, items = self._get_batch(dish_id, 'In Progress')
+        item_ids = [item['id'] for item in items]
+        order_ids = list({item['order_id'] for item in items})
+
+        try:
+            placeholders = ", ".join("?" for _ in item_ids)
+            self.cursor.execute(
+                f"UPDATE order_items SET status = 'Completed' WHERE id IN ({placeholders}) AND status = 'In Progress'",
+                item_ids
+            )
+            if self.cursor.rowcount != len(item_ids):
+                raise OrderError("Some of these items were changed at another terminal, please refresh and retry")
+            placeholders = ", ".join("?" for _ in order_ids)
+            self.cursor.execute(f"""
+                UPDATE orders SET status = 'Served'
+                WHERE id IN ({placeholders}) AND status IN ('Placed', 'In Progress')
+                  AND NOT EXISTS (SELECT 1 FROM order_items WHERE order_id = orders.id AND status != 'Completed')
+            """, order_ids)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return name, len(item_ids), sum(item['quantity'] for item in items)
+
+    def _get_item(self, item_id):
+        self.cursor.execute("""
+            SELECT oi.order_id, oi.dish_id, oi.quantity, oi.status, d.name
+            FROM order_items oi
+            JOIN dishes d ON oi.dish_id = d.id
+            WHERE oi.id = ?
+        """, (item_id,))
+        item = self.cursor.fetchone()
+        if not item:
+            raise OrderError("Selected item not found")
+        return item
+
+    def start_preparation(self, item_id):
+        """Move a pending item to In Progress and deduct its ingredients, return the dish name"""
+        item = self._get_item(item_id)
+        if item['status'] != 'Pending':
+            raise OrderError("Only pending items can be started")
+
+        # Preparation turns the item's reservation (if it was submitted) into a deduction
+        self.cursor.execute(
+            "SELECT ingredient_id, quantity FROM inventory_reservations WHERE order_item_id = ?", (item_id,)
+        )
+        reserved = {row['ingredient_id']: row['quantity'] for row in self.cursor.fetchall()}
+
+        try:
+            self.deduct_order_ingredients([(item['dish_id'], item['quantity'])], reserved)
+            self.cursor.execute("UPDATE order_items SET status = 'In Progress' WHERE id = ?", (item_id,))
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return item['name']
+
+    def _complete_item(self, item_id, order_id):
+        """Mark an item Completed and the order Served once all of its items are completed"""
+        self.cursor.execute("UPDATE order_items SET status = 'Completed' WHERE id = ?", (item_id,))
+        self.cursor.execute(REMAINING_ITEMS_SQL, (order_id,))
+        if self.cursor.fetchone()['remaining'] == 0:
+            self.cursor.execute("UPDATE orders SET status = 'Served' WHERE id = ?", (order_id,))
+
+    def mark_as_served(self, item_id):
+        """Move an In Progress item to Completed, return the dish name"""
+        item = self._get_item(item_id)
+        if item['status'] != 'In Progress':
+            raise OrderError("Only items in progress can be marked as completed")
+
+        try:
+            self._complete_item(item_id, item['order_id'])
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return item['name']
+
+    def advance_item_status(self, item_id):
+        """
+        Switch an item Pending → In Progress → Completed, return the new status. Starting an item
+        goes through start_preparation, so its reservation becomes a stock deduction.
+        """
+        item = self._get_item(item_id)
+        if item['status'] == "Pending":
+            self.start_preparation(item_id)
+            return "In Progress"
+        if item['status'] != "In Progress":
+            return item['status']
+
+        try:
+            self._complete_item(item_id, item['order_id'])
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return "Completed"
+
+    # =========================================================================
+    # Time Ranges
+    # =========================================================================
+    def summarize_orders(self, start, end, paid=False):
+        """
+        (orders, revenue in fen) placed in [start, end), or paid in it with paid=True.
+        start/end are datetimes or epoch milliseconds.
+        """
+        sql = ORDERS_PAID_BETWEEN_SQL if paid else ORDERS_PLACED_BETWEEN_SQL
+        self.read_cursor.execute(sql, (_as_epoch_ms(start), _as_epoch_ms(end)))
+        row = self.read_cursor.fetchone()
+        return row['orders'], row['revenue_cents']
+
+    def summarize_inventory_movements(self, start, end):
+        """Rows (change_type, movements, quantity) of the stock movements logged in [start, end)"""
+        self.read_cursor.execute(INVENTORY_MOVEMENTS_BETWEEN_SQL, (_as_epoch_ms(start), _as_epoch_ms(end)))
+        return self.read_cursor.fetchall()
+
+    # =========================================================================
+    # Inventory Management
+    # =========================================================================
+    def list_ingredients(self):
+        """All ingredients with their reserved amount (held by submitted orders not yet started)"""
+        self.read_cursor.execute("""
+            SELECT i.*, COALESCE(r.reserved, 0) AS reserved
+            FROM ingredients i
+            LEFT JOIN (
+                SELECT ingredient_id, SUM(quantity) AS reserved FROM inventory_reservations GROUP BY ingredient_id
+            ) r ON r.ingredient_id = i.id
+        """)
+        return self.read_cursor.fetchall()
+
+    def add_ingredient(self, name, unit, stock, threshold):
+        self.cursor.execute("""
+            INSERT INTO ingredients (name, unit, stock, low_stock_threshold)
+            VALUES (?, ?, ?, ?)
+        """, (name, unit, stock, threshold))
+        self.connection.commit()
+        self.invalidate_menu()
+        return self.cursor.lastrowid
+
+    def delete_ingredient(self, ingredient_id):
+        self.cursor.execute("DELETE FROM ingredients WHERE id = ?", (ingredient_id,))
+        self.connection.commit()
+        self.invalidate_menu()
+
+    def set_ingredient_stock(self, ingredient_id, new_stock):
+        if new_stock < 0:
+            raise OrderError("Stock cannot be negative")
+        self.cursor.execute("UPDATE ingredients SET stock = ? WHERE id = ?", (new_stock, ingredient_id))
+        self.connection.commit()
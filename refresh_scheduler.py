@@ -0,0 +1,58 @@
+"""
+Coalescing refresh scheduler for the Tk views.
+
+Actions do not reload views directly; they mark them dirty. The dirty views
+are refreshed once, in the order they were first marked, from a single
+root.after_idle callback, so an action that touches the same view several
+times (or several actions in one event-loop turn) reloads it only once.
+"""
+from collections import Counter
+
+
+class RefreshScheduler:
+    def __init__(self, root):
+        self.root = root
+        self.views = {}  # name -> refresh callable
+        self.dirty = {}  # names waiting for the idle flush (dict keeps marking order)
+        self.scheduled = False
+        self.requested = Counter()  # mark_dirty calls per view
+        self.refreshed = Counter()  # refreshes actually run per view
+
+    def register(self, name, refresh):
+        self.views[name] = refresh
+
+    def mark_dirty(self, *names):
+        for name in names:
+            if name not in self.views:
+                raise KeyError(f"Unknown view: {name}")
+            self.requested[name] += 1
+            self.dirty[name] = True
+        if self.dirty and not self.scheduled:
+            self.scheduled = True
+            self.root.after_idle(self.flush)
+
+    def flush(self):
+        """Run every dirty view's refresh once; one failing view does not stop the others"""
+        dirty, self.dirty = self.dirty, {}
+        self.scheduled = False
+        for name in dirty:
+            self.refreshed[name] += 1
+            try:
+                self.views[name]()
+            except Exception as e:
+                print(f"Refreshing the {name} view failed: {e}")
+
+    def stats(self):
+        """{view: (requested, refreshed, avoided)}"""
+        return {
+            name: (self.requested[name], self.refreshed[name], self.requested[name] - self.refreshed[name])
+            for name in self.views
+        }
+
+    @property
+    def avoided(self):
+        return sum(self.requested.values()) - sum(self.refreshed.values())
+
+    def summary(self):
+        return (f"Refreshes requested: {sum(self.requested.values())}, run: {sum(self.refreshed.values())}, "
+                f"avoided: {self.avoided}")
@@ -0,0 +1,159 @@
+"""
+Sales reports from the daily rollup tables.
+
+trg_orders_paid_rollup (migration 12) folds every order into sales_hourly,
+sales_by_dish, sales_by_payment and sales_by_table as it is paid, keyed by
+checkout day. A report is a range scan over the day prefix of one rollup's
+primary key, so "last 90 days by dish" reads about 90 x dishes-sold rows however
+long the order history is.
+
+Orders written around the trigger (bulk loads, restored backups) are picked up
+by the catch-up job, which recomputes the rollups from the paid orders, including
+the archived ones when the history database is attached:
+
+    python reports.py --days 90 --by dish [--db restaurant_system.db]
+    python reports.py --rebuild [--since 2024-01-01]
+"""
+import argparse
+import os
+import time
+from datetime import date, timedelta
+
+from archive import attach_history, detach_history, history_path_for
+from migrations import rebuild_sales_rollups
+from money import format_money
+from order_engine import DEFAULT_DB_PATH
+from storage import open_connection, profile_from_env
+
+GROUPINGS = ("day", "hour", "dish", "payment", "table")
+
+# grouping -> SQL over one rollup table for days in [start, end)
+SALES_QUERIES = {
+    "day": """
+        SELECT day AS label, SUM(orders) AS count, SUM(revenue_cents) AS revenue_cents
+        FROM sales_hourly WHERE day >= ? AND day < ?
+        GROUP BY day ORDER BY day
+    """,
+    "hour": """
+        SELECT printf('%02d:00', hour) AS label, SUM(orders) AS count, SUM(revenue_cents) AS revenue_cents
+        FROM sales_hourly WHERE day >= ? AND day < ?
+        GROUP BY hour ORDER BY hour
+    """,
+    "dish": """
+        SELECT COALESCE(d.name, 'Dish #' || s.dish_id) AS label, SUM(s.quantity) AS count,
+               SUM(s.revenue_cents) AS revenue_cents
+        FROM sales_by_dish s LEFT JOIN dishes d ON d.id = s.dish_id
+        WHERE s.day >= ? AND s.day < ?
+        GROUP BY s.dish_id ORDER BY revenue_cents DESC
+    """,
+    "payment": """
+        SELECT payment_method AS label, SUM(orders) AS count, SUM(revenue_cents) AS revenue_cents
+        FROM sales_by_payment WHERE day >= ? AND day < ?
+        GROUP BY payment_method ORDER BY revenue_cents DESC
+    """,
+    "table": """
+        SELECT COALESCE(t.table_number, 'Table #' || s.table_id) AS label, SUM(s.orders) AS count,
+               SUM(s.revenue_cents) AS revenue_cents
+        FROM sales_by_table s LEFT JOIN tables t ON t.id = s.table_id
+        WHERE s.day >= ? AND s.day < ?
+        GROUP BY s.table_id ORDER BY revenue_cents DESC
+    """,
+}
+
+# (name, sql, sample parameters) for benchmarks/check_query_plans.py
+REPORT_QUERIES = [
+    (f"sales by {by}", sql, ('2000-01-01', '2100-01-01')) for by, sql in SALES_QUERIES.items()
+]
+
+
+def period(days, today=None):
+    """(start_day, end_day) covering the last `days` days up to and including today"""
+    today = today or date.today()
+    return (today - timedelta(days=days - 1)).isoformat(), (today + timedelta(days=1)).isoformat()
+
+
+def sales_summary(connection, start_day, end_day, by="dish"):
+    """
+    Rows (label, count, revenue_cents) for orders paid on days in [start_day, end_day)
+    ('YYYY-MM-DD' strings). count is items sold when grouping by dish, orders otherwise.
+    Revenue is what was collected (after discount, service charge and tax), except by dish,
+    where it is the item subtotals at menu prices.
+    """
+    if by not in GROUPINGS:
+        raise ValueError(f"Unknown grouping {by!r}, expected one of: {', '.join(GROUPINGS)}")
+    return connection.execute(SALES_QUERIES[by], (start_day, end_day)).fetchall()
+
+
+def rebuild_rollups(connection, since_day=None):
+    """
+    Catch-up job: recompute the rollups for days from since_day on (everything when None)
+    in one transaction. Archived orders must be counted too, or their revenue would be
+    dropped: the history database next to the live file is attached for the rebuild
+    (and detached again) unless the caller already attached it.
+    """
+    views = {row[0] for row in connection.execute("SELECT name FROM temp.sqlite_master WHERE type = 'view'")}
+    attached = False
+    if "all_orders" not in views:
+        main_path = next(row[2] for row in connection.execute("PRAGMA database_list") if row[1] == "main")
+        if main_path and os.path.exists(history_path_for(main_path)):
+            attach_history(connection, history_path_for(main_path))
+            attached = True
+            views.add("all_orders")
+    if "all_orders" in views:
+        sources = ("all_orders", "all_order_items")
+    else:
+        sources = ("orders", "order_items")
+    cursor = connection.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        rebuild_sales_rollups(cursor, since_day, *sources)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        if attached:
+            detach_history(connection)
+
+
+def format_report(rows, by):
+    count_label = "Items" if by == "dish" else "Orders"
+    total = sum(row['revenue_cents'] for row in rows)
+    header = f"{by.capitalize():<30} {count_label:>8} {'Revenue':>12} {'Share':>7}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        share = row['revenue_cents'] / total * 100 if total else 0
+        lines.append(f"{str(row['label'])[:30]:<30} {row['count']:>8} {format_money(row['revenue_cents']):>12} "
+                     f"{share:>6.1f}%")
+    lines.append(f"{'Total':<30} {sum(row['count'] for row in rows):>8} {format_money(total):>12}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sales by day, hour, dish, payment method or table")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="database file")
+    parser.add_argument("--days", type=int, default=90, help="report on the last N days, today included")
+    parser.add_argument("--by", default="dish", choices=GROUPINGS)
+    parser.add_argument("--rebuild", action="store_true", help="recompute the rollups from the paid orders")
+    parser.add_argument("--since", help="with --rebuild: only days from this one (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        connection = open_connection(args.db, profile_from_env())
+        started = time.perf_counter()
+        rebuild_rollups(connection, args.since)
+        connection.close()
+        print(f"Rebuilt sales rollups{' since ' + args.since if args.since else ''} "
+              f"in {time.perf_counter() - started:.2f}s")
+        return
+
+    start_day, end_day = period(args.days)
+    connection = open_connection(args.db, profile_from_env(), readonly=True)
+    rows = sales_summary(connection, start_day, end_day, args.by)
+    connection.close()
+    print(f"Sales {start_day} - {(date.fromisoformat(end_day) - timedelta(days=1)).isoformat()}")
+    print(format_report(rows, args.by))
+
+
+if __name__ == "__main__":
+    main()
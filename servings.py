@@ -0,0 +1,76 @@
+"""
+Servings remaining per dish.
+
+A dish can still be made min(available / per_serving) times over its recipe,
+where available is the ingredient's stock minus outstanding reservations. The
+counts for the whole menu are computed in one pass over the cached recipes
+(menu_cache.py) and one query for the available stock of every ingredient.
+Afterwards only dishes that use an ingredient whose available stock moved are
+recomputed, found through the cache's ingredient -> dishes index.
+"""
+import threading
+
+# Tolerance for REAL stock arithmetic (0.3 - 0.1 - 0.2 should still make zero portions, not -1)
+EPSILON = 1e-9
+
+
+def servings_for(dish, available):
+    """Portions of `dish` the `available` stock can make, None when the dish has no recipe"""
+    if not dish.ingredient_ids:
+        return None
+    portions = None
+    for ingredient_id, per_serving in zip(dish.ingredient_ids, dish.quantities):
+        if per_serving <= 0:
+            continue
+        count = max(int((available.get(ingredient_id, 0) + EPSILON) // per_serving), 0)
+        if portions is None or count < portions:
+            portions = count
+    return portions
+
+
+class ServingsCounter:
+    def __init__(self):
+        self.menu_version = None  # catalog_version the counts were computed for
+        self.available = {}  # ingredient_id -> available stock the counts were computed from
+        self.servings = {}  # dish_id -> portions left (None: no recipe)
+        self._lock = threading.Lock()
+
+    def update(self, menu, available):
+        """Bring the counts in line with `available` ({ingredient_id: stock}), return the dish IDs whose count changed"""
+        with self._lock:
+            if menu.version != self.menu_version:
+                # 1. Menu or recipes changed: recompute every dish
+                dirty = menu.dishes.keys()
+            else:
+                # 2. Only dishes that use an ingredient whose available stock moved
+                moved = [ingredient_id for ingredient_id in available.keys() | self.available.keys()
+                         if available.get(ingredient_id) != self.available.get(ingredient_id)]
+                dirty = set()
+                for ingredient_id in moved:
+                    dirty.update(menu.dishes_by_ingredient.get(ingredient_id, ()))
+
+            servings = dict(self.servings) if menu.version == self.menu_version else {}
+            changed = []
+            for dish_id in dirty:
+                dish = menu.dishes.get(dish_id)
+                if dish is None:
+                    continue
+                count = servings_for(dish, available)
+                if dish_id not in servings or servings[dish_id] != count:
+                    changed.append(dish_id)
+                servings[dish_id] = count
+
+            self.servings = servings
+            self.available = available
+            self.menu_version = menu.version
+            return changed
+
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+def get_servings_counter(db_path):
+    """The shared counter for a database file (one per process)"""
+    with _counters_lock:
+        return _counters.setdefault(db_path, ServingsCounter())
@@ -0,0 +1,131 @@
+"""
+SQLite storage profile and connection pool.
+
+Several terminals (one main.py per front-of-house terminal plus the kitchen)
+share one database file, so every connection is opened with the same profile:
+WAL journal (readers never block the writer), a busy timeout instead of an
+immediate "database is locked", and explicit synchronous/mmap/cache settings.
+The profile is chosen with the RMS_STORAGE_PROFILE environment variable.
+
+Each OrderEngine takes one write connection and one read-only connection from
+the process-wide pool for its database file and hands them back on close().
+"""
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+
+from diagnostics import TracingConnection
+
+StorageProfile = namedtuple("StorageProfile", "journal_mode synchronous mmap_size cache_size busy_timeout_ms")
+
+PROFILES = {
+    # Recommended for multi-terminal use: WAL, fsync at checkpoints only, 256 MiB mmap, ~32 MiB page cache
+    "default": StorageProfile("WAL", "NORMAL", 256 * 1024 * 1024, -32000, 5000),
+    # WAL with an fsync on every commit, for machines without a UPS
+    "durable": StorageProfile("WAL", "FULL", 256 * 1024 * 1024, -32000, 5000),
+    # The original behaviour: rollback journal, default cache, no waiting on locks
+    "legacy": StorageProfile("DELETE", "FULL", 0, -2000, 0),
+}
+
+PROFILE_ENV_VAR = "RMS_STORAGE_PROFILE"
+
+
+def profile_from_env():
+    """The profile named by RMS_STORAGE_PROFILE (default: "default")"""
+    name = os.environ.get(PROFILE_ENV_VAR, "default")
+    if name not in PROFILES:
+        raise ValueError(f"Unknown storage profile {name!r}, expected one of: {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def is_locked_error(error):
+    """True for the "database is locked"/"database table is locked" errors raised when the busy timeout runs out"""
+    return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+
+def open_connection(db_path, profile, readonly=False):
+    """Open a connection with the profile applied; readonly connections refuse writes (query_only)"""
+    connection = sqlite3.connect(db_path, timeout=profile.busy_timeout_ms / 1000.0, check_same_thread=False,
+                                 factory=TracingConnection)
+    connection.row_factory = sqlite3.Row
+    # 1. Wait on locks first, so switching the journal mode itself does not fail under contention
+    connection.execute(f"PRAGMA busy_timeout = {int(profile.busy_timeout_ms)}")
+    # 2. The journal mode is stored in the file; only the writer needs to set it
+    if not readonly:
+        connection.execute(f"PRAGMA journal_mode = {profile.journal_mode}")
+    # 3. Per-connection settings
+    connection.execute(f"PRAGMA synchronous = {profile.synchronous}")
+    connection.execute(f"PRAGMA mmap_size = {int(profile.mmap_size)}")
+    connection.execute(f"PRAGMA cache_size = {int(profile.cache_size)}")
+    if readonly:
+        connection.execute("PRAGMA query_only = ON")
+    return connection
+
+
+class ConnectionPool:
+    """
+    Idle write and read-only connections for one database file.
+    Connections are opened on demand and reused after release, so worker threads
+    and short-lived engines do not pay for opening and configuring a connection each time.
+    """
+
+    def __init__(self, db_path, profile, max_idle=4):
+        self.db_path = db_path
+        self.profile = profile
+        self.max_idle = max_idle
+        self._idle = {False: [], True: []}  # readonly -> idle connections
+        self._lock = threading.Lock()
+
+    def acquire(self, readonly=False):
+        with self._lock:
+            idle = self._idle[readonly]
+            if idle:
+                return idle.pop()
+        return open_connection(self.db_path, self.profile, readonly)
+
+    def release(self, connection, readonly=False):
+        """Return a connection to the pool; an unfinished transaction is rolled back first"""
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except sqlite3.Error:
+            connection.close()
+            return
+        with self._lock:
+            idle = self._idle[readonly]
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            connections = self._idle[False] + self._idle[True]
+            self._idle = {False: [], True: []}
+        for connection in connections:
+            connection.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path, profile=None):
+    """The shared pool for a database file and profile (one per process)"""
+    profile = profile or profile_from_env()
+    key = (os.path.abspath(db_path), profile)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_path, profile)
+        return pool
+
+
+def close_all_pools():
+    """Close every idle pooled connection (lets SQLite checkpoint and remove the WAL file)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
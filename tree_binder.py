@@ -0,0 +1,53 @@
+class KeyedTreeBinder:
+    """
+    Keep a flat ttk.Treeview in sync with a result set keyed by primary key.
+    Only rows that were added, changed or removed since the last bind touch the widget,
+    so selection and scroll position survive a refresh.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.rows = {}  # iid -> (values, tags) currently displayed
+
+    def bind(self, rows):
+        """rows: iterable of (key, values, tags) in display order; return (inserted, updated, deleted) counts"""
+        tree = self.tree
+        scroll_top = tree.yview()[0]
+
+        new_rows = {}
+        order = []
+        for key, values, tags in rows:
+            iid = str(key)
+            new_rows[iid] = (tuple(values), tuple(tags))
+            order.append(iid)
+
+        # 1. Remove rows that disappeared
+        stale = [iid for iid in self.rows if iid not in new_rows]
+        if stale:
+            tree.delete(*stale)
+
+        # 2. Insert new rows in place and update changed ones
+        inserted = updated = 0
+        for index, iid in enumerate(order):
+            values, tags = new_rows[iid]
+            current = self.rows.get(iid)
+            if current is None:
+                tree.insert("", index, iid=iid, values=values, tags=tags)
+                inserted += 1
+            elif current != (values, tags):
+                tree.item(iid, values=values, tags=tags)
+                updated += 1
+
+        # 3. Fix the order only when it actually changed
+        if list(tree.get_children()) != order:
+            for index, iid in enumerate(order):
+                tree.move(iid, "", index)
+
+        self.rows = new_rows
+        tree.yview_moveto(scroll_top)
+        return inserted, updated, len(stale)
+
+    def clear(self):
+        if self.rows:
+            self.tree.delete(*self.rows)
+        self.rows = {}